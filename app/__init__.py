@@ -9,6 +9,10 @@ from app.public.routes import public_bp
 from app.admin.routes import admin_bp
 from app.models import AdminUser
 from app.cli import register_cli
+from app.events import init_events
+from app.expiry import init_expiry
+from app.metrics import init_metrics, instrument_pool
+from app.ratelimit import DatabaseStorage  # noqa: F401  (registra "sqlalchemy://" para el limiter)
 
 
 def create_app() -> Flask:
@@ -18,11 +22,15 @@ def create_app() -> Flask:
     app.config.from_object(Config())
 
     # Extensions
+    instrument_pool(app)
     db.init_app(app)
     migrate.init_app(app, db)
     csrf.init_app(app)
     login_manager.init_app(app)
     limiter.init_app(app)
+    init_events(app)
+    init_expiry(app)
+    init_metrics(app)
 
     # Blueprints
     app.register_blueprint(public_bp)
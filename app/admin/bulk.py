@@ -0,0 +1,181 @@
+"""
+Transiciones de compras (aprobar / marcar pagado / cancelar), en lote o de a
+una: las rutas individuales del detalle también pasan por aquí, porque el
+barrido de vencidos (app.expiry) puede cancelar la misma compra al mismo
+tiempo y sólo el UPDATE condicional decide quién gana sin descuadrar
+raffle_stats ni pagar boletos ya liberados.
+
+Todo va en UNA transacción del llamador y con sentencias por conjunto:
+  1. SELECT de las compras pedidas (validación por folio).
+  2. UPDATE purchases ... WHERE id IN (...) AND status = :anterior RETURNING id
+     (uno por estado de origen permitido: así sabemos el estado anterior exacto
+     y, si otro admin la cambió mientras tanto, simplemente no se toca).
+  3. UPDATE tickets ... WHERE id IN (boletos de esas compras) AND status = :anterior
+     RETURNING number.
+  4. raffle_stats, board_version y un INSERT multi-fila en audit_logs.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import select, update
+
+from app.audit import audit_row, record_audit_rows
+from app.board import bump_board_version
+from app.extensions import db
+from app.models import Purchase, PurchaseStatus, Ticket, TicketStatus, purchase_tickets
+from app.stats import apply_stats_delta
+
+
+BULK_MAX_ITEMS = 200
+
+
+@dataclass(frozen=True)
+class BulkAction:
+    label: str
+    allowed_from: tuple
+    to_status: PurchaseStatus
+    timestamp_field: str
+    ticket_status: TicketStatus = None  # None = no toca boletos
+    audit_action: str = ""
+
+
+BULK_ACTIONS = {
+    "approve": BulkAction(
+        label="Aprobar",
+        allowed_from=(PurchaseStatus.PENDING,),
+        to_status=PurchaseStatus.APPROVED,
+        timestamp_field="approved_at",
+        audit_action="PURCHASE_APPROVED",
+    ),
+    "mark_paid": BulkAction(
+        label="Marcar pagado",
+        allowed_from=(PurchaseStatus.PENDING, PurchaseStatus.APPROVED),
+        to_status=PurchaseStatus.PAID,
+        timestamp_field="paid_at",
+        ticket_status=TicketStatus.PAID,
+        audit_action="PURCHASE_MARK_PAID",
+    ),
+    "cancel": BulkAction(
+        label="Cancelar",
+        allowed_from=(PurchaseStatus.PENDING, PurchaseStatus.APPROVED),
+        to_status=PurchaseStatus.CANCELLED,
+        timestamp_field="cancelled_at",
+        ticket_status=TicketStatus.FREE,
+        audit_action="PURCHASE_CANCELLED",
+    ),
+}
+
+
+@dataclass
+class BulkItemResult:
+    purchase_id: int
+    folio: str = None
+    ok: bool = False
+    message: str = ""
+    buyer_name: str = None
+    buyer_phone_e164: str = None
+    numbers: tuple = ()
+
+
+def parse_purchase_ids(values) -> list:
+    ids = []
+    for v in values:
+        v = (v or "").strip()
+        if v.isdigit() and int(v) not in ids:
+            ids.append(int(v))
+    return ids
+
+
+def apply_bulk_transition(raffle, action_key: str, purchase_ids, admin_user_id=None, ip_address=None,
+                          bulk: bool = True) -> list:
+    """
+    Llamar DENTRO de una transacción. Devuelve [BulkItemResult] en el orden
+    pedido; los que no se pudieron aplicar traen ok=False y el motivo.
+    """
+    action = BULK_ACTIONS[action_key]
+    now = datetime.utcnow()
+
+    results = {pid: BulkItemResult(purchase_id=pid, message="No existe en esta rifa.") for pid in purchase_ids}
+
+    rows = db.session.execute(
+        select(Purchase.id, Purchase.folio, Purchase.status, Purchase.buyer_name, Purchase.buyer_phone_e164)
+        .where(Purchase.raffle_id == raffle.id, Purchase.id.in_(purchase_ids))
+    ).all()
+
+    eligible = []
+    for pid, folio, status, buyer_name, phone in rows:
+        r = results[pid]
+        r.folio, r.buyer_name, r.buyer_phone_e164 = folio, buyer_name, phone
+        if status in action.allowed_from:
+            eligible.append(pid)
+        else:
+            r.message = f"Está {status.value}; no se puede {action.label.lower()}."
+
+    # 2. Compras: un UPDATE condicional por estado de origen.
+    purchase_changes = []
+    changed_ids = []
+    for old in action.allowed_from:
+        if not eligible:
+            break
+        ids = db.session.execute(
+            update(Purchase)
+            .where(Purchase.id.in_(eligible), Purchase.status == old)
+            .values(status=action.to_status, updated_at=now, **{action.timestamp_field: now})
+            .returning(Purchase.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        purchase_changes += [(old, action.to_status)] * len(ids)
+        changed_ids += ids
+
+    for pid in eligible:
+        if pid not in changed_ids:
+            results[pid].message = "Cambió de estado mientras se procesaba; revisa el folio."
+
+    # 3. Boletos de esas compras.
+    ticket_changes = []
+    board_changes = []
+    if changed_ids and action.ticket_status is not None:
+        ticket_ids = select(purchase_tickets.c.ticket_id).where(purchase_tickets.c.purchase_id.in_(changed_ids))
+        for old in TicketStatus:
+            if old == action.ticket_status:
+                continue
+            numbers = db.session.execute(
+                update(Ticket)
+                .where(Ticket.id.in_(ticket_ids), Ticket.status == old)
+                .values(status=action.ticket_status, updated_at=now)
+                .returning(Ticket.number)
+                .execution_options(synchronize_session=False)
+            ).scalars().all()
+            ticket_changes += [(old, action.ticket_status)] * len(numbers)
+            board_changes += [(n, action.ticket_status) for n in numbers]
+
+    if changed_ids:
+        numbers_by_purchase = {}
+        for pid, number in db.session.execute(
+            select(purchase_tickets.c.purchase_id, Ticket.number)
+            .join(Ticket, Ticket.id == purchase_tickets.c.ticket_id)
+            .where(purchase_tickets.c.purchase_id.in_(changed_ids))
+        ):
+            numbers_by_purchase.setdefault(pid, []).append(number)
+
+        for pid in changed_ids:
+            r = results[pid]
+            r.ok = True
+            r.message = f"{action.to_status.value}."
+            r.numbers = tuple(sorted(numbers_by_purchase.get(pid, [])))
+
+        # 4. Contadores, tablero y bitácora en la misma transacción.
+        apply_stats_delta(raffle, tickets=ticket_changes, purchases=purchase_changes)
+        if board_changes:
+            bump_board_version(raffle.id, board_changes)
+
+        record_audit_rows(
+            audit_row(action.audit_action, "Purchase", pid,
+                      {"folio": results[pid].folio, "bulk": True} if bulk else {"folio": results[pid].folio},
+                      admin_user_id=admin_user_id, ip_address=ip_address, created_at=now)
+            for pid in changed_ids
+        )
+
+    # Las filas cargadas antes en la sesión quedaron viejas.
+    db.session.expire_all()
+    return [results[pid] for pid in purchase_ids]
@@ -1,67 +1,57 @@
-import json
 from datetime import datetime
 
-from flask import Blueprint, render_template, redirect, url_for, flash, request, send_file
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash, request, send_file
 from flask_login import login_user, logout_user, login_required, current_user
-from sqlalchemy import and_
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload, load_only, selectinload
 
+from app.audit import audit_writer_info, queue_audit, record_audit
 from app.extensions import db, limiter
 from app.models import (
     AdminUser, AuditLog,
     Raffle, Ticket, TicketStatus,
     Purchase, PurchaseStatus,
-    Winners, generate_folio
+    ReportJob, ReportJobStatus,
+    Winners, generate_folio, purchase_tickets
 )
 from app.forms import (
     AdminLoginForm, AdminChangePasswordForm, AdminCreateUserForm, WinnerForm, AdminNoteForm,
-    ManualPurchaseForm
+    ManualPurchaseForm, MessageTemplatesForm
 )
-from app.security import validate_password_policy
-from app.admin.utils import build_whatsapp_paid_message, build_wa_link
-
-from io import BytesIO
-from openpyxl import Workbook
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+from app.security import client_ip, normalize_mx_phone, validate_password_policy
+from app.stats import apply_stats_delta, get_raffle_stats
+from app.board import bump_board_version
+from app.messages import MESSAGE_KINDS, get_message_set, load_message_bodies, message_cache_info, save_message_templates
+from app.metrics import endpoint_metrics, pool_metrics
+from app.page_cache import invalidate_page_cache, page_cache_info
+from app.pagination import filter_created_between, keyset_page, parse_day
+from app.raffles import get_active_raffle, active_raffle_cache_info, invalidate_active_raffle
+from app.report_jobs import REPORT_KINDS, artifact_path, enqueue_report, has_artifact, latest_fresh_job, recover_stale_jobs
+from app.reservations import ReservationError, reserve_tickets
+from app.transactions import unit_of_work
+from app.admin.bulk import BULK_ACTIONS, BULK_MAX_ITEMS, apply_bulk_transition, parse_purchase_ids
 
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
 
-def log_audit(action: str, entity_type: str = None, entity_id: int = None, meta: dict = None):
-    ip = request.headers.get("X-Forwarded-For", request.remote_addr)
-    entry = AuditLog(
-        admin_user_id=current_user.id if current_user.is_authenticated else None,
-        action=action,
-        entity_type=entity_type,
-        entity_id=entity_id,
-        meta_json=json.dumps(meta or {}, ensure_ascii=False),
-        ip_address=ip,
-    )
-    db.session.add(entry)
-    db.session.commit()
+def _audit_actor(admin_user_id=None) -> dict:
+    if admin_user_id is None and current_user.is_authenticated:
+        admin_user_id = current_user.id
+    return {
+        "admin_user_id": admin_user_id,
+        "ip_address": client_ip(),
+    }
 
 
-def begin_clean():
-    """
-    SQLAlchemy 2.x inicia transacción automática (autobegin) en el primer SELECT.
-    Si luego llamas session.begin() truena con:
-      InvalidRequestError: A transaction is already begun on this Session.
-
-    Solución: rollback para cerrar la transacción automática y abrir una controlada.
-    """
-    try:
-        db.session.rollback()
-    except Exception:
-        pass
-    return db.session.begin()
+def log_audit(action: str, entity_type: str = None, entity_id: int = None, meta: dict = None, admin_user_id: int = None):
+    """Llamar ANTES del commit: la entrada se confirma junto con la acción."""
+    record_audit(action, entity_type, entity_id, meta, **_audit_actor(admin_user_id))
 
 
-def get_active_raffle():
-    raffle = Raffle.query.filter_by(is_active=True).order_by(Raffle.id.desc()).first()
-    if not raffle:
-        raise RuntimeError("No hay rifa activa. Ejecuta 'flask seed'.")
-    return raffle
+def log_audit_async(action: str, entity_type: str = None, entity_id: int = None, meta: dict = None):
+    """Eventos sin transacción propia (descargas, logout): cola por lotes."""
+    queue_audit(action, entity_type, entity_id, meta, **_audit_actor())
 
 
 @admin_bp.route("/login", methods=["GET", "POST"])
@@ -92,17 +82,17 @@ def login():
 
     if not user.check_password(password):
         user.register_failed_login()
-        db.session.commit()
         log_audit("LOGIN_FAILED", "AdminUser", user.id, {"username": username})
+        db.session.commit()
         flash("Credenciales inválidas.", "error")
         return render_template("admin/login.html", form=form), 401
 
     user.reset_login_failures()
     user.last_login_at = datetime.utcnow()
+    log_audit("LOGIN_OK", "AdminUser", user.id, {"username": username}, admin_user_id=user.id)
     db.session.commit()
 
     login_user(user)
-    log_audit("LOGIN_OK", "AdminUser", user.id, {"username": username})
 
     if user.must_change_password:
         return redirect(url_for("admin.change_password"))
@@ -113,7 +103,7 @@ def login():
 @admin_bp.route("/logout")
 @login_required
 def logout():
-    log_audit("LOGOUT", "AdminUser", current_user.id, {"username": current_user.username})
+    log_audit_async("LOGOUT", "AdminUser", current_user.id, {"username": current_user.username})
     logout_user()
     return redirect(url_for("admin.login"))
 
@@ -144,8 +134,8 @@ def change_password():
 
     current_user.set_password(form.new_password.data)
     current_user.must_change_password = False
-    db.session.commit()
     log_audit("PASSWORD_CHANGED", "AdminUser", current_user.id, {"username": current_user.username})
+    db.session.commit()
     flash("Contraseña actualizada.", "success")
     return redirect(url_for("admin.dashboard"))
 
@@ -154,28 +144,34 @@ def change_password():
 @login_required
 def dashboard():
     raffle = get_active_raffle()
-    total = Ticket.query.filter_by(raffle_id=raffle.id).count()
-    free = Ticket.query.filter_by(raffle_id=raffle.id, status=TicketStatus.FREE).count()
-    reserved = Ticket.query.filter_by(raffle_id=raffle.id, status=TicketStatus.RESERVED).count()
-    paid = Ticket.query.filter_by(raffle_id=raffle.id, status=TicketStatus.PAID).count()
-
-    pending = Purchase.query.filter_by(raffle_id=raffle.id, status=PurchaseStatus.PENDING).count()
-    approved = Purchase.query.filter_by(raffle_id=raffle.id, status=PurchaseStatus.APPROVED).count()
-    paid_p = Purchase.query.filter_by(raffle_id=raffle.id, status=PurchaseStatus.PAID).count()
-
-    total_sold_mxn = paid * raffle.ticket_price_mxn
+    stats = get_raffle_stats(raffle)
 
     return render_template(
         "admin/dashboard.html",
         raffle=raffle,
-        total=total,
-        free=free,
-        reserved=reserved,
-        paid=paid,
-        pending=pending,
-        approved=approved,
-        paid_p=paid_p,
-        total_sold_mxn=total_sold_mxn
+        total=stats.total,
+        free=stats.free,
+        reserved=stats.reserved,
+        paid=stats.paid,
+        pending=stats.pending,
+        approved=stats.approved,
+        paid_p=stats.paid_purchases,
+        total_sold_mxn=stats.total_sold_mxn,
+    )
+
+
+@admin_bp.route("/metrics")
+@login_required
+def metrics():
+    return render_template(
+        "admin/metrics.html",
+        endpoints=endpoint_metrics(),
+        slow_ms=current_app.config.get("SLOW_REQUEST_MS", 0),
+        raffle_cache=active_raffle_cache_info(),
+        page_cache=page_cache_info(),
+        audit_writer=audit_writer_info(),
+        pool=pool_metrics(),
+        message_cache=message_cache_info(),
     )
 
 
@@ -233,18 +229,22 @@ def ticket_force_free(ticket_id: int):
         return redirect(url_for("admin.tickets_manage", q=ticket.number))
 
     try:
-        with begin_clean():
+        with unit_of_work():
+            ticket_changes = [(ticket.status, TicketStatus.FREE)]
+            purchase_changes = []
             ticket.status = TicketStatus.FREE
             if purchase and purchase.status in (PurchaseStatus.PENDING, PurchaseStatus.APPROVED):
+                purchase_changes.append((purchase.status, PurchaseStatus.CANCELLED))
                 purchase.status = PurchaseStatus.CANCELLED
                 purchase.cancelled_at = datetime.utcnow()
+            apply_stats_delta(raffle, tickets=ticket_changes, purchases=purchase_changes)
+            bump_board_version(raffle.id, [(ticket.number, TicketStatus.FREE)])
+            log_audit("TICKET_FORCE_FREE", "Ticket", ticket.id, {"ticket": ticket.number})
     except Exception:
-        db.session.rollback()
         flash("No se pudo liberar el boleto.", "error")
         return redirect(url_for("admin.tickets_manage", q=ticket.number))
 
-    log_audit("TICKET_FORCE_FREE", "Ticket", ticket.id, {"ticket": ticket.number})
-    flash(f"Boleto {ticket.number:02d} liberado.", "success")
+    flash(f"Boleto {raffle.format_number(ticket.number)} liberado.", "success")
     return redirect(url_for("admin.tickets_manage", q=ticket.number))
 
 
@@ -264,7 +264,7 @@ def manual_purchase():
         for p in parts:
             try:
                 n = int(p)
-                if 1 <= n <= 100:
+                if raffle.is_valid_number(n):
                     nums.append(n)
             except ValueError:
                 continue
@@ -313,23 +313,12 @@ def manual_purchase():
     buyer_name = form.buyer_name.data.strip()
     status = form.status.data  # APPROVED / PAID
     notes = (form.notes.data or "").strip()
-    ip_address = request.headers.get("X-Forwarded-For", request.remote_addr)
+    ip_address = client_ip()
 
     try:
-        with begin_clean():
-            selected_tickets = (
-                Ticket.query
-                .filter(and_(Ticket.raffle_id == raffle.id, Ticket.number.in_(numbers)))
-                .with_for_update()
-                .all()
-            )
-
-            if len(selected_tickets) != len(numbers):
-                raise ValueError("Uno o más boletos no existen.")
-
-            for t in selected_tickets:
-                if t.status != TicketStatus.FREE:
-                    raise ValueError(f"El boleto {t.number:02d} no está libre.")
+        with unit_of_work():
+            ticket_status = TicketStatus.PAID if status == "PAID" else TicketStatus.RESERVED
+            now = datetime.utcnow()
 
             folio = generate_folio()
             purchase = Purchase(
@@ -339,31 +328,34 @@ def manual_purchase():
                 buyer_phone_e164=phone_e164,
                 status=PurchaseStatus.PAID if status == "PAID" else PurchaseStatus.APPROVED,
                 ip_address=ip_address,
-                notes=notes or None
+                notes=notes or None,
+                paid_at=now if status == "PAID" else None,
+                approved_at=None if status == "PAID" else now,
             )
             db.session.add(purchase)
             db.session.flush()
 
-            now = datetime.utcnow()
-            if status == "PAID":
-                purchase.paid_at = now
-            else:
-                purchase.approved_at = now
+            # UPDATE condicional todo-o-nada (ver app.reservations)
+            reserve_tickets(raffle.id, numbers, purchase.id, ticket_status)
 
-            for t in selected_tickets:
-                t.status = TicketStatus.PAID if status == "PAID" else TicketStatus.RESERVED
-                purchase.tickets.append(t)
+            apply_stats_delta(
+                raffle,
+                tickets=[(TicketStatus.FREE, ticket_status)] * len(numbers),
+                purchases=[(None, purchase.status)],
+            )
+            bump_board_version(raffle.id, [(n, ticket_status) for n in numbers])
+            log_audit("MANUAL_PURCHASE_CREATED", "Purchase", purchase.id, {"folio": purchase.folio, "numbers": numbers, "status": status})
 
+    except ReservationError as e:
+        flash(f"El boleto {raffle.format_number(e.unavailable[0])} no está libre.", "error")
+        return redirect(url_for("admin.tickets_manage"))
     except ValueError as e:
-        db.session.rollback()
         flash(str(e), "error")
         return redirect(url_for("admin.tickets_manage"))
     except Exception:
-        db.session.rollback()
         flash("Error al registrar la venta.", "error")
         return redirect(url_for("admin.tickets_manage"))
 
-    log_audit("MANUAL_PURCHASE_CREATED", "Purchase", purchase.id, {"folio": purchase.folio, "numbers": numbers, "status": status})
     flash("Venta registrada. Se creó un folio y se actualizaron los boletos.", "success")
     return redirect(url_for("admin.purchase_detail", purchase_id=purchase.id))
 
@@ -373,13 +365,111 @@ def manual_purchase():
 def purchases():
     raffle = get_active_raffle()
     status = request.args.get("status", "").strip().upper()
-
-    q = Purchase.query.filter_by(raffle_id=raffle.id).order_by(Purchase.created_at.desc())
+    filters = {
+        "from": request.args.get("from", "").strip(),
+        "to": request.args.get("to", "").strip(),
+        "phone": request.args.get("phone", "").strip(),
+    }
+
+    # Un query para las compras (+ conteo y total como columnas) y un
+    # selectinload para los números; antes p.total_amount_mxn() cargaba
+    # p.raffle y p.tickets por fila.
+    ticket_count = (
+        select(func.count())
+        .select_from(purchase_tickets)
+        .where(purchase_tickets.c.purchase_id == Purchase.id)
+        .correlate(Purchase)
+        .scalar_subquery()
+    )
+    stmt = (
+        select(Purchase, ticket_count.label("ticket_count"), (ticket_count * Raffle.ticket_price_mxn).label("total_mxn"))
+        .join(Raffle, Raffle.id == Purchase.raffle_id)
+        .where(Purchase.raffle_id == raffle.id)
+        .options(selectinload(Purchase.tickets).options(load_only(Ticket.id, Ticket.number)))
+    )
     if status in PurchaseStatus.__members__:
-        q = q.filter_by(status=PurchaseStatus[status])
+        stmt = stmt.where(Purchase.status == PurchaseStatus[status])
+
+    if filters["phone"]:
+        try:
+            stmt = stmt.where(Purchase.buyer_phone_e164 == normalize_mx_phone(filters["phone"]))
+        except ValueError as e:
+            flash(str(e), "error")
+            filters["phone"] = ""
+
+    stmt = filter_created_between(stmt, Purchase.created_at, parse_day(filters["from"]), parse_day(filters["to"]))
+
+    items, next_cursor = keyset_page(db.session, stmt, Purchase.created_at, Purchase.id, request.args.get("cursor"))
+    return render_template(
+        "admin/purchases.html",
+        raffle=raffle,
+        items=items,
+        status=status,
+        filters={k: v for k, v in filters.items() if v},
+        next_cursor=next_cursor,
+        is_first_page=not request.args.get("cursor"),
+    )
+
+
+@admin_bp.route("/purchases/bulk", methods=["POST"])
+@login_required
+def purchases_bulk():
+    raffle = get_active_raffle()
+    action_key = request.form.get("action", "")
+    ids = parse_purchase_ids(request.form.getlist("ids"))
+
+    if action_key not in BULK_ACTIONS:
+        flash("Elige una acción.", "error")
+        return redirect(request.referrer or url_for("admin.purchases"))
+    if not ids:
+        flash("Selecciona al menos una compra.", "error")
+        return redirect(request.referrer or url_for("admin.purchases"))
+    if len(ids) > BULK_MAX_ITEMS:
+        flash(f"Máximo {BULK_MAX_ITEMS} compras por operación.", "error")
+        return redirect(request.referrer or url_for("admin.purchases"))
+
+    ip_address = client_ip()
+    try:
+        with unit_of_work():
+            results = apply_bulk_transition(
+                raffle, action_key, ids,
+                admin_user_id=current_user.id, ip_address=ip_address,
+            )
+    except Exception:
+        flash("No se pudo aplicar la acción; no se cambió ninguna compra.", "error")
+        return redirect(request.referrer or url_for("admin.purchases"))
+
+    wa_links = {}
+    kind = {"approve": "approved", "mark_paid": "paid"}.get(action_key)
+    if kind:
+        messages = get_message_set(raffle)
+        wa_links = {
+            r.purchase_id: messages.link(kind, r.buyer_phone_e164, r.buyer_name, r.folio, r.numbers)
+            for r in results if r.ok
+        }
+
+    back_url = request.form.get("back", "")
+    if not back_url.startswith("/") or back_url.startswith("//"):
+        back_url = url_for("admin.purchases")
+
+    done = sum(1 for r in results if r.ok)
+    flash(f"{BULK_ACTIONS[action_key].label}: {done} de {len(results)} compras.", "success" if done else "error")
+    return render_template(
+        "admin/bulk_result.html",
+        raffle=raffle,
+        action=BULK_ACTIONS[action_key],
+        results=results,
+        wa_links=wa_links,
+        back_url=back_url,
+    )
+
 
-    items = q.all()
-    return render_template("admin/purchases.html", raffle=raffle, items=items, status=status)
+# Mensajes de WhatsApp que ofrece el detalle según el estado de la compra.
+_WA_KINDS_BY_STATUS = {
+    PurchaseStatus.PENDING: ("reserved",),
+    PurchaseStatus.APPROVED: ("approved", "reminder"),
+    PurchaseStatus.PAID: ("paid",),
+}
 
 
 @admin_bp.route("/purchases/<int:purchase_id>", methods=["GET", "POST"])
@@ -392,23 +482,33 @@ def purchase_detail(purchase_id: int):
     if request.method == "POST":
         if note_form.validate_on_submit():
             purchase.notes = (note_form.notes.data or "").strip()
-            db.session.commit()
             log_audit("PURCHASE_NOTE_UPDATED", "Purchase", purchase.id, {"folio": purchase.folio})
+            db.session.commit()
             flash("Notas guardadas.", "success")
         else:
             flash("Notas inválidas.", "error")
 
-    wa_link = None
-    if purchase.status == PurchaseStatus.PAID:
-        msg = build_whatsapp_paid_message(
-            buyer_name=purchase.buyer_name,
-            folio=purchase.folio,
-            ticket_numbers=[t.number for t in purchase.tickets],
-            total_mxn=purchase.total_amount_mxn(),
-        )
-        wa_link = build_wa_link(purchase.buyer_phone_e164, msg)
+    messages = get_message_set(raffle)
+    wa_links = [
+        (MESSAGE_KINDS[kind], messages.purchase_link(kind, purchase))
+        for kind in _WA_KINDS_BY_STATUS.get(purchase.status, ())
+    ]
+
+    return render_template("admin/purchase_detail.html", raffle=raffle, purchase=purchase, wa_links=wa_links, note_form=note_form)
 
-    return render_template("admin/purchase_detail.html", raffle=raffle, purchase=purchase, wa_link=wa_link, note_form=note_form)
+
+def _single_transition(raffle, purchase_id: int, action_key: str, error_message: str):
+    """Una compra por el mismo UPDATE condicional que el lote (ver app.admin.bulk)."""
+    try:
+        with unit_of_work():
+            [result] = apply_bulk_transition(raffle, action_key, [purchase_id], bulk=False, **_audit_actor())
+    except Exception:
+        flash(error_message, "error")
+        return None
+    if not result.ok:
+        flash(result.message, "error")
+        return None
+    return result
 
 
 @admin_bp.route("/purchases/<int:purchase_id>/approve", methods=["POST"])
@@ -417,17 +517,9 @@ def purchase_approve(purchase_id: int):
     raffle = get_active_raffle()
     purchase = Purchase.query.filter_by(id=purchase_id, raffle_id=raffle.id).first_or_404()
 
-    if purchase.status != PurchaseStatus.PENDING:
-        flash("Solo puedes aprobar solicitudes PENDIENTES.", "error")
-        return redirect(url_for("admin.purchase_detail", purchase_id=purchase.id))
-
-    purchase.status = PurchaseStatus.APPROVED
-    purchase.approved_at = datetime.utcnow()
-    db.session.commit()
-
-    log_audit("PURCHASE_APPROVED", "Purchase", purchase.id, {"folio": purchase.folio})
-    flash("Solicitud aprobada (Apartado).", "success")
-    return redirect(url_for("admin.purchase_detail", purchase_id=purchase.id))
+    if _single_transition(raffle, purchase.id, "approve", "No se pudo aprobar."):
+        flash("Solicitud aprobada (Apartado).", "success")
+    return redirect(url_for("admin.purchase_detail", purchase_id=purchase_id))
 
 
 @admin_bp.route("/purchases/<int:purchase_id>/mark-paid", methods=["POST"])
@@ -436,24 +528,9 @@ def purchase_mark_paid(purchase_id: int):
     raffle = get_active_raffle()
     purchase = Purchase.query.filter_by(id=purchase_id, raffle_id=raffle.id).first_or_404()
 
-    if purchase.status not in (PurchaseStatus.PENDING, PurchaseStatus.APPROVED):
-        flash("Solo puedes marcar como pagado una solicitud pendiente o aprobada.", "error")
-        return redirect(url_for("admin.purchase_detail", purchase_id=purchase.id))
-
-    try:
-        with begin_clean():
-            for t in purchase.tickets:
-                t.status = TicketStatus.PAID
-            purchase.status = PurchaseStatus.PAID
-            purchase.paid_at = datetime.utcnow()
-    except Exception:
-        db.session.rollback()
-        flash("No se pudo marcar como pagado.", "error")
-        return redirect(url_for("admin.purchase_detail", purchase_id=purchase.id))
-
-    log_audit("PURCHASE_MARK_PAID", "Purchase", purchase.id, {"folio": purchase.folio})
-    flash("Compra marcada como PAGADA. Ya puedes enviar WhatsApp (1 click).", "success")
-    return redirect(url_for("admin.purchase_detail", purchase_id=purchase.id))
+    if _single_transition(raffle, purchase.id, "mark_paid", "No se pudo marcar como pagado."):
+        flash("Compra marcada como PAGADA. Ya puedes enviar WhatsApp (1 click).", "success")
+    return redirect(url_for("admin.purchase_detail", purchase_id=purchase_id))
 
 
 @admin_bp.route("/purchases/<int:purchase_id>/cancel", methods=["POST"])
@@ -462,26 +539,72 @@ def purchase_cancel(purchase_id: int):
     raffle = get_active_raffle()
     purchase = Purchase.query.filter_by(id=purchase_id, raffle_id=raffle.id).first_or_404()
 
-    if purchase.status == PurchaseStatus.PAID:
-        flash("No puedes cancelar una compra pagada desde aquí (por integridad).", "error")
-        return redirect(url_for("admin.purchase_detail", purchase_id=purchase.id))
-
-    try:
-        with begin_clean():
-            for t in purchase.tickets:
-                t.status = TicketStatus.FREE
-            purchase.status = PurchaseStatus.CANCELLED
-            purchase.cancelled_at = datetime.utcnow()
-    except Exception:
-        db.session.rollback()
-        flash("No se pudo cancelar.", "error")
-        return redirect(url_for("admin.purchase_detail", purchase_id=purchase.id))
-
-    log_audit("PURCHASE_CANCELLED", "Purchase", purchase.id, {"folio": purchase.folio})
+    if not _single_transition(raffle, purchase.id, "cancel", "No se pudo cancelar."):
+        return redirect(url_for("admin.purchase_detail", purchase_id=purchase_id))
     flash("Solicitud cancelada y boletos liberados.", "success")
     return redirect(url_for("admin.purchases"))
 
 
+@admin_bp.route("/messages", methods=["GET", "POST"])
+@login_required
+def messages():
+    raffle = get_active_raffle()
+    form = MessageTemplatesForm()
+    status_code = 200
+
+    if request.method == "POST":
+        if not form.validate_on_submit():
+            flash("Revisa los mensajes (máximo 2000 caracteres).", "error")
+            status_code = 400
+        else:
+            try:
+                with unit_of_work():
+                    changed = save_message_templates(raffle.id, {kind: getattr(form, kind).data for kind in MESSAGE_KINDS})
+                    if changed:
+                        log_audit("MESSAGE_TEMPLATES_UPDATED", "Raffle", raffle.id, {"kinds": changed})
+            except ValueError as e:
+                flash(str(e), "error")
+                status_code = 400
+            else:
+                if changed:
+                    invalidate_active_raffle()
+                flash("Mensajes guardados." if changed else "Sin cambios.", "success")
+                return redirect(url_for("admin.messages"))
+    else:
+        for kind, body in load_message_bodies(raffle.id).items():
+            getattr(form, kind).data = body
+
+    sample = get_message_set(raffle)
+    previews = {
+        kind: sample.render(kind, "Ana López", "RF26-EJEMPLO", [7, 23])
+        for kind in MESSAGE_KINDS
+    }
+    approved = get_raffle_stats(raffle).approved
+    return render_template(
+        "admin/messages.html", raffle=raffle, form=form, kinds=MESSAGE_KINDS, previews=previews, approved=approved,
+    ), status_code
+
+
+@admin_bp.route("/messages/reminders", methods=["GET"])
+@login_required
+def reminder_links():
+    raffle = get_active_raffle()
+    purchases = (
+        Purchase.query
+        .filter_by(raffle_id=raffle.id, status=PurchaseStatus.APPROVED)
+        .options(
+            load_only(Purchase.id, Purchase.folio, Purchase.buyer_name, Purchase.buyer_phone_e164,
+                      Purchase.created_at, Purchase.approved_at),
+            selectinload(Purchase.tickets).options(load_only(Ticket.id, Ticket.number)),
+        )
+        .order_by(Purchase.created_at, Purchase.id)
+        .all()
+    )
+    # Plantilla compilada una vez; por compra sólo se concatena y codifica.
+    rows = get_message_set(raffle).links("reminder", purchases)
+    return render_template("admin/reminder_links.html", raffle=raffle, rows=rows)
+
+
 @admin_bp.route("/admins", methods=["GET", "POST"])
 @login_required
 def admin_users():
@@ -508,9 +631,10 @@ def admin_users():
         new_u = AdminUser(username=username, must_change_password=True, is_active=True)
         new_u.set_password(temp_pw)
         db.session.add(new_u)
+        db.session.flush()
+        log_audit("ADMIN_CREATED", "AdminUser", new_u.id, {"username": username})
         db.session.commit()
 
-        log_audit("ADMIN_CREATED", "AdminUser", new_u.id, {"username": username})
         flash("Admin creado. Debe cambiar contraseña al primer login.", "success")
         return redirect(url_for("admin.admin_users"))
 
@@ -535,8 +659,11 @@ def winners():
             return render_template("admin/winners.html", raffle=raffle, form=form, winners=winners_row), 400
 
         nums = [form.first_ticket.data, form.second_ticket.data, form.third_ticket.data]
-        if any(n < 1 or n > 100 for n in nums):
-            flash("Los ganadores deben estar entre 01 y 100.", "error")
+        if not all(raffle.is_valid_number(n) for n in nums):
+            flash(
+                f"Los ganadores deben estar entre {raffle.format_number(1)} y {raffle.format_number(raffle.ticket_count)}.",
+                "error"
+            )
             return render_template("admin/winners.html", raffle=raffle, form=form, winners=winners_row), 400
         if len(set(nums)) != 3:
             flash("Los 3 ganadores deben ser distintos.", "error")
@@ -546,9 +673,10 @@ def winners():
         winners_row.second_ticket = nums[1]
         winners_row.third_ticket = nums[2]
         winners_row.published_at = datetime.utcnow()
+        log_audit("WINNERS_PUBLISHED", "Winners", winners_row.id, {"nums": nums})
         db.session.commit()
+        invalidate_page_cache()
 
-        log_audit("WINNERS_PUBLISHED", "Winners", winners_row.id, {"nums": nums})
         flash("Ganadores publicados.", "success")
         return redirect(url_for("admin.winners"))
 
@@ -563,118 +691,134 @@ def winners():
 @admin_bp.route("/audit")
 @login_required
 def audit():
-    logs = AuditLog.query.order_by(AuditLog.created_at.desc()).limit(300).all()
-    return render_template("admin/audit.html", logs=logs)
+    filters = {
+        "admin": request.args.get("admin", "").strip(),
+        "from": request.args.get("from", "").strip(),
+        "to": request.args.get("to", "").strip(),
+    }
+
+    stmt = select(AuditLog).options(joinedload(AuditLog.admin_user))
+    if filters["admin"].isdigit():
+        stmt = stmt.where(AuditLog.admin_user_id == int(filters["admin"]))
+    else:
+        filters["admin"] = ""
+
+    stmt = filter_created_between(stmt, AuditLog.created_at, parse_day(filters["from"]), parse_day(filters["to"]))
+
+    rows, next_cursor = keyset_page(db.session, stmt, AuditLog.created_at, AuditLog.id, request.args.get("cursor"))
+    admins = AdminUser.query.order_by(AdminUser.username).all()
+    return render_template(
+        "admin/audit.html",
+        logs=[r[0] for r in rows],
+        admins=admins,
+        filters={k: v for k, v in filters.items() if v},
+        next_cursor=next_cursor,
+        is_first_page=not request.args.get("cursor"),
+    )
 
 
 @admin_bp.route("/reports")
 @login_required
 def reports():
     raffle = get_active_raffle()
-    paid_tickets = Ticket.query.filter_by(raffle_id=raffle.id, status=TicketStatus.PAID).count()
-    reserved_tickets = Ticket.query.filter_by(raffle_id=raffle.id, status=TicketStatus.RESERVED).count()
-    free_tickets = Ticket.query.filter_by(raffle_id=raffle.id, status=TicketStatus.FREE).count()
-
-    total_sold_mxn = paid_tickets * raffle.ticket_price_mxn
-
-    paid_purchases = Purchase.query.filter_by(raffle_id=raffle.id, status=PurchaseStatus.PAID).count()
-    pending_purchases = Purchase.query.filter_by(raffle_id=raffle.id, status=PurchaseStatus.PENDING).count()
+    stats = get_raffle_stats(raffle)
+
+    recover_stale_jobs()
+    jobs = (
+        ReportJob.query
+        .filter_by(raffle_id=raffle.id)
+        .order_by(ReportJob.id.desc())
+        .limit(10)
+        .all()
+    )
 
     return render_template(
         "admin/reports.html",
         raffle=raffle,
-        paid_tickets=paid_tickets,
-        reserved_tickets=reserved_tickets,
-        free_tickets=free_tickets,
-        total_sold_mxn=total_sold_mxn,
-        paid_purchases=paid_purchases,
-        pending_purchases=pending_purchases
+        paid_tickets=stats.paid,
+        reserved_tickets=stats.reserved,
+        free_tickets=stats.free,
+        total_sold_mxn=stats.total_sold_mxn,
+        paid_purchases=stats.paid_purchases,
+        pending_purchases=stats.pending,
+        jobs=jobs,
+        pending_jobs=[j.id for j in jobs if j.status in (ReportJobStatus.QUEUED, ReportJobStatus.RUNNING)],
     )
 
 
-@admin_bp.route("/reports/export.xlsx")
+@admin_bp.route("/reports/jobs", methods=["POST"])
 @login_required
-def export_excel():
+def report_enqueue():
     raffle = get_active_raffle()
-    purchases = Purchase.query.filter_by(raffle_id=raffle.id).order_by(Purchase.created_at.desc()).all()
+    kind = request.form.get("kind", "")
+    if kind not in REPORT_KINDS:
+        flash("Tipo de reporte inválido.", "error")
+        return redirect(url_for("admin.reports"))
+
+    job, reused = enqueue_report(raffle.id, kind, requested_by_id=current_user.id)
+    if reused and job.status == ReportJobStatus.DONE:
+        flash("No hay cambios desde el último reporte: ya puedes descargarlo.", "success")
+    elif reused:
+        flash("Ese reporte ya se está generando.", "success")
+    else:
+        flash("Reporte en cola. Esta página se actualiza sola cuando esté listo.", "success")
+    return redirect(url_for("admin.reports"))
+
+
+@admin_bp.route("/reports/jobs/<int:job_id>.json")
+@login_required
+def report_status(job_id: int):
+    job = ReportJob.query.filter_by(id=job_id).first_or_404()
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status.value,
+        "size": job.artifact_size,
+        "error": job.error,
+        "download_url": (
+            url_for("admin.report_download", job_id=job.id)
+            if has_artifact(job) else None
+        ),
+    }
+
+
+@admin_bp.route("/reports/jobs/<int:job_id>/download")
+@login_required
+def report_download(job_id: int):
+    job = ReportJob.query.filter_by(id=job_id).first_or_404()
+    _, mimetype, filename = REPORT_KINDS[job.kind]
+    try:
+        if not has_artifact(job):
+            raise FileNotFoundError(job_id)
+        # run_job() puede borrar el archivo entre el chequeo y aquí.
+        resp = send_file(artifact_path(job), as_attachment=True, download_name=filename, mimetype=mimetype)
+    except FileNotFoundError:
+        flash("Ese reporte ya no está disponible; genera uno nuevo.", "error")
+        return redirect(url_for("admin.reports"))
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Compras"
+    log_audit_async("REPORT_EXCEL" if job.kind == "xlsx" else "REPORT_PDF", "Raffle", job.raffle_id, {"job": job.id})
+    return resp
 
-    ws.append(["Folio", "Nombre", "WhatsApp", "Estado", "Boletos", "Total MXN", "Creado", "Pagado", "Notas"])
 
-    for p in purchases:
-        nums = ", ".join([f"{t.number:02d}" for t in sorted(p.tickets, key=lambda x: x.number)])
-        ws.append([
-            p.folio,
-            p.buyer_name,
-            f"+{p.buyer_phone_e164}",
-            p.status.value,
-            nums,
-            p.total_amount_mxn(),
-            p.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-            p.paid_at.strftime("%Y-%m-%d %H:%M:%S") if p.paid_at else "",
-            (p.notes or "")[:500],
-        ])
+def _export(kind: str):
+    # Enlaces viejos: descargan el último archivo vigente o lo mandan generar.
+    raffle = get_active_raffle()
+    job = latest_fresh_job(raffle.id, kind)
+    if job is not None:
+        return redirect(url_for("admin.report_download", job_id=job.id))
+
+    enqueue_report(raffle.id, kind, requested_by_id=current_user.id)
+    flash("Reporte en cola. Esta página se actualiza sola cuando esté listo.", "success")
+    return redirect(url_for("admin.reports"))
 
-    out = BytesIO()
-    wb.save(out)
-    out.seek(0)
 
-    log_audit("REPORT_EXCEL", "Raffle", raffle.id, {})
-    return send_file(out, as_attachment=True, download_name="reporte_compras.xlsx", mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+@admin_bp.route("/reports/export.xlsx")
+@login_required
+def export_excel():
+    return _export("xlsx")
 
 
 @admin_bp.route("/reports/export.pdf")
 @login_required
 def export_pdf():
-    raffle = get_active_raffle()
-    purchases = Purchase.query.filter_by(raffle_id=raffle.id).order_by(Purchase.created_at.desc()).all()
-
-    out = BytesIO()
-    c = canvas.Canvas(out, pagesize=letter)
-
-    y = letter[1] - 40
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(40, y, f"Reporte de Compras - {raffle.name}")
-    y -= 18
-    c.setFont("Helvetica", 10)
-    c.drawString(40, y, f"Generado: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC")
-    y -= 22
-
-    c.setFont("Helvetica-Bold", 9)
-    c.drawString(40, y, "Folio")
-    c.drawString(120, y, "Nombre")
-    c.drawString(280, y, "Estado")
-    c.drawString(350, y, "Boletos")
-    c.drawString(470, y, "Total")
-    y -= 14
-    c.setFont("Helvetica", 8)
-
-    for p in purchases:
-        if y < 60:
-            c.showPage()
-            y = letter[1] - 40
-            c.setFont("Helvetica-Bold", 9)
-            c.drawString(40, y, "Folio")
-            c.drawString(120, y, "Nombre")
-            c.drawString(280, y, "Estado")
-            c.drawString(350, y, "Boletos")
-            c.drawString(470, y, "Total")
-            y -= 14
-            c.setFont("Helvetica", 8)
-
-        nums = ", ".join([f"{t.number:02d}" for t in sorted(p.tickets, key=lambda x: x.number)])
-        c.drawString(40, y, p.folio)
-        c.drawString(120, y, p.buyer_name[:24])
-        c.drawString(280, y, p.status.value)
-        c.drawString(350, y, nums[:18] + ("…" if len(nums) > 18 else ""))
-        c.drawRightString(520, y, f"${p.total_amount_mxn()} MXN")
-        y -= 12
-
-    c.save()
-    out.seek(0)
-
-    log_audit("REPORT_PDF", "Raffle", raffle.id, {})
-    return send_file(out, as_attachment=True, download_name="reporte_compras.pdf", mimetype="application/pdf")
\ No newline at end of file
+    return _export("pdf")
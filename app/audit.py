@@ -0,0 +1,219 @@
+"""
+Bitácora de acciones de admin (tabla audit_logs).
+
+Dos caminos:
+  - record_audit() / record_audit_rows(): la fila entra a la sesión DENTRO de
+    la transacción del llamador y se confirma o se descarta junto con el
+    cambio que describe. Sin segundo commit, y sin bitácoras de "aprobada"
+    para un UPDATE que hizo rollback.
+  - queue_audit(): eventos no críticos sin transacción propia (descargas de
+    reportes, logout). Van a una cola en memoria acotada (AUDIT_QUEUE_SIZE)
+    que un hilo por worker vacía con un INSERT multi-fila al juntar
+    AUDIT_BATCH_SIZE o cada AUDIT_FLUSH_SECONDS. Con la cola llena el evento
+    se descarta y se cuenta (audit_writer_info()); nunca bloquea la respuesta.
+
+Al salir el proceso (atexit) AuditWriter.close() le manda al hilo una marca
+de fin y lo espera: el hilo escribe el lote que ya tenía tomado (si no, ese
+lote moría con el hilo daemon) y lo que quede en la cola se escribe después
+desde el hilo que está cerrando.
+
+Con AUDIT_ASYNC_ENABLED=0, queue_audit() escribe en el momento con su propio
+commit (útil en scripts y pruebas).
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import insert
+
+from app.extensions import db
+from app.models import AuditLog
+
+
+log = logging.getLogger(__name__)
+
+_IP_MAX = AuditLog.__table__.c.ip_address.type.length
+
+# Con la cola llena, un aviso en el log por minuto (el total va en los contadores).
+_DROP_LOG_EVERY_SECONDS = 60
+
+# Cuánto espera close() a que el hilo escriba su último lote.
+_CLOSE_TIMEOUT_SECONDS = 10
+
+_STOP = object()  # marca de fin en la cola
+
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+
+def audit_row(action: str, entity_type: str = None, entity_id: int = None, meta: dict = None,
+              admin_user_id: int = None, ip_address: str = None, created_at: datetime = None) -> dict:
+    # Recortada al largo de la columna: un valor raro no debe tumbar la
+    # transacción del negocio.
+    return {
+        "admin_user_id": admin_user_id,
+        "action": action,
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "meta_json": json.dumps(meta or {}, ensure_ascii=False),
+        "ip_address": (ip_address or "")[:_IP_MAX] or None,
+        "created_at": created_at or datetime.utcnow(),
+    }
+
+
+def record_audit(action: str, entity_type: str = None, entity_id: int = None, meta: dict = None,
+                 admin_user_id: int = None, ip_address: str = None) -> None:
+    """Agrega la entrada a la transacción en curso (no hace commit)."""
+    db.session.add(AuditLog(**audit_row(action, entity_type, entity_id, meta, admin_user_id, ip_address)))
+
+
+def record_audit_rows(rows) -> None:
+    """Varias entradas (de audit_row) con un solo INSERT, dentro de la transacción en curso."""
+    rows = list(rows)
+    if rows:
+        db.session.execute(insert(AuditLog), rows)
+
+
+class AuditWriter:
+    """Cola acotada + hilo que escribe por lotes. Uno por proceso."""
+
+    def __init__(self, app, max_queue: int, batch_size: int, flush_seconds: float) -> None:
+        self._app = app
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._batch_size = max(1, batch_size)
+        self._flush_seconds = max(0.05, flush_seconds)
+        self._write_lock = threading.Lock()
+        self._counters_lock = threading.Lock()
+        self._counters = {"queued": 0, "written": 0, "dropped": 0, "failed": 0, "batches": 0}
+        self._last_drop_log = float("-inf")
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, row: dict) -> bool:
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self._count("dropped")
+            now = time.monotonic()
+            if now - self._last_drop_log >= _DROP_LOG_EVERY_SECONDS:
+                self._last_drop_log = now
+                log.warning("Bitácora: cola llena, descartando eventos (%s en total)", self.info()["dropped"])
+            return False
+        self._count("queued")
+        return True
+
+    def flush(self) -> None:
+        """Escribe en este hilo lo que siga en la cola."""
+        while True:
+            batch = self._take(block=False)
+            if not batch:
+                return
+            self._write(batch)
+
+    def close(self, timeout: float = _CLOSE_TIMEOUT_SECONDS) -> None:
+        """Al apagar el proceso: el hilo termina su lote en curso y sale; el resto se escribe aquí."""
+        if self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+        self.flush()
+
+    def info(self) -> dict:
+        with self._counters_lock:
+            info = dict(self._counters)
+        info["pending"] = self._queue.qsize()
+        info["capacity"] = self._queue.maxsize
+        return info
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._counters_lock:
+            self._counters[key] += n
+
+    def _take(self, block: bool) -> list:
+        batch = []
+        deadline = None
+        while len(batch) < self._batch_size:
+            try:
+                if deadline is None:
+                    item = self._queue.get(block=block)
+                    deadline = time.monotonic() + self._flush_seconds
+                else:
+                    remaining = deadline - time.monotonic() if block else 0
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._stopped = True
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while not self._stopped:
+            self._write(self._take(block=True))
+
+    def _write(self, batch: list) -> None:
+        if not batch:
+            return
+        with self._write_lock, self._app.app_context():
+            try:
+                db.session.execute(insert(AuditLog), batch)
+                db.session.commit()
+                self._count("written", len(batch))
+                self._count("batches")
+            except Exception:
+                db.session.rollback()
+                self._count("failed", len(batch))
+                log.exception("Bitácora: no se pudo escribir un lote de %s entradas", len(batch))
+            finally:
+                db.session.remove()
+
+
+def _get_writer():
+    global _writer, _writer_pid
+    # Uno por proceso: el hilo de un padre pre-fork no existe en el hijo.
+    if _writer is None or _writer_pid != os.getpid():
+        with _writer_lock:
+            if _writer is None or _writer_pid != os.getpid():
+                cfg = current_app.config
+                _writer = AuditWriter(
+                    current_app._get_current_object(),
+                    max_queue=cfg.get("AUDIT_QUEUE_SIZE", 1000),
+                    batch_size=cfg.get("AUDIT_BATCH_SIZE", 50),
+                    flush_seconds=cfg.get("AUDIT_FLUSH_SECONDS", 2),
+                )
+                _writer_pid = os.getpid()
+                atexit.register(_writer.close)
+    return _writer
+
+
+def queue_audit(action: str, entity_type: str = None, entity_id: int = None, meta: dict = None,
+                admin_user_id: int = None, ip_address: str = None) -> bool:
+    """
+    Evento no crítico, fuera de cualquier transacción. Devuelve False si se
+    descartó por cola llena.
+    """
+    row = audit_row(action, entity_type, entity_id, meta, admin_user_id, ip_address)
+
+    if not current_app.config.get("AUDIT_ASYNC_ENABLED", True):
+        db.session.execute(insert(AuditLog), [row])
+        db.session.commit()
+        return True
+
+    return _get_writer().submit(row)
+
+
+def audit_writer_info() -> dict:
+    if _writer is None or _writer_pid != os.getpid():
+        return {"queued": 0, "written": 0, "dropped": 0, "failed": 0, "batches": 0, "pending": 0, "capacity": 0}
+    return _writer.info()
@@ -0,0 +1,368 @@
+"""
+Benchmarks internos (se corren con `flask bench ...`).
+No son parte de la app web; sirven para medir antes/después de cada optimización.
+"""
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import delete, event, func, select, update
+
+from app.extensions import db
+from app.models import (
+    Raffle, RaffleCounters, Ticket, TicketStatus, Purchase, PurchaseStatus, purchase_tickets, generate_folio
+)
+from app.reservations import ReservationError, reserve_tickets
+from app.stats import compute_raffle_stats, get_raffle_stats, rebuild_raffle_stats
+
+
+class QueryCounter:
+    """Cuenta sentencias SQL ejecutadas por el engine mientras está activo."""
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+@contextmanager
+def count_queries(engine=None):
+    engine = engine or db.engine
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter._on_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter._on_execute)
+
+
+def _percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _measure(fn, iterations: int) -> dict:
+    timings = []
+    with count_queries() as counter:
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - t0) * 1000.0)
+    return {
+        "queries_per_call": counter.count / float(iterations),
+        "mean_ms": statistics.mean(timings),
+        "p50_ms": _percentile(timings, 50),
+        "p95_ms": _percentile(timings, 95),
+    }
+
+
+def _legacy_counts(raffle) -> dict:
+    """Réplica de lo que hacían dashboard/reports antes de app.stats (7 COUNT)."""
+    return {
+        "total": Ticket.query.filter_by(raffle_id=raffle.id).count(),
+        "free": Ticket.query.filter_by(raffle_id=raffle.id, status=TicketStatus.FREE).count(),
+        "reserved": Ticket.query.filter_by(raffle_id=raffle.id, status=TicketStatus.RESERVED).count(),
+        "paid": Ticket.query.filter_by(raffle_id=raffle.id, status=TicketStatus.PAID).count(),
+        "pending": Purchase.query.filter_by(raffle_id=raffle.id, status=PurchaseStatus.PENDING).count(),
+        "approved": Purchase.query.filter_by(raffle_id=raffle.id, status=PurchaseStatus.APPROVED).count(),
+        "paid_p": Purchase.query.filter_by(raffle_id=raffle.id, status=PurchaseStatus.PAID).count(),
+    }
+
+
+def bench_stats(raffle, iterations: int = 200) -> dict:
+    return {
+        "legacy_counts": _measure(lambda: _legacy_counts(raffle), iterations),
+        "grouped_stats": _measure(lambda: compute_raffle_stats(raffle), iterations),
+        "raffle_stats_row": _measure(lambda: get_raffle_stats(raffle), iterations),
+    }
+
+
+# --- Apartado concurrente -------------------------------------------------
+
+def _new_purchase(raffle_id: int) -> Purchase:
+    purchase = Purchase(
+        raffle_id=raffle_id,
+        folio=generate_folio(),
+        buyer_name="bench",
+        buyer_phone_e164="520000000000",
+        status=PurchaseStatus.PENDING,
+    )
+    db.session.add(purchase)
+    db.session.flush()
+    return purchase
+
+
+def _reserve_legacy(raffle_id: int, numbers) -> None:
+    """Camino anterior: SELECT ... FOR UPDATE + ciclo ORM."""
+    with db.session.begin():
+        tickets = (
+            Ticket.query
+            .filter(Ticket.raffle_id == raffle_id, Ticket.number.in_(numbers))
+            .with_for_update()
+            .all()
+        )
+        if len(tickets) != len(numbers) or any(t.status != TicketStatus.FREE for t in tickets):
+            raise ReservationError([t.number for t in tickets if t.status != TicketStatus.FREE])
+
+        purchase = _new_purchase(raffle_id)
+        for t in tickets:
+            t.status = TicketStatus.RESERVED
+            purchase.tickets.append(t)
+
+
+def _reserve_conditional(raffle_id: int, numbers) -> None:
+    """Camino nuevo: UPDATE ... WHERE status='FREE' RETURNING (app.reservations)."""
+    with db.session.begin():
+        purchase = _new_purchase(raffle_id)
+        reserve_tickets(raffle_id, numbers, purchase.id)
+
+
+RESERVE_MODES = {
+    "legacy_for_update": _reserve_legacy,
+    "conditional_update": _reserve_conditional,
+}
+
+
+def double_sold_tickets(raffle_id: int) -> int:
+    """Boletos ligados a más de una compra no cancelada (debe ser 0)."""
+    per_ticket = (
+        select(purchase_tickets.c.ticket_id)
+        .join(Purchase, Purchase.id == purchase_tickets.c.purchase_id)
+        .where(Purchase.raffle_id == raffle_id, Purchase.status != PurchaseStatus.CANCELLED)
+        .group_by(purchase_tickets.c.ticket_id)
+        .having(func.count() > 1)
+        .subquery()
+    )
+    return db.session.execute(select(func.count()).select_from(per_ticket)).scalar_one()
+
+
+def create_scratch_raffle(tickets: int) -> int:
+    """Rifa INACTIVA sólo para benchmarks (no afecta a la rifa pública)."""
+    from app.cli import seed_tickets
+
+    raffle = Raffle(
+        name="bench",
+        organizer_name="bench",
+        organizer_location="bench",
+        whatsapp_phone_e164="520000000000",
+        ticket_count=tickets,
+        draw_at_local=datetime.utcnow(),
+        is_active=False,
+    )
+    db.session.add(raffle)
+    db.session.commit()
+    seed_tickets(raffle)
+    return raffle.id
+
+
+def reset_scratch_raffle(raffle_id: int, drop: bool = False) -> None:
+    purchase_ids = select(Purchase.id).where(Purchase.raffle_id == raffle_id)
+    db.session.execute(delete(purchase_tickets).where(purchase_tickets.c.purchase_id.in_(purchase_ids)))
+    db.session.execute(delete(Purchase).where(Purchase.raffle_id == raffle_id))
+    if drop:
+        db.session.execute(delete(RaffleCounters).where(RaffleCounters.raffle_id == raffle_id))
+        db.session.execute(delete(Ticket).where(Ticket.raffle_id == raffle_id))
+        db.session.execute(delete(Raffle).where(Raffle.id == raffle_id))
+    else:
+        db.session.execute(
+            update(Ticket).where(Ticket.raffle_id == raffle_id).values(status=TicketStatus.FREE)
+        )
+        rebuild_raffle_stats(db.session.get(Raffle, raffle_id))
+    db.session.commit()
+
+
+def bench_reserve(app, threads: int = 8, attempts: int = 400, pool: int = 30, per_buyer: int = 3,
+                  seed: int = 1234) -> dict:
+    """
+    Muchos hilos intentan apartar `per_buyer` boletos al azar de un pool chico
+    (`pool` números) para forzar colisiones. Mismo orden de intentos en ambos modos.
+    """
+    rng = random.Random(seed)
+    plan = [sorted(rng.sample(range(1, pool + 1), per_buyer)) for _ in range(attempts)]
+
+    raffle_id = create_scratch_raffle(pool)
+    results = {}
+    try:
+        for mode, fn in RESERVE_MODES.items():
+            reset_scratch_raffle(raffle_id)
+            outcome = {"ok": 0, "conflict": 0, "error": 0}
+            timings = []
+            lock = threading.Lock()
+
+            def attempt(numbers):
+                with app.app_context():
+                    t0 = time.perf_counter()
+                    try:
+                        fn(raffle_id, numbers)
+                        key = "ok"
+                    except ReservationError:
+                        key = "conflict"
+                    except Exception:
+                        key = "error"
+                    elapsed = (time.perf_counter() - t0) * 1000.0
+                    with lock:
+                        outcome[key] += 1
+                        timings.append(elapsed)
+
+            t_start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as ex:
+                list(ex.map(attempt, plan))
+            wall = time.perf_counter() - t_start
+
+            reserved = db.session.execute(
+                select(func.count()).select_from(Ticket)
+                .where(Ticket.raffle_id == raffle_id, Ticket.status != TicketStatus.FREE)
+            ).scalar_one()
+
+            results[mode] = dict(
+                outcome,
+                attempts_per_s=len(plan) / wall,
+                p50_ms=_percentile(timings, 50),
+                p95_ms=_percentile(timings, 95),
+                double_sold=double_sold_tickets(raffle_id),
+                reserved_tickets=reserved,
+                expected_reserved=outcome["ok"] * per_buyer,
+            )
+            db.session.rollback()
+    finally:
+        reset_scratch_raffle(raffle_id, drop=True)
+
+    return results
+
+
+# --- Carga HTTP sobre POST /solicitar ---------------------------------------
+
+class StatementTimer:
+    """Duración de cada sentencia cuyo SQL empieza con `prefix` (p.ej. el
+    UPDATE de apartado: en Postgres incluye la espera por row locks)."""
+
+    def __init__(self, prefix: str) -> None:
+        self.prefix = prefix.upper()
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(self.prefix):
+            conn.info.setdefault("stmt_t0", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(self.prefix):
+            stack = conn.info.get("stmt_t0")
+            if stack:
+                elapsed = (time.perf_counter() - stack.pop()) * 1000.0
+                with self._lock:
+                    self.samples.append(elapsed)
+
+    @contextmanager
+    def attach(self, engine):
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+        try:
+            yield self
+        finally:
+            event.remove(engine, "before_cursor_execute", self._before)
+            event.remove(engine, "after_cursor_execute", self._after)
+
+
+def ticket_invariants(raffle_id: int) -> dict:
+    """
+    - double_sold: boletos en 2+ compras no canceladas (debe ser 0)
+    - orphan_taken: boletos no-FREE sin compra viva (debe ser 0)
+    - free_but_sold: boletos FREE ligados a una compra viva (debe ser 0)
+    - stats_drift: columnas de raffle_stats que no cuadran con el recuento (debe ser 0)
+    """
+    live = (
+        select(purchase_tickets.c.ticket_id)
+        .join(Purchase, Purchase.id == purchase_tickets.c.purchase_id)
+        .where(Purchase.raffle_id == raffle_id, Purchase.status != PurchaseStatus.CANCELLED)
+    )
+    orphan_taken = db.session.execute(
+        select(func.count()).select_from(Ticket).where(
+            Ticket.raffle_id == raffle_id,
+            Ticket.status != TicketStatus.FREE,
+            Ticket.id.not_in(live),
+        )
+    ).scalar_one()
+    free_but_sold = db.session.execute(
+        select(func.count()).select_from(Ticket).where(
+            Ticket.raffle_id == raffle_id,
+            Ticket.status == TicketStatus.FREE,
+            Ticket.id.in_(live),
+        )
+    ).scalar_one()
+    return {
+        "double_sold": double_sold_tickets(raffle_id),
+        "orphan_taken": orphan_taken,
+        "free_but_sold": free_but_sold,
+        "stats_drift": len(rebuild_raffle_stats(db.session.get(Raffle, raffle_id), write=False)),
+    }
+
+
+def run_purchase_load(app, raffle_id: int, buyers: int = 200, concurrency: int = 16, pool: int = 30,
+                      per_buyer: int = 3, seed: int = 1234) -> dict:
+    """
+    `buyers` compradores simulados (cada uno con su WhatsApp) disparan POST
+    /solicitar contra `concurrency` hilos, pidiendo `per_buyer` números de un
+    pool de `pool` para que se encimen. La app debe tener CSRF y rate limit
+    apagados (ver loadtest.py).
+    """
+    rng = random.Random(seed)
+    plan = [
+        (f"55{i:08d}", sorted(rng.sample(range(1, pool + 1), per_buyer)))
+        for i in range(buyers)
+    ]
+
+    codes = {}
+    timings = []
+    lock = threading.Lock()
+    local = threading.local()
+
+    def buy(item):
+        phone, numbers = item
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+
+        t0 = time.perf_counter()
+        resp = client.post("/solicitar", data={
+            "buyer_name": "Carga",
+            "buyer_phone": phone,
+            "ticket_numbers": ",".join(str(n) for n in numbers),
+            "confirm_age": "y",
+            "accept_terms": "y",
+        })
+        elapsed = (time.perf_counter() - t0) * 1000.0
+        with lock:
+            codes[resp.status_code] = codes.get(resp.status_code, 0) + 1
+            timings.append(elapsed)
+
+    timer = StatementTimer("UPDATE tickets")
+    with timer.attach(db.engine):
+        t_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as ex:
+            list(ex.map(buy, plan))
+        wall = time.perf_counter() - t_start
+
+    db.session.rollback()
+    return {
+        "requests": len(plan),
+        "wall_s": wall,
+        "throughput_rps": len(plan) / wall if wall else 0.0,
+        "status_codes": dict(sorted(codes.items())),
+        "p50_ms": _percentile(timings, 50),
+        "p95_ms": _percentile(timings, 95),
+        "p99_ms": _percentile(timings, 99),
+        "lock_wait_p50_ms": _percentile(timer.samples, 50),
+        "lock_wait_p95_ms": _percentile(timer.samples, 95),
+        "lock_wait_p99_ms": _percentile(timer.samples, 99),
+        "lock_wait_total_ms": sum(timer.samples),
+        "invariants": ticket_invariants(raffle_id),
+    }
@@ -0,0 +1,147 @@
+"""
+Tablero público (/api/tickets).
+
+Cada cambio de Ticket.status incrementa Raffle.board_version en la MISMA
+transacción (bump_board_version). El endpoint usa esa versión como ETag y
+como llave de una caché en memoria con el JSON ya codificado, así que la
+mayoría de los polls se responden con 304 o con bytes pre-armados sin tocar
+la tabla tickets.
+
+Formatos:
+  - "json": {"raffle_id", "version", "tickets": [{"n": 1, "s": "FREE"}, ...]}
+  - "bits": {"raffle_id", "version", "first", "count", "bits"} donde "bits" es
+    base64 de 2 bits por boleto (ver STATUS_CODES), 4 boletos por byte; el
+    boleto `first + i` va en el byte i // 4, bits (i % 4) * 2.
+    ~30 bytes de bits para 100 boletos, ~2.5 KB para 10,000.
+"""
+import base64
+import json
+import threading
+from dataclasses import dataclass
+
+from sqlalchemy import select, update
+
+from app.events import queue_board_delta
+from app.extensions import db
+from app.models import Raffle, Ticket, TicketStatus
+
+
+FORMAT_JSON = "json"
+FORMAT_BITS = "bits"
+BITS_MIMETYPE = "application/vnd.rifa.board-bits+json"
+
+# 3 = número inexistente (hueco en la numeración)
+STATUS_CODES = {
+    TicketStatus.FREE: 0,
+    TicketStatus.RESERVED: 1,
+    TicketStatus.PAID: 2,
+}
+MISSING_CODE = 3
+
+
+def board_etag(raffle_id: int, version: int, fmt: str = FORMAT_JSON) -> str:
+    if fmt == FORMAT_BITS:
+        return f"b{raffle_id}-{version}-bits"
+    return f"b{raffle_id}-{version}"
+
+
+@dataclass(frozen=True)
+class BoardSnapshot:
+    raffle_id: int
+    version: int
+    json_body: bytes
+    bits_body: bytes
+
+    def body(self, fmt: str = FORMAT_JSON) -> bytes:
+        return self.bits_body if fmt == FORMAT_BITS else self.json_body
+
+
+_cache = {}  # raffle_id -> BoardSnapshot (solo la versión más reciente)
+_lock = threading.Lock()
+
+
+def current_board_version(raffle_id: int) -> int:
+    """Lookup por PK (la rifa activa viene de una caché con TTL; su board_version puede estar vieja)."""
+    return db.session.execute(
+        select(Raffle.board_version).where(Raffle.id == raffle_id)
+    ).scalar_one()
+
+
+def bump_board_version(raffle_id: int, changes=None) -> int:
+    """
+    Llamar DENTRO de la transacción que cambia el status de los boletos.
+    changes: [(number, nuevo TicketStatus)] para el push SSE (app.events);
+    None = los clientes deben recargar el tablero completo.
+    Devuelve la nueva versión.
+    """
+    version = db.session.execute(
+        update(Raffle)
+        .where(Raffle.id == raffle_id)
+        .values(board_version=Raffle.board_version + 1)
+        .returning(Raffle.board_version)
+        .execution_options(synchronize_session=False)
+    ).scalar_one()
+
+    queue_board_delta(raffle_id, version, changes)
+    return version
+
+
+def encode_bits(rows) -> tuple:
+    """rows: [(number, TicketStatus)] ordenados. Devuelve (first, count, base64)."""
+    if not rows:
+        return 1, 0, ""
+
+    first = rows[0][0]
+    count = rows[-1][0] - first + 1
+    packed = bytearray(b"\xff" * ((count + 3) // 4))  # todo MISSING_CODE
+
+    for number, status in rows:
+        i = number - first
+        shift = (i & 3) * 2
+        byte = packed[i >> 2] & ~(0b11 << shift)
+        packed[i >> 2] = byte | (STATUS_CODES[status] << shift)
+
+    return first, count, base64.b64encode(bytes(packed)).decode("ascii")
+
+
+def _build_snapshot(raffle_id: int, version: int) -> BoardSnapshot:
+    rows = db.session.execute(
+        select(Ticket.number, Ticket.status)
+        .where(Ticket.raffle_id == raffle_id)
+        .order_by(Ticket.number.asc())
+    ).all()
+
+    json_payload = {
+        "raffle_id": raffle_id,
+        "version": version,
+        "tickets": [{"n": n, "s": s.value} for n, s in rows],
+    }
+
+    first, count, bits = encode_bits(rows)
+    bits_payload = {
+        "raffle_id": raffle_id,
+        "version": version,
+        "first": first,
+        "count": count,
+        "bits": bits,
+    }
+
+    return BoardSnapshot(
+        raffle_id=raffle_id,
+        version=version,
+        json_body=json.dumps(json_payload, separators=(",", ":")).encode("utf-8"),
+        bits_body=json.dumps(bits_payload, separators=(",", ":")).encode("utf-8"),
+    )
+
+
+def get_board_snapshot(raffle_id: int, version: int) -> BoardSnapshot:
+    snap = _cache.get(raffle_id)
+    if snap is not None and snap.version == version:
+        return snap
+
+    snap = _build_snapshot(raffle_id, version)
+    with _lock:
+        current = _cache.get(raffle_id)
+        if current is None or current.version <= version:
+            _cache[raffle_id] = snap
+    return snap
@@ -1,21 +1,81 @@
 import os
+import time
 from datetime import datetime
 
 from flask import current_app
 from flask.cli import with_appcontext
 import click
+from sqlalchemy import func, insert, select
 
+from app.board import bump_board_version
 from app.extensions import db
+from app.raffles import invalidate_active_raffle
+from app.stats import rebuild_raffle_stats
 from app.models import Raffle, Ticket, TicketStatus, AdminUser, Winners
 
 
+_SEED_CHUNK = 5000  # 5 columnas x 5,000 filas < 65,535 parámetros por sentencia en Postgres
+
+
+def seed_tickets(raffle) -> int:
+    """
+    Crea los boletos faltantes 1..raffle.ticket_count sin consultar número por número.
+      - Postgres/SQLite: INSERT ... VALUES (...), (...) ON CONFLICT DO NOTHING
+      - Otros: 1 SELECT de los números existentes + INSERT multi-fila de los faltantes
+    Devuelve cuántos boletos se insertaron.
+    """
+    have = db.session.execute(
+        select(func.count()).select_from(Ticket).where(Ticket.raffle_id == raffle.id)
+    ).scalar_one()
+    if have >= raffle.ticket_count:
+        return 0
+
+    dialect = db.engine.dialect.name
+    now = datetime.utcnow()
+
+    if dialect in ("postgresql", "sqlite"):
+        numbers = range(1, raffle.ticket_count + 1)
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        existing = set(db.session.execute(
+            select(Ticket.number).where(Ticket.raffle_id == raffle.id)
+        ).scalars())
+        numbers = [n for n in range(1, raffle.ticket_count + 1) if n not in existing]
+        dialect_insert = None
+
+    inserted = 0
+    numbers = list(numbers)
+    for i in range(0, len(numbers), _SEED_CHUNK):
+        rows = [
+            {"raffle_id": raffle.id, "number": n, "status": TicketStatus.FREE, "created_at": now, "updated_at": now}
+            for n in numbers[i:i + _SEED_CHUNK]
+        ]
+        if dialect_insert is not None:
+            stmt = dialect_insert(Ticket.__table__).values(rows).on_conflict_do_nothing(
+                index_elements=["raffle_id", "number"]
+            )
+        else:
+            stmt = insert(Ticket.__table__).values(rows)
+        inserted += db.session.execute(stmt).rowcount or 0
+
+    if inserted:
+        rebuild_raffle_stats(raffle)
+        bump_board_version(raffle.id)  # sin delta: los clientes piden el tablero completo
+    db.session.commit()
+    return inserted
+
+
 @click.command("seed")
+@click.option("--tickets", type=int, default=None, help="Cantidad de boletos de la rifa activa (default TICKET_COUNT).")
 @with_appcontext
-def seed():
+def seed(tickets):
     """
     Crea:
       - rifa activa
-      - tickets 01..100
+      - tickets 1..TICKET_COUNT (default 100, o --tickets N)
       - winners row vacío
       - admin inicial (Mendez) con contraseña temporal
     """
@@ -25,6 +85,8 @@ def seed():
     whatsapp = current_app.config.get("WHATSAPP_PHONE_E164", "52XXXXXXXXXX")
     price = current_app.config.get("TICKET_PRICE_MXN", 150)
     max_t = current_app.config.get("MAX_TICKETS_PER_PURCHASE", 3)
+    ticket_count = current_app.config.get("TICKET_COUNT", 100)
+    ttl_hours = current_app.config.get("RESERVATION_TTL_HOURS", 0)
 
     draw_str = current_app.config.get("DRAW_AT_LOCAL", "2026-03-06 20:00:00")
     draw_at = datetime.strptime(draw_str, "%Y-%m-%d %H:%M:%S")
@@ -45,25 +107,35 @@ def seed():
             whatsapp_phone_e164=whatsapp,
             ticket_price_mxn=price,
             max_tickets_per_purchase=max_t,
+            ticket_count=tickets or ticket_count,
             draw_at_local=draw_at,
+            reservation_ttl_hours=ttl_hours if ttl_hours > 0 else None,
             is_active=True,
         )
         db.session.add(raffle)
         db.session.commit()
+        invalidate_active_raffle()
         click.echo(f"✅ Rifa creada: {raffle.name}")
     else:
         click.echo(f"ℹ️ Ya existe rifa activa: {raffle.name}")
 
     # Tickets
-    existing = Ticket.query.filter_by(raffle_id=raffle.id).count()
-    if existing < 100:
-        for n in range(1, 101):
-            if not Ticket.query.filter_by(raffle_id=raffle.id, number=n).first():
-                db.session.add(Ticket(raffle_id=raffle.id, number=n, status=TicketStatus.FREE))
-        db.session.commit()
-        click.echo("✅ Tickets 01-100 listos.")
+    if tickets is not None:
+        if tickets < raffle.ticket_count:
+            raise click.ClickException(
+                f"--tickets no puede reducir la rifa (actual: {raffle.ticket_count})."
+            )
+        raffle.ticket_count = tickets
+        invalidate_active_raffle()
+
+    t0 = time.perf_counter()
+    inserted = seed_tickets(raffle)
+    elapsed_ms = (time.perf_counter() - t0) * 1000.0
+    rango = f"{raffle.format_number(1)}-{raffle.format_number(raffle.ticket_count)}"
+    if inserted:
+        click.echo(f"✅ Tickets {rango} listos ({inserted} nuevos en {elapsed_ms:.0f} ms).")
     else:
-        click.echo("ℹ️ Tickets ya existen.")
+        click.echo(f"ℹ️ Tickets {rango} ya existen ({elapsed_ms:.0f} ms).")
 
     # Winners row
     if not Winners.query.filter_by(raffle_id=raffle.id).first():
@@ -85,5 +157,193 @@ def seed():
         click.echo("ℹ️ Admin inicial ya existe.")
 
 
+@click.group("bench")
+def bench():
+    """Benchmarks de queries (solo lectura salvo que se indique)."""
+
+
+def _print_bench(results: dict) -> None:
+    for name, r in results.items():
+        click.echo(
+            f"{name:>16}: {r['queries_per_call']:.1f} queries/llamada · "
+            f"media {r['mean_ms']:.2f} ms · p50 {r['p50_ms']:.2f} ms · p95 {r['p95_ms']:.2f} ms"
+        )
+
+
+@bench.command("stats")
+@click.option("--iterations", default=200, show_default=True, type=int)
+@with_appcontext
+def bench_stats_cmd(iterations):
+    """Compara los COUNT() por estado contra el query agrupado de app.stats."""
+    from app.bench import bench_stats
+
+    raffle = Raffle.query.filter_by(is_active=True).order_by(Raffle.id.desc()).first()
+    if not raffle:
+        raise click.ClickException("No hay rifa activa. Ejecuta 'flask seed'.")
+
+    _print_bench(bench_stats(raffle, iterations=iterations))
+
+
+@bench.command("reserve")
+@click.option("--threads", default=8, show_default=True, type=int)
+@click.option("--attempts", default=400, show_default=True, type=int)
+@click.option("--pool", default=30, show_default=True, type=int, help="Números en disputa.")
+@click.option("--per-buyer", default=3, show_default=True, type=int)
+@with_appcontext
+def bench_reserve_cmd(threads, attempts, pool, per_buyer):
+    """
+    Apartado concurrente: FOR UPDATE + ORM vs UPDATE condicional.
+    Usa una rifa inactiva temporal (se borra al terminar).
+    """
+    from app.bench import bench_reserve
+
+    results = bench_reserve(current_app._get_current_object(), threads=threads, attempts=attempts,
+                            pool=pool, per_buyer=per_buyer)
+    for mode, r in results.items():
+        click.echo(
+            f"{mode:>20}: {r['attempts_per_s']:.0f} intentos/s · p50 {r['p50_ms']:.1f} ms · p95 {r['p95_ms']:.1f} ms · "
+            f"ok {r['ok']} · conflicto {r['conflict']} · error {r['error']} · "
+            f"doble venta {r['double_sold']} · apartados {r['reserved_tickets']}/{r['expected_reserved']}"
+        )
+
+
+@bench.command("explain")
+@click.option("--check", is_flag=True, help="Salir con error si algún query recorre completa una tabla grande.")
+@click.option("--sql/--no-sql", default=False, show_default=True, help="Imprimir el SQL completo.")
+@with_appcontext
+def bench_explain_cmd(check, sql):
+    """Imprime el plan (EXPLAIN) de cada query de las rutas principales."""
+    from app.explain import explain_hot_queries
+
+    raffle = Raffle.query.filter_by(is_active=True).order_by(Raffle.id.desc()).first()
+    if not raffle:
+        raise click.ClickException("No hay rifa activa. Ejecuta 'flask seed'.")
+
+    results = explain_hot_queries(current_app._get_current_object(), raffle)
+    flagged = 0
+    for r in results:
+        mark = "⚠️ " if r["full_scans"] else ""
+        click.echo(f"\n{mark}[{r['source']}] {r['sql'] if sql else r['sql'][:110]}")
+        for line in r["plan"]:
+            click.echo(f"    {line}")
+        if r["full_scans"]:
+            flagged += 1
+            click.echo(f"    -> scan completo de: {', '.join(sorted(set(r['full_scans'])))}")
+
+    click.echo(f"\n{len(results)} queries · {flagged} con scan completo de tablas grandes.")
+    if check and flagged:
+        raise click.ClickException("Hay queries sin índice (ver arriba).")
+
+
+@click.group("stats")
+def stats():
+    """Contadores denormalizados por rifa (tabla raffle_stats)."""
+
+
+@stats.command("rebuild")
+@click.option("--raffle-id", type=int, default=None, help="Sólo esta rifa (default: todas).")
+@click.option("--check", is_flag=True, help="Sólo verificar: no escribe y sale con error si hay diferencias.")
+@with_appcontext
+def stats_rebuild_cmd(raffle_id, check):
+    """Recalcula raffle_stats desde tickets/purchases y reporta diferencias."""
+    q = Raffle.query.order_by(Raffle.id)
+    if raffle_id:
+        q = q.filter_by(id=raffle_id)
+    raffles = q.all()
+    if not raffles:
+        raise click.ClickException("No hay rifas.")
+
+    drift = 0
+    for raffle in raffles:
+        diffs = rebuild_raffle_stats(raffle, write=not check)
+        db.session.commit()
+        if not diffs:
+            click.echo(f"✅ Rifa {raffle.id}: contadores correctos.")
+            continue
+        drift += 1
+        detail = ", ".join(f"{col} {old}→{new}" for col, (old, new) in sorted(diffs.items()))
+        verb = "difiere" if check else "corregida"
+        click.echo(f"⚠️ Rifa {raffle.id} {verb}: {detail}")
+
+    if check and drift:
+        raise click.ClickException(f"{drift} rifa(s) con contadores desfasados.")
+
+
+@click.group("reports")
+def reports():
+    """Reportes en segundo plano (cola report_jobs)."""
+
+
+@reports.command("work")
+@click.option("--once", is_flag=True, help="Procesar lo que haya en cola y salir.")
+@click.option("--poll", default=2.0, show_default=True, type=float, help="Segundos entre revisiones.")
+@with_appcontext
+def reports_work_cmd(once, poll):
+    """Worker de reportes (para usar con REPORT_WORKERS=0)."""
+    from app.report_jobs import work_forever
+
+    click.echo("Procesando reportes en cola…")
+    work_forever(poll_seconds=poll, once=once)
+
+
+@click.group("reservations")
+def reservations():
+    """Vencimiento de apartados sin pagar (app.expiry)."""
+
+
+@reservations.command("sweep")
+@click.option("--dry-run", is_flag=True, help="Sólo contar lo que vencería; no cambia nada.")
+@with_appcontext
+def reservations_sweep_cmd(dry_run):
+    """Cancela compras PENDING/APPROVED vencidas y libera sus boletos."""
+    from app.expiry import count_expired, sweep_expired_reservations
+
+    if dry_run:
+        raffles = Raffle.query.filter(Raffle.reservation_ttl_hours > 0).order_by(Raffle.id).all()
+        if not raffles:
+            click.echo("ℹ️ Ninguna rifa tiene vencimiento de apartados.")
+        for raffle in raffles:
+            counts = count_expired(raffle)
+            detail = ", ".join(f"{s.value} {n}" for s, n in counts.items())
+            click.echo(f"Rifa {raffle.id} (TTL {raffle.reservation_ttl_hours} h): vencerían {detail}")
+        return
+
+    results = sweep_expired_reservations()
+    for r in results:
+        click.echo(f"✅ Rifa {r.raffle_id}: {r.purchases} compras vencidas, {r.tickets} boletos liberados.")
+    if not results:
+        click.echo("ℹ️ No hay apartados vencidos.")
+
+
+@reservations.command("ttl")
+@click.argument("hours", type=int, required=False)
+@click.option("--raffle-id", type=int, default=None, help="Default: la rifa activa.")
+@with_appcontext
+def reservations_ttl_cmd(hours, raffle_id):
+    """Muestra o cambia las horas que dura un apartado (0 = no vencen)."""
+    if raffle_id:
+        raffle = db.session.get(Raffle, raffle_id)
+    else:
+        raffle = Raffle.query.filter_by(is_active=True).order_by(Raffle.id.desc()).first()
+    if not raffle:
+        raise click.ClickException("No existe esa rifa.")
+
+    if hours is None:
+        ttl = raffle.reservation_ttl_hours
+        click.echo(f"Rifa {raffle.id}: " + (f"los apartados vencen a las {ttl} h." if ttl else "los apartados no vencen."))
+        return
+    if hours < 0:
+        raise click.ClickException("Las horas no pueden ser negativas.")
+
+    raffle.reservation_ttl_hours = hours or None
+    db.session.commit()
+    invalidate_active_raffle()
+    click.echo(f"✅ Rifa {raffle.id}: " + (f"apartados vencen a las {hours} h." if hours else "apartados sin vencimiento."))
+
+
 def register_cli(app):
-    app.cli.add_command(seed)
\ No newline at end of file
+    app.cli.add_command(seed)
+    app.cli.add_command(bench)
+    app.cli.add_command(stats)
+    app.cli.add_command(reports)
+    app.cli.add_command(reservations)
\ No newline at end of file
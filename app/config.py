@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 
 class Config:
@@ -10,6 +11,62 @@ class Config:
         if not self.SQLALCHEMY_DATABASE_URI:
             raise RuntimeError("DATABASE_URL no está configurado en .env")
         self.SQLALCHEMY_TRACK_MODIFICATIONS = False
+        is_postgres = self.SQLALCHEMY_DATABASE_URI.startswith(("postgres://", "postgresql"))
+
+        # Pool de conexiones (por worker de gunicorn). Los defaults reparten
+        # DB_MAX_CONNECTIONS (lo que el plan de Postgres deja a la app, con
+        # margen para cron/psql) entre WEB_CONCURRENCY workers: pool fijo para
+        # los GUNICORN_THREADS hilos + 2 de fondo (bitácora, límites, reportes) y
+        # overflow hasta agotar su parte. Pre-ping y reciclado porque Render
+        # corta conexiones inactivas. Espera por conexión: Admin → Métricas.
+        try:
+            workers = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+        except ValueError:
+            workers = 1
+        try:
+            threads = max(1, int(os.getenv("GUNICORN_THREADS", "1")))
+        except ValueError:
+            threads = 1
+        try:
+            max_connections = int(os.getenv("DB_MAX_CONNECTIONS", "20"))
+        except ValueError:
+            max_connections = 20
+        budget = max(2, max_connections // workers)
+        try:
+            pool_size = int(os.getenv("DB_POOL_SIZE", str(min(budget, threads + 2))))
+        except ValueError:
+            pool_size = min(budget, threads + 2)
+        try:
+            max_overflow = int(os.getenv("DB_MAX_OVERFLOW", str(max(0, budget - pool_size))))
+        except ValueError:
+            max_overflow = max(0, budget - pool_size)
+        try:
+            pool_recycle = int(os.getenv("DB_POOL_RECYCLE", "280"))
+        except ValueError:
+            pool_recycle = 280
+        try:
+            pool_timeout = int(os.getenv("DB_POOL_TIMEOUT", "10"))
+        except ValueError:
+            pool_timeout = 10
+        # 0 = sin límite. Aplica también a `flask db upgrade`: subirlo para
+        # migraciones pesadas.
+        try:
+            statement_timeout_ms = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+        except ValueError:
+            statement_timeout_ms = 30000
+
+        self.SQLALCHEMY_ENGINE_OPTIONS = {"pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") == "1"}
+        if is_postgres:
+            connect_args = {"application_name": os.getenv("DB_APPLICATION_NAME", "rifa-elite-100")}
+            if statement_timeout_ms > 0:
+                connect_args["options"] = f"-c statement_timeout={statement_timeout_ms}"
+            self.SQLALCHEMY_ENGINE_OPTIONS.update(
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+                pool_recycle=pool_recycle,
+                pool_timeout=pool_timeout,
+                connect_args=connect_args,
+            )
 
         # Cookies
         self.SESSION_COOKIE_HTTPONLY = True
@@ -25,6 +82,34 @@ class Config:
 
         # Limiter
         self.RATELIMIT_DEFAULT = "200 per hour"
+        self.RATELIMIT_ENABLED = os.getenv("RATELIMIT_ENABLED", "1") == "1"
+        # Proxies delante de la app (Render: 1). Con 0 se ignora X-Forwarded-For.
+        try:
+            self.TRUSTED_PROXY_COUNT = int(os.getenv("TRUSTED_PROXY_COUNT", "1"))
+        except ValueError:
+            self.TRUSTED_PROXY_COUNT = 1
+        # /solicitar: por IP y por WhatsApp (normalizado), antes de tocar la base.
+        self.PURCHASE_IP_RATE_LIMIT = os.getenv("PURCHASE_IP_RATE_LIMIT", "15 per hour")
+        self.PURCHASE_PHONE_RATE_LIMIT = os.getenv("PURCHASE_PHONE_RATE_LIMIT", "5 per hour")
+        # Contadores compartidos entre workers en la tabla rate_limits
+        # (app.ratelimit); "memory://" = por worker. Default: la base si es Postgres.
+        self.RATELIMIT_STORAGE_URI = os.getenv(
+            "RATELIMIT_STORAGE_URI", "sqlalchemy://" if is_postgres else "memory://"
+        )
+        # "fixed-window" | "sliding-window-counter"
+        self.RATELIMIT_STRATEGY = os.getenv("RATELIMIT_STRATEGY", "fixed-window")
+        try:
+            flush_seconds = float(os.getenv("RATELIMIT_FLUSH_SECONDS", "1"))
+        except ValueError:
+            flush_seconds = 1.0
+        try:
+            cleanup_seconds = int(os.getenv("RATELIMIT_CLEANUP_SECONDS", "300"))
+        except ValueError:
+            cleanup_seconds = 300
+        self.RATELIMIT_STORAGE_OPTIONS = (
+            {"flush_seconds": flush_seconds, "cleanup_seconds": cleanup_seconds}
+            if self.RATELIMIT_STORAGE_URI.startswith("sqlalchemy") else {}
+        )
 
         # App settings
         self.APP_NAME = os.getenv("APP_NAME", "Rifa Élite 100")
@@ -37,9 +122,103 @@ class Config:
         except ValueError:
             self.TICKET_PRICE_MXN = 150
 
+        try:
+            self.TICKET_COUNT = int(os.getenv("TICKET_COUNT", "100"))
+        except ValueError:
+            self.TICKET_COUNT = 100
+
         try:
             self.MAX_TICKETS_PER_PURCHASE = int(os.getenv("MAX_TICKETS_PER_PURCHASE", "3"))
         except ValueError:
             self.MAX_TICKETS_PER_PURCHASE = 3
 
-        self.DRAW_AT_LOCAL = os.getenv("DRAW_AT_LOCAL", "2026-03-06 20:00:00")
\ No newline at end of file
+        self.DRAW_AT_LOCAL = os.getenv("DRAW_AT_LOCAL", "2026-03-06 20:00:00")
+
+        # Caché por proceso de la rifa activa (app.raffles)
+        try:
+            self.ACTIVE_RAFFLE_TTL_SECONDS = int(os.getenv("ACTIVE_RAFFLE_TTL_SECONDS", "30"))
+        except ValueError:
+            self.ACTIVE_RAFFLE_TTL_SECONDS = 30
+
+        # Caché de página completa (app.page_cache): /premios, /como-pagar,
+        # /contacto, /terminos, /resultados. TTL = lo más que otro worker
+        # tarda en ver ganadores nuevos; MAX_AGE = Cache-Control al navegador.
+        self.PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "1") == "1"
+        try:
+            self.PAGE_CACHE_TTL_SECONDS = int(os.getenv("PAGE_CACHE_TTL_SECONDS", "60"))
+        except ValueError:
+            self.PAGE_CACHE_TTL_SECONDS = 60
+        try:
+            self.PAGE_CACHE_MAX_AGE = int(os.getenv("PAGE_CACHE_MAX_AGE", "30"))
+        except ValueError:
+            self.PAGE_CACHE_MAX_AGE = 30
+
+        # Reportes en segundo plano (app.report_jobs): hilos por worker de
+        # gunicorn; 0 = sólo el proceso aparte `flask reports work`.
+        try:
+            self.REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "1"))
+        except ValueError:
+            self.REPORT_WORKERS = 1
+        try:
+            self.REPORT_JOB_TIMEOUT_SECONDS = int(os.getenv("REPORT_JOB_TIMEOUT_SECONDS", "600"))
+        except ValueError:
+            self.REPORT_JOB_TIMEOUT_SECONDS = 600
+        # Dónde quedan los archivos generados (compartido si `flask reports
+        # work` corre en otra máquina).
+        self.REPORT_ARTIFACT_DIR = os.getenv("REPORT_ARTIFACT_DIR") or os.path.join(
+            tempfile.gettempdir(), "rifa-reports"
+        )
+
+        # Métricas por endpoint (app.metrics): /metrics para Prometheus (con
+        # METRICS_TOKEN como Bearer; sin token sólo admins) y Admin → Métricas.
+        # SLOW_REQUEST_MS: peticiones más lentas van al log (0 = no).
+        self.METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+        self.METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+        try:
+            self.SLOW_REQUEST_MS = int(os.getenv("SLOW_REQUEST_MS", "1000"))
+        except ValueError:
+            self.SLOW_REQUEST_MS = 1000
+
+        # Vencimiento de apartados (app.expiry). TTL inicial de la rifa que crea
+        # `flask seed` (0 = no vencen; después: `flask reservations ttl`). El
+        # intervalo > 0 arranca un hilo de barrido por worker; 0 = sólo cron.
+        try:
+            self.RESERVATION_TTL_HOURS = int(os.getenv("RESERVATION_TTL_HOURS", "0"))
+        except ValueError:
+            self.RESERVATION_TTL_HOURS = 0
+        try:
+            self.RESERVATION_SWEEP_INTERVAL_SECONDS = int(os.getenv("RESERVATION_SWEEP_INTERVAL_SECONDS", "0"))
+        except ValueError:
+            self.RESERVATION_SWEEP_INTERVAL_SECONDS = 0
+
+        # Bitácora (app.audit): eventos no críticos (descargas, logout) se
+        # escriben por lotes desde una cola acotada; llena = se descartan.
+        self.AUDIT_ASYNC_ENABLED = os.getenv("AUDIT_ASYNC_ENABLED", "1") == "1"
+        try:
+            self.AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "1000"))
+        except ValueError:
+            self.AUDIT_QUEUE_SIZE = 1000
+        try:
+            self.AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "50"))
+        except ValueError:
+            self.AUDIT_BATCH_SIZE = 50
+        try:
+            self.AUDIT_FLUSH_SECONDS = int(os.getenv("AUDIT_FLUSH_SECONDS", "2"))
+        except ValueError:
+            self.AUDIT_FLUSH_SECONDS = 2
+
+        # Tablero en vivo (SSE /api/tickets/stream). Opt-in: cada conexión
+        # abierta ocupa un hilo, así que sólo con workers gthread/gevent
+        # (p.ej. gunicorn -k gthread --threads 32). MAX_CLIENTS por proceso
+        # debe dejar hilos libres para compras y admin; arriba, 503 -> polling.
+        self.BOARD_STREAM_ENABLED = os.getenv("BOARD_STREAM_ENABLED", "0") == "1"
+        try:
+            self.BOARD_STREAM_MAX_CLIENTS = int(os.getenv("BOARD_STREAM_MAX_CLIENTS", "8"))
+        except ValueError:
+            self.BOARD_STREAM_MAX_CLIENTS = 8
+        # "local" | "postgres" (vacío = autodetectar por DATABASE_URL)
+        self.BOARD_EVENTS_BACKEND = os.getenv("BOARD_EVENTS_BACKEND", "")
+        try:
+            self.BOARD_STREAM_MAX_SECONDS = int(os.getenv("BOARD_STREAM_MAX_SECONDS", "55"))
+        except ValueError:
+            self.BOARD_STREAM_MAX_SECONDS = 55
\ No newline at end of file
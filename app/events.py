@@ -0,0 +1,263 @@
+"""
+Pub/sub en proceso para cambios del tablero (SSE en /api/tickets/stream).
+
+Los cambios se encolan DENTRO de la transacción (queue_board_delta) y se
+publican sólo si hace commit:
+  - LocalBroker: fan-out en memoria al hacer commit (1 worker / tests).
+  - PostgresBroker: pg_notify() dentro de la misma transacción (Postgres lo
+    entrega al hacer commit y lo descarta en rollback) + un hilo LISTEN por
+    worker que reparte a los suscriptores locales.
+
+Backend: BOARD_EVENTS_BACKEND = "local" | "postgres" (default: postgres si
+DATABASE_URL es Postgres, si no local).
+
+Cada stream abierto ocupa un hilo del worker: acquire_stream_slot() los
+limita a BOARD_STREAM_MAX_CLIENTS por proceso; arriba de eso el endpoint
+responde 503 y el navegador se queda con el polling.
+"""
+import json
+import logging
+import queue
+import select
+import threading
+import time
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+
+
+log = logging.getLogger(__name__)
+
+CHANNEL = "rifa_board"
+
+# NOTIFY acepta < 8000 bytes; si el delta es grande mandamos "resync" y el
+# cliente vuelve a pedir el tablero completo.
+MAX_DELTA_CHANGES = 200
+
+_PENDING_KEY = "board_deltas"
+
+_stream_lock = threading.Lock()
+_streams = {"open": 0, "rejected": 0}
+
+
+class LocalBroker:
+    """Fan-out a colas por suscriptor. Si un suscriptor lento llena su cola,
+    se le manda un resync en lugar de bloquear al publicador."""
+
+    def __init__(self, max_queue: int = 256) -> None:
+        self.max_queue = max_queue
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> queue.Queue:
+        q = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q: queue.Queue) -> None:
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def dispatch(self, message: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for q in subscribers:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                _drain(q)
+                try:
+                    q.put_nowait({"raffle_id": message.get("raffle_id"), "resync": True})
+                except queue.Full:
+                    pass
+
+    def publish_in_transaction(self, session, message: dict) -> None:
+        session.info.setdefault(_PENDING_KEY, []).append(message)
+
+    def on_commit(self, messages) -> None:
+        for m in messages:
+            self.dispatch(m)
+
+
+class PostgresBroker(LocalBroker):
+    def __init__(self, app, max_queue: int = 256) -> None:
+        super().__init__(max_queue=max_queue)
+        self.app = app
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def subscribe(self) -> queue.Queue:
+        self._ensure_listener()
+        return super().subscribe()
+
+    def publish_in_transaction(self, session, message: dict) -> None:
+        session.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": CHANNEL, "payload": json.dumps(message, separators=(",", ":"))},
+        )
+
+    def on_commit(self, messages) -> None:
+        # Postgres ya lo entregó vía NOTIFY (también a este mismo worker).
+        pass
+
+    def _ensure_listener(self) -> None:
+        # Arranque perezoso: el hilo debe nacer DESPUÉS del fork de gunicorn.
+        if self._listener is not None and self._listener.is_alive():
+            return
+        with self._listener_lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(target=self._listen_forever, name="board-listen", daemon=True)
+            self._listener.start()
+
+    def _listen_forever(self) -> None:
+        while True:
+            try:
+                self._listen_once()
+            except Exception:
+                log.exception("LISTEN %s falló; reintentando", CHANNEL)
+                time.sleep(2)
+
+    def _listen_once(self) -> None:
+        with self.app.app_context():
+            # Conexión propia, fuera del pool (queda tomada mientras escuchamos).
+            proxied = db.engine.raw_connection()
+            proxied.detach()
+            conn = proxied.driver_connection
+
+        try:
+            conn.autocommit = True
+            cur = conn.cursor()
+            cur.execute(f"LISTEN {CHANNEL}")
+
+            while True:
+                ready, _, _ = select.select([conn], [], [], 30)
+                if not ready:
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    note = conn.notifies.pop(0)
+                    try:
+                        self.dispatch(json.loads(note.payload))
+                    except ValueError:
+                        continue
+        finally:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+def _drain(q: queue.Queue) -> None:
+    while True:
+        try:
+            q.get_nowait()
+        except queue.Empty:
+            return
+
+
+_broker = LocalBroker()
+
+
+def get_broker() -> LocalBroker:
+    return _broker
+
+
+def queue_board_delta(raffle_id: int, version: int, changes) -> None:
+    """
+    Llamar DENTRO de la transacción que cambia los boletos.
+    changes: [(number, TicketStatus)] o None para forzar resync.
+    """
+    changes = list(changes) if changes is not None else None
+    message = {"raffle_id": raffle_id, "version": version}
+    if changes is None or len(changes) > MAX_DELTA_CHANGES:
+        message["resync"] = True
+    else:
+        message["changes"] = [[n, getattr(s, "value", s)] for n, s in changes]
+
+    _broker.publish_in_transaction(db.session, message)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session) -> None:
+    messages = session.info.pop(_PENDING_KEY, None)
+    if messages:
+        _broker.on_commit(messages)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def init_events(app) -> None:
+    global _broker
+
+    backend = app.config.get("BOARD_EVENTS_BACKEND")
+    if not backend:
+        uri = app.config.get("SQLALCHEMY_DATABASE_URI") or ""
+        backend = "postgres" if uri.startswith(("postgres://", "postgresql")) else "local"
+
+    _broker = PostgresBroker(app) if backend == "postgres" else LocalBroker()
+
+
+def acquire_stream_slot(max_clients: int) -> bool:
+    with _stream_lock:
+        if _streams["open"] >= max_clients:
+            _streams["rejected"] += 1
+            return False
+        _streams["open"] += 1
+        return True
+
+
+def release_stream_slot() -> None:
+    with _stream_lock:
+        _streams["open"] = max(0, _streams["open"] - 1)
+
+
+def stream_info() -> dict:
+    with _stream_lock:
+        return dict(_streams)
+
+
+def _sse(event_name: str, data: dict, event_id=None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event_name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def stream_board_events(raffle_id: int, version: int, max_seconds: int = 55):
+    """
+    Generador SSE. Cierra después de max_seconds para no retener un worker
+    indefinidamente; EventSource reconecta solo (retry) y el "hello" le indica
+    la versión vigente para que resincronice si se perdió algo.
+    """
+    broker = get_broker()
+    q = broker.subscribe()
+    try:
+        yield "retry: 3000\n"
+        yield _sse("hello", {"raffle_id": raffle_id, "version": version}, version)
+
+        deadline = time.monotonic() + max_seconds
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                message = q.get(timeout=min(15.0, remaining))
+            except queue.Empty:
+                yield ": ping\n\n"
+                continue
+
+            if message.get("raffle_id") != raffle_id:
+                continue
+            name = "resync" if message.get("resync") else "delta"
+            yield _sse(name, message, message.get("version"))
+    finally:
+        broker.unsubscribe(q)
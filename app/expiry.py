@@ -0,0 +1,211 @@
+"""
+Vencimiento de apartados (compras PENDING/APPROVED que nunca se pagaron).
+
+Cada rifa define reservation_ttl_hours (None = no vencen). El plazo corre
+desde created_at para PENDING y desde approved_at para APPROVED (aprobar lo
+reinicia). Por lote y en UNA transacción:
+
+  UPDATE purchases SET status='CANCELLED' ...
+   WHERE id IN (SELECT id ... WHERE raffle_id=:r AND status=:s AND <fecha> < :corte LIMIT n)
+     AND status=:s AND <fecha> < :corte
+  RETURNING id, folio                                  (uno por estado de origen)
+
+  UPDATE tickets SET status='FREE'
+   WHERE id IN (boletos de esas compras) AND status='RESERVED'
+  RETURNING number
+
+más raffle_stats, board_version y bitácora (PURCHASE_EXPIRED). Varios workers
+pueden barrer a la vez: el UPDATE condicional hace que cada compra la cancele
+uno solo, y una compra aprobada/pagada mientras tanto ya no coincide.
+
+Se corre con `flask reservations sweep` (cron) o con el hilo por worker que
+arranca si RESERVATION_SWEEP_INTERVAL_SECONDS > 0.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+
+from app.audit import audit_row, record_audit_rows
+from app.board import bump_board_version
+from app.extensions import db
+from app.models import Purchase, PurchaseStatus, Raffle, Ticket, TicketStatus, purchase_tickets
+from app.stats import apply_stats_delta
+
+
+log = logging.getLogger(__name__)
+
+SWEEP_BATCH_SIZE = 500
+
+_sweeper_pid = None
+_sweeper_lock = threading.Lock()
+
+
+@dataclass
+class SweepResult:
+    raffle_id: int
+    purchases: int = 0
+    tickets: int = 0
+    folios: list = field(default_factory=list)
+
+
+def _expiry_rules(cutoff: datetime):
+    return [
+        (PurchaseStatus.PENDING, Purchase.created_at < cutoff),
+        (PurchaseStatus.APPROVED, func.coalesce(Purchase.approved_at, Purchase.created_at) < cutoff),
+    ]
+
+
+def _cutoff(raffle, now: datetime):
+    if not raffle.reservation_ttl_hours or raffle.reservation_ttl_hours <= 0:
+        return None
+    return now - timedelta(hours=raffle.reservation_ttl_hours)
+
+
+def count_expired(raffle, now: datetime = None) -> dict:
+    """{PurchaseStatus: n} de lo que se cancelaría ahora (sin escribir)."""
+    cutoff = _cutoff(raffle, now or datetime.utcnow())
+    if cutoff is None:
+        return {}
+    return {
+        old: db.session.execute(
+            select(func.count()).select_from(Purchase)
+            .where(Purchase.raffle_id == raffle.id, Purchase.status == old, is_expired)
+        ).scalar_one()
+        for old, is_expired in _expiry_rules(cutoff)
+    }
+
+
+def expire_reservations(raffle, now: datetime = None, batch_size: int = SWEEP_BATCH_SIZE) -> SweepResult:
+    """
+    Cancela un lote (hasta batch_size por estado). Llamar DENTRO de una
+    transacción; el llamador hace commit.
+    """
+    now = now or datetime.utcnow()
+    result = SweepResult(raffle_id=raffle.id)
+    cutoff = _cutoff(raffle, now)
+    if cutoff is None:
+        return result
+
+    expired = []
+    purchase_changes = []
+    for old, is_expired in _expiry_rules(cutoff):
+        candidates = (
+            select(Purchase.id)
+            .where(Purchase.raffle_id == raffle.id, Purchase.status == old, is_expired)
+            .limit(batch_size)
+        )
+        rows = db.session.execute(
+            update(Purchase)
+            .where(Purchase.id.in_(candidates), Purchase.status == old, is_expired)
+            .values(status=PurchaseStatus.CANCELLED, cancelled_at=now, updated_at=now)
+            .returning(Purchase.id, Purchase.folio)
+            .execution_options(synchronize_session=False)
+        ).all()
+        expired += rows
+        purchase_changes += [(old, PurchaseStatus.CANCELLED)] * len(rows)
+
+    if not expired:
+        return result
+
+    ticket_ids = select(purchase_tickets.c.ticket_id).where(
+        purchase_tickets.c.purchase_id.in_([pid for pid, _ in expired])
+    )
+    numbers = db.session.execute(
+        update(Ticket)
+        .where(Ticket.id.in_(ticket_ids), Ticket.status == TicketStatus.RESERVED)
+        .values(status=TicketStatus.FREE, updated_at=now)
+        .returning(Ticket.number)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+
+    apply_stats_delta(
+        raffle,
+        tickets=[(TicketStatus.RESERVED, TicketStatus.FREE)] * len(numbers),
+        purchases=purchase_changes,
+    )
+    if numbers:
+        bump_board_version(raffle.id, [(n, TicketStatus.FREE) for n in numbers])
+
+    record_audit_rows(
+        audit_row("PURCHASE_EXPIRED", "Purchase", pid,
+                  {"folio": folio, "ttl_hours": raffle.reservation_ttl_hours}, created_at=now)
+        for pid, folio in expired
+    )
+
+    result.purchases = len(expired)
+    result.tickets = len(numbers)
+    result.folios = [folio for _, folio in expired]
+    return result
+
+
+def sweep_expired_reservations(now: datetime = None, batch_size: int = SWEEP_BATCH_SIZE) -> list:
+    """
+    Barre todas las rifas con TTL, un commit por lote. Si una rifa falla se
+    registra y se sigue con la siguiente. Devuelve [SweepResult] (sólo rifas
+    con algo cancelado).
+    """
+    raffle_ids = db.session.execute(
+        select(Raffle.id).where(Raffle.reservation_ttl_hours > 0).order_by(Raffle.id)
+    ).scalars().all()
+    db.session.rollback()
+
+    results = []
+    for raffle_id in raffle_ids:
+        total = SweepResult(raffle_id=raffle_id)
+        try:
+            while True:
+                raffle = db.session.get(Raffle, raffle_id)
+                batch = expire_reservations(raffle, now=now, batch_size=batch_size)
+                db.session.commit()
+                total.purchases += batch.purchases
+                total.tickets += batch.tickets
+                total.folios += batch.folios
+                if batch.purchases < batch_size:
+                    break
+        except Exception:
+            db.session.rollback()
+            log.exception("No se pudieron vencer los apartados de la rifa %s", raffle_id)
+
+        if total.purchases:
+            log.info("Rifa %s: %s apartados vencidos, %s boletos liberados",
+                     raffle_id, total.purchases, total.tickets)
+            results.append(total)
+    return results
+
+
+def _sweep_forever(app, interval: int) -> None:
+    # Arranque desfasado para que los workers no barran todos al mismo tiempo.
+    time.sleep(random.uniform(0, interval))
+    while True:
+        with app.app_context():
+            try:
+                sweep_expired_reservations()
+            except Exception:
+                log.exception("Falló el barrido de apartados vencidos")
+            finally:
+                db.session.remove()
+        time.sleep(interval)
+
+
+def start_sweeper(app) -> None:
+    global _sweeper_pid
+    interval = app.config.get("RESERVATION_SWEEP_INTERVAL_SECONDS", 0)
+    if interval <= 0 or _sweeper_pid == os.getpid():
+        return
+    # Uno por proceso, creado después del fork (en la primera petición).
+    with _sweeper_lock:
+        if _sweeper_pid == os.getpid():
+            return
+        threading.Thread(target=_sweep_forever, args=(app, interval), name="reservation-sweeper", daemon=True).start()
+        _sweeper_pid = os.getpid()
+
+
+def init_expiry(app) -> None:
+    if app.config.get("RESERVATION_SWEEP_INTERVAL_SECONDS", 0) > 0:
+        app.before_request(lambda: start_sweeper(app))
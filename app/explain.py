@@ -0,0 +1,158 @@
+"""
+Planes de ejecución de los queries calientes (`flask bench explain`).
+
+Recorre las rutas GET con el test client (sin login: LOGIN_DISABLED), captura
+cada SELECT que ejecutan y le pide al motor su plan; a eso le suma los
+queries de escritura del flujo de compra (apartado, duplicado pendiente),
+armados igual que en las rutas. Con --check termina con error si algún
+query recorre completa una tabla grande: en Postgres se corre con
+enable_seqscan=off, así que un "Seq Scan" significa que no hay índice útil.
+Sólo cuentan tablas del modelo: en SQLite un "SCAN anon_1" es el subquery
+que el propio motor materializó (p.ej. el eager load lazy="subquery" de
+Purchase.tickets), y sus lecturas de tablas reales aparecen aparte.
+"""
+import re
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import event, select, update
+
+from app.extensions import db
+from app.models import Purchase, PurchaseStatus, Ticket, TicketStatus
+
+
+EXPLAIN_ROUTES = [
+    "/",
+    "/boletos",
+    "/api/tickets",
+    "/resultados",
+    "/admin/",
+    "/admin/tickets?q=1",
+    "/admin/purchases",
+    "/admin/purchases?status=PENDING",
+    "/admin/purchases?phone=5512345678",
+    "/admin/audit",
+    "/admin/audit?admin=1",
+    "/admin/reports",
+]
+
+# Tablas de pocas filas (por rifa, por admin, reportes): un scan ahí no es regresión.
+SMALL_TABLES = {"raffles", "winners", "admin_users", "report_jobs", "alembic_version"}
+
+_SQLITE_SCAN = re.compile(r"\bSCAN (\w+)\b(?! USING)")
+_PG_SEQSCAN = re.compile(r"Seq Scan on (\w+)")
+
+
+def _write_path_statements(raffle):
+    # Mismos predicados que app.reservations.reserve_tickets y el chequeo de
+    # solicitud pendiente de public.request_tickets.
+    return {
+        "POST /solicitar (apartado)": (
+            update(Ticket)
+            .where(
+                Ticket.raffle_id == raffle.id,
+                Ticket.number.in_([1, 2, 3]),
+                Ticket.status == TicketStatus.FREE,
+            )
+            .values(status=TicketStatus.RESERVED)
+        ),
+        "POST /solicitar (pendiente duplicado)": (
+            select(Purchase.id)
+            .where(
+                Purchase.raffle_id == raffle.id,
+                Purchase.buyer_phone_e164 == "525512345678",
+                Purchase.status == PurchaseStatus.PENDING,
+            )
+            .limit(1)
+        ),
+        # app.expiry: candidatos de un lote del barrido.
+        "flask reservations sweep (PENDING vencidas)": (
+            select(Purchase.id)
+            .where(
+                Purchase.raffle_id == raffle.id,
+                Purchase.status == PurchaseStatus.PENDING,
+                Purchase.created_at < datetime(2026, 1, 1),
+            )
+            .limit(500)
+        ),
+    }
+
+
+@contextmanager
+def _capture_statements(engine):
+    captured = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and not executemany:
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        yield captured
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+
+
+def _full_scans(dialect: str, plan_lines) -> list:
+    """Tablas grandes del modelo recorridas completas (no alias de subqueries)."""
+    pattern = _PG_SEQSCAN if dialect == "postgresql" else _SQLITE_SCAN
+    tables = []
+    for line in plan_lines:
+        tables += [
+            t for t in pattern.findall(line)
+            if t in db.metadata.tables and t not in SMALL_TABLES
+        ]
+    return tables
+
+
+def _explain(conn, dialect: str, statement: str, parameters) -> list:
+    prefix = "EXPLAIN " if dialect == "postgresql" else "EXPLAIN QUERY PLAN "
+    rows = conn.exec_driver_sql(prefix + statement, parameters).all()
+    # Postgres: una columna de texto; SQLite: (id, parent, notused, detail).
+    return [str(r[-1]) for r in rows]
+
+
+def explain_hot_queries(app, raffle) -> list:
+    """
+    Devuelve [{"source", "sql", "plan", "full_scans"}] sin duplicar SQL.
+    Requiere app context.
+    """
+    engine = db.engine
+    dialect = engine.dialect.name
+
+    saved = {k: app.config.get(k) for k in ("LOGIN_DISABLED", "PAGE_CACHE_ENABLED")}
+    app.config.update(LOGIN_DISABLED=True, PAGE_CACHE_ENABLED=False)
+
+    per_route = []
+    try:
+        client = app.test_client()
+        for path in EXPLAIN_ROUTES:
+            with _capture_statements(engine) as captured:
+                client.get(path)
+            per_route.append((f"GET {path}", list(captured)))
+    finally:
+        app.config.update(saved)
+
+    for source, stmt in _write_path_statements(raffle).items():
+        compiled = stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+        per_route.append((source, [(str(compiled), None)]))
+
+    results = []
+    seen = set()
+    with engine.connect() as conn:
+        if dialect == "postgresql":
+            conn.exec_driver_sql("SET enable_seqscan = off")
+        try:
+            for source, statements in per_route:
+                for statement, parameters in statements:
+                    key = " ".join(statement.split())
+                    if key in seen:
+                        continue
+                    seen.add(key)
+
+                    plan = _explain(conn, dialect, statement, parameters)
+                    results.append({"source": source, "sql": key, "plan": plan, "full_scans": _full_scans(dialect, plan)})
+        finally:
+            conn.rollback()
+
+    return results
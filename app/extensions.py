@@ -3,7 +3,8 @@ from flask_migrate import Migrate
 from flask_wtf import CSRFProtect
 from flask_login import LoginManager
 from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
+
+from app.security import client_ip
 
 db = SQLAlchemy()
 migrate = Migrate()
@@ -12,8 +13,8 @@ csrf = CSRFProtect()
 login_manager = LoginManager()
 login_manager.login_view = "admin.login"
 
+# Almacenamiento: RATELIMIT_STORAGE_URI en Config (ver app.ratelimit).
 limiter = Limiter(
-    key_func=get_remote_address,
+    key_func=client_ip,
     default_limits=["200 per hour"],
-    storage_uri="memory://",
 )
\ No newline at end of file
@@ -44,9 +44,9 @@ class AdminCreateUserForm(FlaskForm):
 
 
 class WinnerForm(FlaskForm):
-    first_ticket = IntegerField("1er lugar (01-100)", validators=[DataRequired()])
-    second_ticket = IntegerField("2do lugar (01-100)", validators=[DataRequired()])
-    third_ticket = IntegerField("3er lugar (01-100)", validators=[DataRequired()])
+    first_ticket = IntegerField("1er lugar", validators=[DataRequired()])
+    second_ticket = IntegerField("2do lugar", validators=[DataRequired()])
+    third_ticket = IntegerField("3er lugar", validators=[DataRequired()])
 
 
 class AdminNoteForm(FlaskForm):
@@ -68,4 +68,11 @@ class ManualPurchaseForm(FlaskForm):
     notes = TextAreaField("Notas internas", validators=[Optional(), Length(max=2000)])
 
     def normalized_phone(self) -> str:
-        return normalize_mx_phone(self.buyer_phone.data)
\ No newline at end of file
+        return normalize_mx_phone(self.buyer_phone.data)
+
+class MessageTemplatesForm(FlaskForm):
+    # Vacío = texto por default (ver app.messages)
+    reserved = TextAreaField("Solicitud recibida", validators=[Optional(), Length(max=2000)])
+    approved = TextAreaField("Apartado aprobado", validators=[Optional(), Length(max=2000)])
+    paid = TextAreaField("Pago confirmado", validators=[Optional(), Length(max=2000)])
+    reminder = TextAreaField("Recordatorio de pago", validators=[Optional(), Length(max=2000)])
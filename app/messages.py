@@ -0,0 +1,287 @@
+"""
+Mensajes de WhatsApp para compradores (links wa.me "1 click" del admin).
+
+Cada rifa tiene cuatro plantillas, editables en Admin → Mensajes:
+
+    reserved   solicitud recibida      (PENDING)
+    approved   apartado aprobado       (APPROVED)
+    paid       pago confirmado         (PAID)
+    reminder   recordatorio de pago    (APPROVED sin pagar)
+
+Sin fila en message_templates se usa DEFAULT_TEMPLATES. Campos entre llaves:
+{nombre} {folio} {boletos} {total} por compra y {rifa} {sorteo} {precio}
+{organizador} {plazo} por rifa ({sorteo} sale de raffle.draw_at_local).
+
+Compilar = partir el texto en trozos una sola vez y sustituir ya los campos
+de la rifa; sólo quedan huecos por compra. El MessageSet resultante se guarda
+por proceso y se reutiliza mientras raffle.messages_version (sube al guardar
+plantillas) y los campos de la rifa (nombre, sorteo, precio, organizador,
+plazo, ancho de número) sigan iguales. get_message_set() compara contra la
+fila de la rifa leída por PK en ese momento, no contra la copia de
+get_active_raffle() (que vive ACTIVE_RAFFLE_TTL_SECONDS), así que un cambio
+hecho en otro worker o con `flask reservations ttl` se ve en la siguiente
+página. Es un SELECT por página; generar cientos de links es concatenar y
+codificar, sin leer config ni la base por fila.
+"""
+import logging
+import threading
+import urllib.parse
+from dataclasses import dataclass
+from string import Formatter
+
+from sqlalchemy import select, update
+
+from app.extensions import db
+from app.models import MessageTemplate, Raffle
+
+
+log = logging.getLogger(__name__)
+
+MESSAGE_KINDS = {
+    "reserved": "Solicitud recibida",
+    "approved": "Apartado aprobado",
+    "paid": "Pago confirmado",
+    "reminder": "Recordatorio de pago",
+}
+
+PURCHASE_FIELDS = ("nombre", "folio", "boletos", "total")
+RAFFLE_FIELDS = ("rifa", "sorteo", "precio", "organizador", "plazo")
+
+DEFAULT_TEMPLATES = {
+    "reserved": (
+        "📝 SOLICITUD RECIBIDA – {rifa}\n"
+        "Hola {nombre}, recibimos tu solicitud.\n"
+        "Folio: {folio}\n"
+        "Boletos: {boletos}\n"
+        "Total: ${total} MXN\n\n"
+        "Te escribimos por aquí en cuanto la revisemos.\n"
+        "🔞 Participación exclusiva para mayores de 18 años."
+    ),
+    "approved": (
+        "📌 APARTADO CONFIRMADO – {rifa}\n"
+        "Hola {nombre}, tus boletos quedaron apartados.\n"
+        "Folio: {folio}\n"
+        "Boletos: {boletos}\n"
+        "Total a pagar: ${total} MXN\n"
+        "Plazo para pagar: {plazo}\n"
+        "Sorteo: {sorteo} (CDMX)\n\n"
+        "Cuando pagues, mándanos tu comprobante por aquí."
+    ),
+    "paid": (
+        "✅ PAGO CONFIRMADO – {rifa}\n"
+        "Hola {nombre}, tu pago quedó registrado.\n"
+        "Folio: {folio}\n"
+        "Boletos: {boletos}\n"
+        "Total pagado: ${total} MXN\n"
+        "Sorteo: {sorteo} (CDMX)\n\n"
+        "📌 Guarda este mensaje como comprobante.\n"
+        "🔄 Si cambiaste de número contáctanos para actualizar tus datos.\n"
+        "🔞 Participación exclusiva para mayores de 18 años."
+    ),
+    "reminder": (
+        "⏰ RECORDATORIO – {rifa}\n"
+        "Hola {nombre}, tus boletos {boletos} siguen apartados (folio {folio}).\n"
+        "Total a pagar: ${total} MXN\n"
+        "Plazo para pagar: {plazo}\n"
+        "Sorteo: {sorteo} (CDMX)\n\n"
+        "Si ya pagaste, mándanos tu comprobante por aquí."
+    ),
+}
+
+_MONTHS = ("Ene", "Feb", "Mar", "Abr", "May", "Jun", "Jul", "Ago", "Sep", "Oct", "Nov", "Dic")
+
+_lock = threading.Lock()
+_cache = {}  # raffle_id -> MessageSet
+_counters = {"hits": 0, "misses": 0}
+
+
+def build_wa_link(phone_e164_digits: str, text: str) -> str:
+    # wa.me necesita dígitos sin '+'
+    return f"https://wa.me/{phone_e164_digits}?text={urllib.parse.quote(text)}"
+
+
+def format_draw_at(dt) -> str:
+    """2026-03-06 20:00 -> "06/Mar/2026 – 8:00 PM" (sin depender del locale)."""
+    hour = dt.hour % 12 or 12
+    return f"{dt.day:02d}/{_MONTHS[dt.month - 1]}/{dt.year} – {hour}:{dt.minute:02d} {'AM' if dt.hour < 12 else 'PM'}"
+
+
+def raffle_fields(raffle) -> dict:
+    ttl = raffle.reservation_ttl_hours
+    return {
+        "rifa": raffle.name,
+        "sorteo": format_draw_at(raffle.draw_at_local),
+        "precio": str(raffle.ticket_price_mxn),
+        "organizador": raffle.organizer_name,
+        "plazo": (f"{ttl} hora" if ttl == 1 else f"{ttl} horas") if ttl else "hasta el sorteo",
+    }
+
+
+def compile_template(body: str, fixed: dict) -> tuple:
+    """
+    ((texto, campo_por_compra | None), ...) con los campos de `fixed` ya
+    sustituidos. ValueError si hay llaves mal cerradas o campos desconocidos.
+    """
+    try:
+        parsed = list(Formatter().parse(body))
+    except ValueError:
+        raise ValueError("Llaves sin cerrar; para una llave literal escribe {{ o }}.")
+
+    parts = []
+    pending = []
+    for text, field, spec, conversion in parsed:
+        pending.append(text)
+        if field is None:
+            continue
+        if spec or conversion:
+            raise ValueError(f"Formato no soportado en {{{field}}}.")
+        if field in fixed:
+            pending.append(fixed[field])
+        elif field in PURCHASE_FIELDS:
+            parts.append(("".join(pending), field))
+            pending = []
+        else:
+            raise ValueError(f"Campo desconocido: {{{field}}}.")
+    parts.append(("".join(pending), None))
+    return tuple(parts)
+
+
+def validate_template(body: str) -> None:
+    compile_template(body, dict.fromkeys(RAFFLE_FIELDS, ""))
+
+
+@dataclass(frozen=True)
+class MessageSet:
+    """Plantillas compiladas de una rifa en una versión dada."""
+    raffle_id: int
+    version: int
+    number_width: int
+    ticket_price_mxn: int
+    fixed: dict     # raffle_fields() con que se compiló
+    compiled: dict  # kind -> partes de compile_template
+
+    def is_current(self, raffle, fixed: dict) -> bool:
+        return (
+            self.version == raffle.messages_version
+            and self.number_width == raffle.number_width
+            and self.ticket_price_mxn == raffle.ticket_price_mxn
+            and self.fixed == fixed
+        )
+
+    def render(self, kind: str, buyer_name: str, folio: str, numbers, total_mxn: int = None) -> str:
+        numbers = sorted(numbers)
+        if total_mxn is None:
+            total_mxn = self.ticket_price_mxn * len(numbers)
+        values = {
+            "nombre": buyer_name,
+            "folio": folio,
+            "boletos": ", ".join(str(n).zfill(self.number_width) for n in numbers),
+            "total": str(total_mxn),
+        }
+        return "".join(text + (values[field] if field else "") for text, field in self.compiled[kind])
+
+    def link(self, kind: str, phone_e164: str, buyer_name: str, folio: str, numbers, total_mxn: int = None) -> str:
+        return build_wa_link(phone_e164, self.render(kind, buyer_name, folio, numbers, total_mxn))
+
+    def purchase_link(self, kind: str, purchase) -> str:
+        return self.link(kind, purchase.buyer_phone_e164, purchase.buyer_name, purchase.folio,
+                         [t.number for t in purchase.tickets])
+
+    def links(self, kind: str, purchases) -> list:
+        """[(compra, link)]: las compras deben traer sus boletos ya cargados."""
+        return [(p, self.purchase_link(kind, p)) for p in purchases]
+
+
+def load_message_bodies(raffle_id: int) -> dict:
+    """{kind: texto} de la rifa, con el default donde no hay fila."""
+    bodies = dict(DEFAULT_TEMPLATES)
+    rows = db.session.execute(
+        select(MessageTemplate.kind, MessageTemplate.body).where(MessageTemplate.raffle_id == raffle_id)
+    ).all()
+    bodies.update({kind: body for kind, body in rows if kind in MESSAGE_KINDS})
+    return bodies
+
+
+def compile_message_set(raffle, bodies: dict, fixed: dict = None) -> MessageSet:
+    fixed = fixed if fixed is not None else raffle_fields(raffle)
+    compiled = {}
+    for kind in MESSAGE_KINDS:
+        try:
+            compiled[kind] = compile_template(bodies[kind], fixed)
+        except ValueError:
+            # Se valida al guardar; esto sólo cubre filas editadas a mano.
+            log.warning("Plantilla %s inválida en la rifa %s; uso el texto por default", kind, raffle.id)
+            compiled[kind] = compile_template(DEFAULT_TEMPLATES[kind], fixed)
+    return MessageSet(
+        raffle_id=raffle.id,
+        version=raffle.messages_version,
+        number_width=raffle.number_width,
+        ticket_price_mxn=raffle.ticket_price_mxn,
+        fixed=fixed,
+        compiled=compiled,
+    )
+
+
+def get_message_set(raffle) -> MessageSet:
+    # Fila fresca por PK: `raffle` puede ser la copia en caché de otro momento.
+    raffle = db.session.get(Raffle, raffle.id, populate_existing=True) or raffle
+    fixed = raffle_fields(raffle)
+    cached = _cache.get(raffle.id)
+    if cached is not None and cached.is_current(raffle, fixed):
+        with _lock:
+            _counters["hits"] += 1
+        return cached
+
+    message_set = compile_message_set(raffle, load_message_bodies(raffle.id), fixed)
+    with _lock:
+        _counters["misses"] += 1
+        _cache[raffle.id] = message_set
+    return message_set
+
+
+def save_message_templates(raffle_id: int, bodies: dict) -> list:
+    """
+    Llamar DENTRO de una transacción. Valida todo antes de escribir (ValueError
+    con el nombre del mensaje), guarda sólo lo que cambió (vacío o igual al
+    default = sin fila) y sube raffles.messages_version. Devuelve los tipos
+    que cambiaron.
+    """
+    wanted = {}
+    for kind, label in MESSAGE_KINDS.items():
+        body = (bodies.get(kind) or "").replace("\r\n", "\n").strip()
+        try:
+            validate_template(body)
+        except ValueError as e:
+            raise ValueError(f"{label}: {e}")
+        wanted[kind] = body if body and body != DEFAULT_TEMPLATES[kind] else None
+
+    rows = {row.kind: row for row in MessageTemplate.query.filter_by(raffle_id=raffle_id)}
+    changed = []
+    for kind, body in wanted.items():
+        row = rows.get(kind)
+        if body is None:
+            if row is not None:
+                db.session.delete(row)
+                changed.append(kind)
+        elif row is None:
+            db.session.add(MessageTemplate(raffle_id=raffle_id, kind=kind, body=body))
+            changed.append(kind)
+        elif row.body != body:
+            row.body = body
+            changed.append(kind)
+
+    if changed:
+        db.session.execute(
+            update(Raffle)
+            .where(Raffle.id == raffle_id)
+            .values(messages_version=Raffle.messages_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+    return changed
+
+
+def message_cache_info() -> dict:
+    with _lock:
+        info = dict(_counters)
+    info["entries"] = len(_cache)
+    return info
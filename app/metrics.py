@@ -0,0 +1,353 @@
+"""
+Métricas por endpoint (por worker): peticiones, errores 5xx, histograma de
+latencia, cantidad de sentencias SQL y tiempo en DB.
+
+  - Flask: before_request arranca el reloj; after_request (o teardown si la
+    vista lanzó excepción) registra el resultado.
+  - SQLAlchemy: before/after_cursor_execute suman sentencias y tiempo a la
+    petición en curso (los hilos de fondo no cuentan).
+
+Se exponen en /metrics (formato de texto de Prometheus; con METRICS_TOKEN
+como "Authorization: Bearer ...", sin token sólo para admins con sesión) y en
+Admin → Métricas. Peticiones más lentas que SLOW_REQUEST_MS se registran en
+el log con su conteo de SQL.
+
+Además, la espera por conexión del pool (TimedQueuePool, sólo con Postgres):
+cuánto tarda cada checkout, cuántos agotaron DB_POOL_TIMEOUT y la ocupación
+actual, para dimensionar DB_POOL_SIZE / DB_MAX_OVERFLOW.
+
+Los contadores viven en memoria de cada worker de gunicorn: cada scrape ve
+sólo el worker que lo atendió.
+"""
+import hmac
+import logging
+import threading
+import time
+
+from flask import Response, current_app, g, has_request_context, request
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from app.audit import audit_writer_info
+from app.events import stream_info
+from app.extensions import db, limiter
+from app.messages import message_cache_info
+from app.page_cache import page_cache_info
+from app.raffles import active_raffle_cache_info
+
+
+log = logging.getLogger(__name__)
+
+# Límites superiores (segundos) del histograma de latencia.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Ídem para la espera por conexión del pool (casi siempre < 1 ms).
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_endpoints = {}
+_engine_hooked = False
+
+_G_KEY = "_metrics_request"
+
+
+def _new_endpoint() -> dict:
+    return {
+        "count": 0,
+        "errors": 0,
+        "buckets": [0] * len(LATENCY_BUCKETS),
+        "seconds": 0.0,
+        "max_seconds": 0.0,
+        "sql": 0,
+        "db_seconds": 0.0,
+    }
+
+
+def record_request(endpoint: str, status: int, seconds: float, sql: int, db_seconds: float) -> None:
+    with _lock:
+        stats = _endpoints.get(endpoint)
+        if stats is None:
+            stats = _endpoints[endpoint] = _new_endpoint()
+        stats["count"] += 1
+        if status >= 500:
+            stats["errors"] += 1
+        for i, upper in enumerate(LATENCY_BUCKETS):
+            if seconds <= upper:
+                stats["buckets"][i] += 1
+                break
+        stats["seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        stats["sql"] += sql
+        stats["db_seconds"] += db_seconds
+
+
+_pool_wait = {"count": 0, "timeouts": 0, "buckets": [0] * len(POOL_WAIT_BUCKETS), "seconds": 0.0, "max_seconds": 0.0}
+
+
+def record_pool_wait(seconds: float, timed_out: bool = False) -> None:
+    with _lock:
+        stats = _pool_wait
+        stats["count"] += 1
+        if timed_out:
+            stats["timeouts"] += 1
+        for i, upper in enumerate(POOL_WAIT_BUCKETS):
+            if seconds <= upper:
+                stats["buckets"][i] += 1
+                break
+        stats["seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool que mide cada checkout (espera en la cola + pre-ping o conexión nueva)."""
+
+    def connect(self):
+        t0 = time.perf_counter()
+        try:
+            conn = super().connect()
+        except PoolTimeoutError:
+            record_pool_wait(time.perf_counter() - t0, timed_out=True)
+            raise
+        record_pool_wait(time.perf_counter() - t0)
+        return conn
+
+
+def _quantile(buckets, count: int, q: float, bounds=LATENCY_BUCKETS):
+    """Cota superior del bucket donde cae el cuantil q (None si pasa de 10 s)."""
+    if not count:
+        return 0.0
+    target = q * count
+    seen = 0
+    for upper, n in zip(bounds, buckets):
+        seen += n
+        if seen >= target:
+            return upper
+    return None
+
+
+def endpoint_metrics() -> list:
+    """[{endpoint, count, errors, avg_ms, p50_ms, p95_ms, max_ms, sql_per_request, db_ms_per_request, db_share}]"""
+    with _lock:
+        snapshot = {k: dict(v, buckets=list(v["buckets"])) for k, v in _endpoints.items()}
+
+    rows = []
+    for endpoint, s in snapshot.items():
+        count = s["count"] or 1
+        p50 = _quantile(s["buckets"], s["count"], 0.50)
+        p95 = _quantile(s["buckets"], s["count"], 0.95)
+        rows.append({
+            "endpoint": endpoint,
+            "count": s["count"],
+            "errors": s["errors"],
+            "total_ms": s["seconds"] * 1000.0,
+            "avg_ms": s["seconds"] * 1000.0 / count,
+            "p50_ms": p50 * 1000.0 if p50 is not None else None,
+            "p95_ms": p95 * 1000.0 if p95 is not None else None,
+            "max_ms": s["max_seconds"] * 1000.0,
+            "sql_per_request": s["sql"] / count,
+            "db_ms_per_request": s["db_seconds"] * 1000.0 / count,
+            "db_share": (s["db_seconds"] / s["seconds"]) if s["seconds"] else 0.0,
+        })
+    rows.sort(key=lambda r: r["total_ms"], reverse=True)
+    return rows
+
+
+def pool_metrics() -> dict:
+    """Espera por checkout en este worker + ocupación actual del pool (necesita app context)."""
+    with _lock:
+        s = dict(_pool_wait, buckets=list(_pool_wait["buckets"]))
+
+    pool = db.engine.pool
+    instrumented = isinstance(pool, TimedQueuePool)
+    p95 = _quantile(s["buckets"], s["count"], 0.95, POOL_WAIT_BUCKETS)
+    info = {
+        "instrumented": instrumented,
+        "checkouts": s["count"],
+        "timeouts": s["timeouts"],
+        "avg_ms": s["seconds"] * 1000.0 / (s["count"] or 1),
+        "p95_ms": p95 * 1000.0 if p95 is not None else None,
+        "max_ms": s["max_seconds"] * 1000.0,
+        "size": 0,
+        "checked_out": 0,
+        "overflow": 0,
+        "max_overflow": 0,
+        "timeout": 0,
+    }
+    if isinstance(pool, QueuePool):
+        info.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            overflow=max(0, pool.overflow()),
+            max_overflow=pool._max_overflow,
+            timeout=pool.timeout(),
+        )
+    return info
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus() -> str:
+    with _lock:
+        snapshot = {k: dict(v, buckets=list(v["buckets"])) for k, v in sorted(_endpoints.items())}
+
+    out = []
+
+    def metric(name: str, kind: str, help_text: str) -> None:
+        out.append(f"# HELP {name} {help_text}")
+        out.append(f"# TYPE {name} {kind}")
+
+    metric("rifa_http_requests_total", "counter", "Peticiones atendidas por endpoint.")
+    for ep, s in snapshot.items():
+        out.append(f'rifa_http_requests_total{{endpoint="{_label(ep)}"}} {s["count"]}')
+
+    metric("rifa_http_request_errors_total", "counter", "Respuestas 5xx por endpoint.")
+    for ep, s in snapshot.items():
+        out.append(f'rifa_http_request_errors_total{{endpoint="{_label(ep)}"}} {s["errors"]}')
+
+    metric("rifa_http_request_duration_seconds", "histogram", "Latencia por endpoint.")
+    for ep, s in snapshot.items():
+        ep = _label(ep)
+        cumulative = 0
+        for upper, n in zip(LATENCY_BUCKETS, s["buckets"]):
+            cumulative += n
+            out.append(f'rifa_http_request_duration_seconds_bucket{{endpoint="{ep}",le="{upper}"}} {cumulative}')
+        out.append(f'rifa_http_request_duration_seconds_bucket{{endpoint="{ep}",le="+Inf"}} {s["count"]}')
+        out.append(f'rifa_http_request_duration_seconds_sum{{endpoint="{ep}"}} {s["seconds"]:.6f}')
+        out.append(f'rifa_http_request_duration_seconds_count{{endpoint="{ep}"}} {s["count"]}')
+
+    metric("rifa_db_statements_total", "counter", "Sentencias SQL ejecutadas por endpoint.")
+    for ep, s in snapshot.items():
+        out.append(f'rifa_db_statements_total{{endpoint="{_label(ep)}"}} {s["sql"]}')
+
+    metric("rifa_db_seconds_total", "counter", "Tiempo en DB por endpoint.")
+    for ep, s in snapshot.items():
+        out.append(f'rifa_db_seconds_total{{endpoint="{_label(ep)}"}} {s["db_seconds"]:.6f}')
+
+    with _lock:
+        pool_wait = dict(_pool_wait, buckets=list(_pool_wait["buckets"]))
+    if isinstance(db.engine.pool, TimedQueuePool):
+        metric("rifa_db_pool_wait_seconds", "histogram", "Espera por conexión del pool (checkout).")
+        cumulative = 0
+        for upper, n in zip(POOL_WAIT_BUCKETS, pool_wait["buckets"]):
+            cumulative += n
+            out.append(f'rifa_db_pool_wait_seconds_bucket{{le="{upper}"}} {cumulative}')
+        out.append(f'rifa_db_pool_wait_seconds_bucket{{le="+Inf"}} {pool_wait["count"]}')
+        out.append(f'rifa_db_pool_wait_seconds_sum {pool_wait["seconds"]:.6f}')
+        out.append(f'rifa_db_pool_wait_seconds_count {pool_wait["count"]}')
+
+        metric("rifa_db_pool_timeouts_total", "counter", "Checkouts que agotaron DB_POOL_TIMEOUT.")
+        out.append(f'rifa_db_pool_timeouts_total {pool_wait["timeouts"]}')
+
+        pool = db.engine.pool
+        for name, value, help_text in (
+            ("rifa_db_pool_size", pool.size(), "Conexiones fijas del pool."),
+            ("rifa_db_pool_checked_out", pool.checkedout(), "Conexiones prestadas ahora."),
+            ("rifa_db_pool_overflow", max(0, pool.overflow()), "Conexiones de overflow abiertas."),
+        ):
+            metric(name, "gauge", help_text)
+            out.append(f"{name} {value}")
+
+    for prefix, info, help_text in (
+        ("rifa_active_raffle_cache", active_raffle_cache_info(), "Caché de rifa activa"),
+        ("rifa_page_cache", page_cache_info(), "Caché de páginas públicas"),
+        ("rifa_audit_queue", audit_writer_info(), "Cola de bitácora por lotes"),
+        ("rifa_message_cache", message_cache_info(), "Plantillas de WhatsApp compiladas"),
+        ("rifa_board_streams", stream_info(), "Streams SSE del tablero"),
+    ):
+        for key, value in info.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or key == "hit_ratio":
+                continue
+            gauge = key in ("entries", "pending", "capacity", "open")
+            name = f"{prefix}_{key}" if gauge else f"{prefix}_{key}_total"
+            metric(name, "gauge" if gauge else "counter", f"{help_text}: {key}.")
+            out.append(f"{name} {value}")
+
+    return "\n".join(out) + "\n"
+
+
+def _before_request() -> None:
+    setattr(g, _G_KEY, {"t0": time.perf_counter(), "sql": 0, "db": 0.0, "done": False})
+
+
+def _finish(status: int) -> None:
+    stats = g.get(_G_KEY)
+    if stats is None or stats["done"]:
+        return
+    stats["done"] = True
+
+    seconds = time.perf_counter() - stats["t0"]
+    endpoint = request.endpoint or "(sin ruta)"
+    record_request(endpoint, status, seconds, stats["sql"], stats["db"])
+
+    slow_ms = current_app.config.get("SLOW_REQUEST_MS", 0)
+    if slow_ms and seconds * 1000.0 >= slow_ms:
+        log.warning(
+            "Petición lenta: %s %s -> %s en %.0f ms (%s SQL, %.0f ms en DB)",
+            request.method, request.path, status, seconds * 1000.0, stats["sql"], stats["db"] * 1000.0,
+        )
+
+
+def _after_request(response):
+    _finish(response.status_code)
+    return response
+
+
+def _teardown_request(exc) -> None:
+    # Sólo llega aquí sin registrar si la vista lanzó excepción.
+    if exc is not None:
+        _finish(500)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and g.get(_G_KEY) is not None:
+        context._metrics_t0 = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    t0 = getattr(context, "_metrics_t0", None)
+    if t0 is None or not has_request_context():
+        return
+    stats = g.get(_G_KEY)
+    if stats is not None:
+        stats["sql"] += 1
+        stats["db"] += time.perf_counter() - t0
+
+
+def metrics_endpoint():
+    token = current_app.config.get("METRICS_TOKEN", "")
+    if token:
+        sent = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(sent.encode(), f"Bearer {token}".encode()):
+            return Response("No autorizado.\n", status=401, mimetype="text/plain")
+    elif not current_user.is_authenticated:
+        return ("Página no encontrada.", 404)
+
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+def instrument_pool(app) -> None:
+    """Antes de db.init_app: el engine se crea con TimedQueuePool si hay pool configurado."""
+    options = app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})
+    if app.config.get("METRICS_ENABLED", True) and "pool_size" in options:
+        options.setdefault("poolclass", TimedQueuePool)
+
+
+def init_metrics(app) -> None:
+    global _engine_hooked
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+
+    if not _engine_hooked:
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        _engine_hooked = True
+
+    app.add_url_rule("/metrics", "metrics", limiter.exempt(metrics_endpoint))
@@ -34,23 +34,50 @@ class Raffle(db.Model):
 
     ticket_price_mxn = db.Column(db.Integer, nullable=False, default=150)
     max_tickets_per_purchase = db.Column(db.Integer, nullable=False, default=3)
+    ticket_count = db.Column(db.Integer, nullable=False, default=100, server_default="100")  # boletos 1..N
 
     draw_at_local = db.Column(db.DateTime, nullable=False)
     is_active = db.Column(db.Boolean, nullable=False, default=True)
 
+    # Se incrementa en la misma transacción que cualquier cambio de Ticket.status
+    # (ver app.board). Sirve como llave de caché / ETag del tablero.
+    board_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    # Horas que un apartado PENDING/APPROVED puede quedar sin pagar antes de que
+    # el barrido (app.expiry) lo cancele y libere los boletos. None = no vence.
+    reservation_ttl_hours = db.Column(db.Integer, nullable=True)
+
+    # Se incrementa al editar las plantillas de WhatsApp: llave de la caché de
+    # plantillas compiladas (ver app.messages).
+    messages_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
     tickets = db.relationship("Ticket", backref="raffle", lazy=True)
     purchases = db.relationship("Purchase", backref="raffle", lazy=True)
 
+    @property
+    def number_width(self) -> int:
+        # Igual que el "01".."100" de siempre: 1,000 -> "001".."1000", 10,000 -> "0001".."10000"
+        return max(2, len(str(max(self.ticket_count - 1, 1))))
+
+    def format_number(self, n: int) -> str:
+        return str(n).zfill(self.number_width)
+
+    def is_valid_number(self, n: int) -> bool:
+        return 1 <= n <= self.ticket_count
+
 
 class Ticket(db.Model):
     __tablename__ = "tickets"
-    __table_args__ = (db.UniqueConstraint("raffle_id", "number", name="uq_ticket_number_per_raffle"),)
+    __table_args__ = (
+        db.UniqueConstraint("raffle_id", "number", name="uq_ticket_number_per_raffle"),
+        db.Index("ix_tickets_raffle_status", "raffle_id", "status"),  # conteos por estado
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     raffle_id = db.Column(db.Integer, db.ForeignKey("raffles.id"), nullable=False)
-    number = db.Column(db.Integer, nullable=False)  # 1..100
+    number = db.Column(db.Integer, nullable=False)  # 1..raffle.ticket_count
     status = db.Column(db.Enum(TicketStatus), nullable=False, default=TicketStatus.FREE)
 
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -61,6 +88,8 @@ purchase_tickets = db.Table(
     "purchase_tickets",
     db.Column("purchase_id", db.Integer, db.ForeignKey("purchases.id"), primary_key=True),
     db.Column("ticket_id", db.Integer, db.ForeignKey("tickets.id"), primary_key=True),
+    # El PK (purchase_id, ticket_id) no sirve para ir de boleto a compra.
+    db.Index("ix_purchase_tickets_ticket_id", "ticket_id"),
 )
 
 
@@ -83,11 +112,21 @@ class Purchase(db.Model):
     approved_at = db.Column(db.DateTime, nullable=True)
     paid_at = db.Column(db.DateTime, nullable=True)
     cancelled_at = db.Column(db.DateTime, nullable=True)
+    # Cualquier UPDATE (ORM o Core) lo mueve: huella de los reportes cacheados.
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     notes = db.Column(db.Text, nullable=True)
 
     tickets = db.relationship("Ticket", secondary=purchase_tickets, lazy="subquery")
 
+    # Listado admin paginado por (created_at, id) por rifa, con o sin estado.
+    __table_args__ = (
+        db.Index("ix_purchases_raffle_created", "raffle_id", "created_at", "id"),
+        db.Index("ix_purchases_raffle_status_created", "raffle_id", "status", "created_at", "id"),
+        # Solicitud pendiente duplicada por WhatsApp (public.request_tickets).
+        db.Index("ix_purchases_raffle_phone_status", "raffle_id", "buyer_phone_e164", "status"),
+    )
+
     def total_amount_mxn(self) -> int:
         price = self.raffle.ticket_price_mxn
         return price * len(self.tickets)
@@ -131,6 +170,67 @@ class AdminUser(UserMixin, db.Model):
         self.locked_until = None
 
 
+class RaffleCounters(db.Model):
+    """
+    Contadores denormalizados por rifa (tabla raffle_stats). Se actualizan con
+    UPDATE ... SET col = col + delta en la MISMA transacción que cada cambio
+    de estado (ver app.stats.apply_stats_delta); `flask stats rebuild` los
+    recalcula y verifica.
+    """
+    __tablename__ = "raffle_stats"
+
+    raffle_id = db.Column(db.Integer, db.ForeignKey("raffles.id"), primary_key=True)
+
+    tickets_free = db.Column(db.Integer, nullable=False, default=0)
+    tickets_reserved = db.Column(db.Integer, nullable=False, default=0)
+    tickets_paid = db.Column(db.Integer, nullable=False, default=0)
+
+    purchases_pending = db.Column(db.Integer, nullable=False, default=0)
+    purchases_approved = db.Column(db.Integer, nullable=False, default=0)
+    purchases_paid = db.Column(db.Integer, nullable=False, default=0)
+    purchases_cancelled = db.Column(db.Integer, nullable=False, default=0)
+
+    paid_revenue_mxn = db.Column(db.Integer, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ReportJobStatus(str, Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+
+
+class ReportJob(db.Model):
+    """Reporte generado en segundo plano (ver app.report_jobs)."""
+    __tablename__ = "report_jobs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    raffle_id = db.Column(db.Integer, db.ForeignKey("raffles.id"), nullable=False)
+    kind = db.Column(db.String(10), nullable=False)  # "xlsx" | "pdf"
+    status = db.Column(db.Enum(ReportJobStatus), nullable=False, default=ReportJobStatus.QUEUED)
+
+    # Estado de las compras al generar: si no cambia, se reutiliza el archivo.
+    fingerprint = db.Column(db.String(64), nullable=False)
+
+    requested_by_id = db.Column(db.Integer, db.ForeignKey("admin_users.id"), nullable=True)
+
+    # El archivo vive en disco (report_jobs.artifact_path); None = ya no está.
+    artifact_size = db.Column(db.Integer, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    requested_by = db.relationship("AdminUser", lazy=True)
+
+    __table_args__ = (
+        db.Index("ix_report_jobs_lookup", "raffle_id", "kind", "status"),
+    )
+
+
 class AuditLog(db.Model):
     __tablename__ = "audit_logs"
 
@@ -148,6 +248,12 @@ class AuditLog(db.Model):
 
     admin_user = db.relationship("AdminUser", lazy=True)
 
+    # Bitácora paginada por (created_at, id), con o sin filtro de admin.
+    __table_args__ = (
+        db.Index("ix_audit_logs_created", "created_at", "id"),
+        db.Index("ix_audit_logs_admin_created", "admin_user_id", "created_at", "id"),
+    )
+
 
 class Winners(db.Model):
     __tablename__ = "winners"
@@ -164,7 +270,37 @@ class Winners(db.Model):
     raffle = db.relationship("Raffle", lazy=True)
 
 
+class MessageTemplate(db.Model):
+    """Texto de WhatsApp de una rifa para un tipo de mensaje (ver app.messages).
+    Sin fila = texto por default."""
+    __tablename__ = "message_templates"
+    __table_args__ = (
+        db.UniqueConstraint("raffle_id", "kind", name="uq_message_template_kind"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    raffle_id = db.Column(db.Integer, db.ForeignKey("raffles.id"), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # reserved | approved | paid | reminder
+    body = db.Column(db.Text, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class RateLimitCounter(db.Model):
+    """Contadores de Flask-Limiter compartidos entre workers (app.ratelimit)."""
+    __tablename__ = "rate_limits"
+
+    key = db.Column(db.String(255), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    expires_at = db.Column(db.Float, nullable=False)  # epoch en segundos
+
+    # Limpieza periódica de ventanas vencidas.
+    __table_args__ = (
+        db.Index("ix_rate_limits_expires_at", "expires_at"),
+    )
+
+
 def generate_folio() -> str:
     # RF26-XXXXXX
     token = secrets.token_hex(3).upper()  # 6 chars hex
-    return f"RF26-{token}"
\ No newline at end of file
+    return f"RF26-{token}"
+
@@ -0,0 +1,103 @@
+"""
+Caché de página completa para las páginas públicas "estáticas"
+(/premios, /como-pagar, /contacto, /terminos, /resultados).
+
+Llave: (endpoint, rifa, generación). La generación sube con
+invalidate_page_cache(), que llaman admin.winners y los cambios de rifa
+(invalidate_active_raffle). Otros workers se enteran al expirar la entrada
+(PAGE_CACHE_TTL_SECONDS). Se sirven los bytes guardados con ETag y
+Cache-Control para que navegador/CDN los reutilicen.
+"""
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from functools import wraps
+
+from flask import Response, current_app, request, session
+
+
+@dataclass(frozen=True)
+class CachedPage:
+    body: bytes
+    mimetype: str
+    etag: str
+    expires_at: float
+
+
+_lock = threading.Lock()
+_store = {}
+_generation = 0
+_counters = {"hits": 0, "misses": 0, "bypass": 0, "invalidations": 0}
+
+
+def invalidate_page_cache() -> None:
+    global _generation
+    with _lock:
+        _generation += 1
+        _store.clear()
+        _counters["invalidations"] += 1
+
+
+def page_cache_info() -> dict:
+    with _lock:
+        info = dict(_counters)
+        info["entries"] = len(_store)
+    return info
+
+
+def _has_pending_flashes() -> bool:
+    # Con mensajes flash pendientes la página no es la misma para todos
+    # (base.html los pinta); sin cookie de sesión no puede haberlos.
+    if current_app.config.get("SESSION_COOKIE_NAME", "session") not in request.cookies:
+        return False
+    return bool(session.get("_flashes"))
+
+
+def _count(key: str) -> None:
+    with _lock:
+        _counters[key] += 1
+
+
+def cached_page(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_app.config.get("PAGE_CACHE_ENABLED", True) or _has_pending_flashes():
+            _count("bypass")
+            return view(*args, **kwargs)
+
+        from app.raffles import get_active_raffle
+
+        key = (request.endpoint, get_active_raffle().id, _generation)
+        now = time.monotonic()
+        entry = _store.get(key)
+
+        if entry is None or entry.expires_at <= now:
+            _count("misses")
+            resp = current_app.make_response(view(*args, **kwargs))
+            if resp.status_code != 200:
+                return resp
+
+            body = resp.get_data()
+            entry = CachedPage(
+                body=body,
+                mimetype=resp.mimetype,
+                etag=hashlib.sha1(body).hexdigest()[:20],
+                expires_at=now + current_app.config.get("PAGE_CACHE_TTL_SECONDS", 60),
+            )
+            with _lock:
+                if key[2] == _generation:
+                    _store[key] = entry
+        else:
+            _count("hits")
+
+        if request.if_none_match.contains(entry.etag):
+            resp = Response(status=304)
+        else:
+            resp = Response(entry.body, mimetype=entry.mimetype)
+
+        resp.set_etag(entry.etag)
+        resp.headers["Cache-Control"] = f"public, max-age={current_app.config.get('PAGE_CACHE_MAX_AGE', 30)}"
+        return resp
+
+    return wrapper
@@ -0,0 +1,74 @@
+"""
+Paginación por cursor (keyset) sobre (created_at, id), más recientes primero.
+
+En vez de OFFSET (que lee y descarta todas las filas anteriores), cada página
+pide "lo que sigue después de la última fila vista":
+
+    WHERE (created_at, id) < (:c, :i) ORDER BY created_at DESC, id DESC LIMIT n
+
+Con un índice que termine en (created_at, id) el costo por página no crece
+con la tabla. El cursor es opaco para el navegador (base64 de "fecha|id").
+"""
+import base64
+from datetime import datetime, timedelta
+
+from sqlalchemy import tuple_
+
+
+PAGE_SIZE = 50
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(value: str):
+    """(created_at, id) o None si el cursor no es válido."""
+    if not value:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)).decode()
+        stamp, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(stamp), int(row_id)
+    except ValueError:
+        return None
+
+
+def parse_day(value: str):
+    """'YYYY-MM-DD' -> datetime (00:00) o None."""
+    try:
+        return datetime.strptime((value or "").strip(), "%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def filter_created_between(stmt, created_col, date_from, date_to):
+    """Rango de fechas inclusivo por día (date_to incluye todo ese día)."""
+    if date_from:
+        stmt = stmt.where(created_col >= date_from)
+    if date_to:
+        stmt = stmt.where(created_col < date_to + timedelta(days=1))
+    return stmt
+
+
+def keyset_page(session, stmt, created_col, id_col, cursor: str = None, page_size: int = PAGE_SIZE):
+    """
+    Ejecuta stmt (ya filtrado) ordenado por (created_at, id) DESC a partir del
+    cursor. Devuelve (rows, next_cursor); next_cursor es None en la última
+    página. Cada fila debe traer la entidad como primer elemento.
+    """
+    after = decode_cursor(cursor)
+    if after is not None:
+        stmt = stmt.where(tuple_(created_col, id_col) < tuple_(*after))
+
+    rows = session.execute(
+        stmt.order_by(created_col.desc(), id_col.desc()).limit(page_size + 1)
+    ).all()
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1][0]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return rows, next_cursor
@@ -1,63 +1,44 @@
-import json
-from datetime import datetime
-
-from flask import Blueprint, render_template, current_app, request, redirect, url_for, flash, jsonify
-from sqlalchemy import and_
+from flask import Blueprint, Response, render_template, current_app, request, flash
 from sqlalchemy.exc import IntegrityError
 
 from app.extensions import db, limiter
-from app.models import (
-    Raffle, Ticket, TicketStatus, Purchase, PurchaseStatus, Winners, generate_folio
-)
+from app.models import TicketStatus, Purchase, PurchaseStatus, Winners, generate_folio
 from app.forms import TicketRequestForm, VerifyForm
+from app.events import acquire_stream_slot, release_stream_slot, stream_board_events
+from app.page_cache import cached_page
+from app.raffles import get_active_raffle
+from app.reservations import ReservationError, reserve_tickets
+from app.security import client_ip, purchase_phone_invalid, purchase_phone_key
+from app.board import (
+    FORMAT_BITS, FORMAT_JSON, BITS_MIMETYPE, board_etag, bump_board_version,
+    current_board_version, get_board_snapshot
+)
+from app.stats import apply_stats_delta, get_raffle_stats
+from app.transactions import unit_of_work
 
 public_bp = Blueprint("public", __name__)
 
 
-def begin_clean():
-    """
-    SQLAlchemy 2.x inicia una transacción automática (autobegin) en el primer SELECT.
-    Si después llamas session.begin() puede fallar con:
-      InvalidRequestError: A transaction is already begun on this Session.
-
-    Solución: rollback para cerrar la transacción automática y luego begin controlado.
-    """
-    try:
-        db.session.rollback()
-    except Exception:
-        pass
-    return db.session.begin()
-
-
-def get_active_raffle() -> Raffle:
-    raffle = Raffle.query.filter_by(is_active=True).order_by(Raffle.id.desc()).first()
-    if not raffle:
-        raise RuntimeError("No hay rifa activa. Ejecuta 'flask seed'.")
-    return raffle
-
-
 @public_bp.route("/")
 def home():
     raffle = get_active_raffle()
-    total = Ticket.query.filter_by(raffle_id=raffle.id).count()
-    free = Ticket.query.filter_by(raffle_id=raffle.id, status=TicketStatus.FREE).count()
-    reserved = Ticket.query.filter_by(raffle_id=raffle.id, status=TicketStatus.RESERVED).count()
-    paid = Ticket.query.filter_by(raffle_id=raffle.id, status=TicketStatus.PAID).count()
+    stats = get_raffle_stats(raffle)
 
     winners = Winners.query.filter_by(raffle_id=raffle.id).first()
 
     return render_template(
         "public/home.html",
         raffle=raffle,
-        total=total,
-        free=free,
-        reserved=reserved,
-        paid=paid,
+        total=stats.total,
+        free=stats.free,
+        reserved=stats.reserved,
+        paid=stats.paid,
         winners=winners,
     )
 
 
 @public_bp.route("/premios")
+@cached_page
 def prizes():
     raffle = get_active_raffle()
     return render_template("public/prizes.html", raffle=raffle)
@@ -66,33 +47,85 @@ def prizes():
 @public_bp.route("/boletos")
 def tickets():
     raffle = get_active_raffle()
-    total = Ticket.query.filter_by(raffle_id=raffle.id).count()
-    free = Ticket.query.filter_by(raffle_id=raffle.id, status=TicketStatus.FREE).count()
-    reserved = Ticket.query.filter_by(raffle_id=raffle.id, status=TicketStatus.RESERVED).count()
-    paid = Ticket.query.filter_by(raffle_id=raffle.id, status=TicketStatus.PAID).count()
+    stats = get_raffle_stats(raffle)
 
     return render_template(
         "public/tickets.html",
         raffle=raffle,
-        total=total,
-        free=free,
-        reserved=reserved,
-        paid=paid,
+        total=stats.total,
+        free=stats.free,
+        reserved=stats.reserved,
+        paid=stats.paid,
     )
 
 
 @public_bp.route("/api/tickets")
 def api_tickets():
     raffle = get_active_raffle()
-    tickets = Ticket.query.filter_by(raffle_id=raffle.id).order_by(Ticket.number.asc()).all()
-    return jsonify({
-        "raffle_id": raffle.id,
-        "tickets": [{"n": t.number, "s": t.status.value} for t in tickets]
-    })
+    version = current_board_version(raffle.id)
+
+    # Formato compacto (2 bits por boleto): ?format=bits o Accept: application/vnd.rifa.board-bits+json
+    wants_bits = (
+        request.args.get("format") == FORMAT_BITS
+        or request.accept_mimetypes.best_match(["application/json", BITS_MIMETYPE]) == BITS_MIMETYPE
+    )
+    fmt = FORMAT_BITS if wants_bits else FORMAT_JSON
+    mimetype = BITS_MIMETYPE if wants_bits else "application/json"
+    etag = board_etag(raffle.id, version, fmt)
+
+    # El cliente ya tiene esta versión: 304 sin tocar la tabla tickets.
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        snap = get_board_snapshot(raffle.id, version)
+        resp = Response(snap.body(fmt), mimetype=mimetype)
+
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.vary.add("Accept")
+    return resp
+
+
+@public_bp.route("/api/tickets/stream")
+def api_tickets_stream():
+    if not current_app.config.get("BOARD_STREAM_ENABLED", False):
+        return ("", 404)
+
+    # Lecturas antes de tomar el cupo: si fallan (sin rifa activa, error de
+    # DB) no hay cupo que devolver.
+    raffle = get_active_raffle()
+    raffle_id, version = raffle.id, current_board_version(raffle.id)
+    # El stream no usa la DB: suelta la conexión antes de quedarse escuchando.
+    db.session.close()
+
+    # Cada stream retiene un hilo: con el cupo lleno, 503 y tickets.js se
+    # queda con el polling en vez de dejar sin hilos a compras y admin.
+    if not acquire_stream_slot(current_app.config.get("BOARD_STREAM_MAX_CLIENTS", 8)):
+        return Response("", status=503, headers={"Retry-After": "60", "Cache-Control": "no-store"})
+
+    try:
+        resp = Response(
+            stream_board_events(raffle_id, version, current_app.config.get("BOARD_STREAM_MAX_SECONDS", 55)),
+            mimetype="text/event-stream",
+        )
+        resp.headers["Cache-Control"] = "no-cache"
+        resp.headers["X-Accel-Buffering"] = "no"
+        # call_on_close corre aunque el generador nunca arranque (cliente que se va).
+        resp.call_on_close(release_stream_slot)
+    except BaseException:
+        release_stream_slot()
+        raise
+    return resp
 
 
 @public_bp.route("/solicitar", methods=["GET", "POST"])
-@limiter.limit("15 per hour")
+@limiter.limit(lambda: current_app.config.get("PURCHASE_IP_RATE_LIMIT", "15 per hour"))
+@limiter.limit(
+    lambda: current_app.config.get("PURCHASE_PHONE_RATE_LIMIT", "5 per hour"),
+    key_func=purchase_phone_key,
+    methods=["POST"],
+    exempt_when=purchase_phone_invalid,
+)
 def request_tickets():
     raffle = get_active_raffle()
     form = TicketRequestForm()
@@ -126,8 +159,11 @@ def request_tickets():
         flash(f"Máximo {raffle.max_tickets_per_purchase} boletos por compra.", "error")
         return render_template("public/request.html", raffle=raffle, form=form), 400
 
-    if any(n < 1 or n > 100 for n in numbers):
-        flash("Los boletos deben estar entre 01 y 100.", "error")
+    if not all(raffle.is_valid_number(n) for n in numbers):
+        flash(
+            f"Los boletos deben estar entre {raffle.format_number(1)} y {raffle.format_number(raffle.ticket_count)}.",
+            "error"
+        )
         return render_template("public/request.html", raffle=raffle, form=form), 400
 
     existing_pending = Purchase.query.filter_by(
@@ -140,28 +176,11 @@ def request_tickets():
         return render_template("public/request.html", raffle=raffle, form=form), 409
 
     buyer_name = form.buyer_name.data.strip()
-    ip_address = request.headers.get("X-Forwarded-For", request.remote_addr)
+    ip_address = client_ip()
 
     try:
-        # ✅ FIX: evita InvalidRequestError por autobegin
-        with begin_clean():
-            selected_tickets = (
-                Ticket.query
-                .filter(and_(
-                    Ticket.raffle_id == raffle.id,
-                    Ticket.number.in_(numbers)
-                ))
-                .with_for_update()
-                .all()
-            )
-
-            if len(selected_tickets) != len(numbers):
-                raise ValueError("Uno o más boletos no existen.")
-
-            for t in selected_tickets:
-                if t.status != TicketStatus.FREE:
-                    raise ValueError(f"El boleto {t.number:02d} ya no está libre.")
-
+        # Misma transacción que las lecturas de arriba (ver app.transactions)
+        with unit_of_work():
             folio = generate_folio()
             purchase = Purchase(
                 raffle_id=raffle.id,
@@ -174,27 +193,35 @@ def request_tickets():
             db.session.add(purchase)
             db.session.flush()
 
-            for t in selected_tickets:
-                t.status = TicketStatus.RESERVED
-                purchase.tickets.append(t)
+            # UPDATE condicional todo-o-nada (ver app.reservations)
+            reserve_tickets(raffle.id, numbers, purchase.id, TicketStatus.RESERVED)
 
+            apply_stats_delta(
+                raffle,
+                tickets=[(TicketStatus.FREE, TicketStatus.RESERVED)] * len(numbers),
+                purchases=[(None, PurchaseStatus.PENDING)],
+            )
+            bump_board_version(raffle.id, [(n, TicketStatus.RESERVED) for n in numbers])
+
+    except ReservationError as e:
+        flash(f"El boleto {raffle.format_number(e.unavailable[0])} ya no está libre.", "error")
+        return render_template("public/request.html", raffle=raffle, form=form), 409
     except ValueError as e:
-        db.session.rollback()
         flash(str(e), "error")
         return render_template("public/request.html", raffle=raffle, form=form), 409
     except IntegrityError:
-        db.session.rollback()
         flash("Error al generar folio. Intenta de nuevo.", "error")
         return render_template("public/request.html", raffle=raffle, form=form), 500
     except Exception:
-        db.session.rollback()
         flash("Error al procesar la solicitud.", "error")
         return render_template("public/request.html", raffle=raffle, form=form), 500
 
+    # Sólo el folio (ya en memoria): leer `purchase` después del commit lo
+    # recargaría, con sus boletos, en otra transacción.
     return render_template(
         "public/request_success.html",
         raffle=raffle,
-        purchase=purchase,
+        folio=folio,
         selected_numbers=numbers
     )
 
@@ -231,24 +258,28 @@ def verify():
 
 
 @public_bp.route("/como-pagar")
+@cached_page
 def how_to_pay():
     raffle = get_active_raffle()
     return render_template("public/how_to_pay.html", raffle=raffle)
 
 
 @public_bp.route("/contacto")
+@cached_page
 def contact():
     raffle = get_active_raffle()
     return render_template("public/contact.html", raffle=raffle)
 
 
 @public_bp.route("/terminos")
+@cached_page
 def terms():
     raffle = get_active_raffle()
     return render_template("public/terms.html", raffle=raffle)
 
 
 @public_bp.route("/resultados")
+@cached_page
 def results():
     raffle = get_active_raffle()
     winners = Winners.query.filter_by(raffle_id=raffle.id).first()
@@ -0,0 +1,64 @@
+"""
+Proveedor único de la rifa activa (antes duplicado en public/ y admin/).
+
+Guarda por proceso una copia DESACOPLADA (expunge) de la fila Raffle durante
+ACTIVE_RAFFLE_TTL_SECONDS, así que páginas como /premios o /contacto ya no
+pagan un SELECT por request. Es de sólo lectura: para modificar la rifa,
+cargarla con la sesión y luego llamar invalidate_active_raffle().
+
+Ojo: board_version cambia con cada apartado; NO leerla de aquí (usar
+app.board.current_board_version).
+"""
+import threading
+import time
+
+from flask import current_app
+
+from app.extensions import db
+from app.models import Raffle
+from app.page_cache import invalidate_page_cache
+
+
+_lock = threading.Lock()
+_entry = None  # (raffle desacoplada, expira_en monotonic)
+_counters = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def get_active_raffle() -> Raffle:
+    global _entry
+
+    entry = _entry
+    if entry is not None and entry[1] > time.monotonic():
+        with _lock:
+            _counters["hits"] += 1
+        return entry[0]
+
+    raffle = Raffle.query.filter_by(is_active=True).order_by(Raffle.id.desc()).first()
+    if not raffle:
+        raise RuntimeError("No hay rifa activa. Ejecuta 'flask seed'.")
+    db.session.expunge(raffle)
+
+    ttl = current_app.config.get("ACTIVE_RAFFLE_TTL_SECONDS", 30)
+    with _lock:
+        _counters["misses"] += 1
+        if ttl > 0:
+            _entry = (raffle, time.monotonic() + ttl)
+    return raffle
+
+
+def invalidate_active_raffle() -> None:
+    """Llamar después de cambiar datos de la rifa (otros workers: expira por TTL).
+    También descarta las páginas cacheadas, que dependen de la rifa."""
+    global _entry
+    with _lock:
+        _entry = None
+        _counters["invalidations"] += 1
+    invalidate_page_cache()
+
+
+def active_raffle_cache_info() -> dict:
+    with _lock:
+        info = dict(_counters)
+    total = info["hits"] + info["misses"]
+    info["hit_ratio"] = (info["hits"] / total) if total else 0.0
+    return info
@@ -0,0 +1,317 @@
+"""
+Almacenamiento compartido para Flask-Limiter en nuestra propia base (tabla
+rate_limits), para que "15 per hour" sea 15 entre todos los workers y no se
+reinicie con cada deploy.
+
+    RATELIMIT_STORAGE_URI = "sqlalchemy://"   (default con Postgres)
+
+Ventana fija: una fila por llave (key, count, expires_at). Para no pagar un
+viaje a la base por petición, cada worker lleva una vista en memoria
+(total global visto + incrementos locales sin mandar) y un hilo la sincroniza
+cada RATELIMIT_FLUSH_SECONDS con un upsert por lote:
+
+    INSERT INTO rate_limits (key, count, expires_at) VALUES (...), (...)
+    ON CONFLICT (key) DO UPDATE SET
+        count      = CASE WHEN vencida THEN excluded.count ELSE count + excluded.count END,
+        expires_at = CASE WHEN vencida THEN excluded.expires_at ELSE expires_at END
+    RETURNING key, count, expires_at
+
+El RETURNING trae el total global para refrescar la vista; las llaves que este
+worker sólo consulta se refrescan con un SELECT por lote. Sólo la primera vez
+que un worker ve una llave paga un SELECT en la petición. Costo: entre dos
+sincronizaciones cada worker puede dejar pasar de más lo que le llegue en ese
+intervalo. Las filas vencidas se borran cada RATELIMIT_CLEANUP_SECONDS.
+
+También sirve para la estrategia "sliding-window-counter" (dos ventanas fijas
+con llave por tiempo, igual que MemoryStorage de limits). "moving-window" no.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from math import floor
+
+from flask import current_app
+from limits.storage import SlidingWindowCounterSupport, Storage
+from limits.storage.base import TimestampedSlidingWindow
+from sqlalchemy import case, delete, select, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.extensions import db
+from app.models import RateLimitCounter
+
+
+log = logging.getLogger(__name__)
+
+_KEY_MAX = RateLimitCounter.__table__.c.key.type.length
+
+# Llaves que nadie toca en este tiempo se olvidan de la vista local.
+_IDLE_FORGET_SECONDS = 600
+
+
+@dataclass
+class _Counter:
+    base: int           # total global según la última sincronización
+    pending: int        # incrementos locales aún no enviados
+    expires_at: float   # epoch (time.time())
+    synced_at: float
+    touched_at: float
+
+
+def _db_key(key: str) -> str:
+    if len(key) <= _KEY_MAX:
+        return key
+    return "sha1:" + hashlib.sha1(key.encode()).hexdigest()
+
+
+def _dialect_insert():
+    name = db.engine.dialect.name
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"rate_limits necesita Postgres o SQLite (no {name}).")
+    return insert
+
+
+class DatabaseStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    STORAGE_SCHEME = ["sqlalchemy"]
+
+    def __init__(self, uri: str = None, wrap_exceptions: bool = False,
+                 flush_seconds: float = 1.0, cleanup_seconds: float = 300, **options) -> None:
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.flush_seconds = max(0.05, float(flush_seconds))
+        self.cleanup_seconds = float(cleanup_seconds)
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._app = None
+        self._thread_pid = None
+        self._last_cleanup = time.time()
+
+    @property
+    def base_exceptions(self):
+        return SQLAlchemyError
+
+    # --- vista local ---------------------------------------------------------
+
+    def _entry(self, key: str, now: float):
+        """Entrada local vigente; None si hay que cargarla de la base."""
+        entry = self._counters.get(key)
+        if entry is not None and entry.expires_at <= now:
+            # La ventana cerró: lo no enviado pertenecía a la ventana vieja.
+            entry.base, entry.pending, entry.expires_at = 0, 0, 0.0
+        return entry
+
+    def _load(self, key: str, now: float) -> _Counter:
+        with db.engine.connect() as conn:
+            row = conn.execute(
+                select(RateLimitCounter.count, RateLimitCounter.expires_at)
+                .where(RateLimitCounter.key == _db_key(key))
+            ).first()
+        if row is not None and row.expires_at > now:
+            return _Counter(row.count, 0, row.expires_at, now, now)
+        return _Counter(0, 0, 0.0, now, now)
+
+    def _get_or_load(self, key: str, now: float) -> _Counter:
+        self._ensure_thread()
+        with self._lock:
+            entry = self._entry(key, now)
+        if entry is not None:
+            return entry
+
+        loaded = self._load(key, now)
+        with self._lock:
+            # Otro hilo pudo cargarla mientras tanto.
+            return self._counters.setdefault(key, loaded)
+
+    def incr(self, key: str, expiry: float, amount: int = 1) -> int:
+        now = time.time()
+        entry = self._get_or_load(key, now)
+        with self._lock:
+            entry = self._entry(key, now) or self._counters.setdefault(key, entry)
+            if entry.expires_at <= now:
+                entry.expires_at = now + expiry
+            entry.pending += amount
+            entry.touched_at = now
+            return entry.base + entry.pending
+
+    def decr(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            entry = self._counters.get(key)
+            if entry is None:
+                return 0
+            entry.pending -= amount
+            return max(0, entry.base + entry.pending)
+
+    def get(self, key: str) -> int:
+        now = time.time()
+        entry = self._get_or_load(key, now)
+        with self._lock:
+            entry.touched_at = now
+            if entry.expires_at <= now:
+                return 0
+            return max(0, entry.base + entry.pending)
+
+    def get_expiry(self, key: str) -> float:
+        now = time.time()
+        entry = self._get_or_load(key, now)
+        return entry.expires_at if entry.expires_at > now else now
+
+    def check(self) -> bool:
+        try:
+            with db.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return True
+        except SQLAlchemyError:
+            return False
+
+    def reset(self) -> int:
+        with self._lock:
+            self._counters.clear()
+        with db.engine.begin() as conn:
+            return conn.execute(delete(RateLimitCounter)).rowcount
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._counters.pop(key, None)
+        with db.engine.begin() as conn:
+            conn.execute(delete(RateLimitCounter).where(RateLimitCounter.key == _db_key(key)))
+
+    # --- sliding-window-counter (misma lógica que limits.MemoryStorage) ------
+
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count, previous_ttl, current_count, _ = self._sliding_info(previous_key, current_key, expiry, now)
+        if floor(previous_count * previous_ttl / expiry + current_count) + amount > limit:
+            return False
+
+        current_count = self.incr(current_key, 2 * expiry, amount=amount)
+        if floor(previous_count * previous_ttl / expiry + current_count) > limit:
+            self.decr(current_key, amount)
+            return False
+        return True
+
+    def get_sliding_window(self, key: str, expiry: int) -> tuple:
+        now = time.time()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        return self._sliding_info(previous_key, current_key, expiry, now)
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        self.clear(previous_key)
+        self.clear(current_key)
+
+    def _sliding_info(self, previous_key: str, current_key: str, expiry: int, now: float) -> tuple:
+        previous_count = self.get(previous_key)
+        current_count = self.get(current_key)
+        previous_ttl = 0.0 if previous_count == 0 else (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    # --- sincronización en segundo plano -------------------------------------
+
+    def _ensure_thread(self) -> None:
+        # Uno por proceso, arrancado en la primera petición (después del fork).
+        if self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread_pid == os.getpid():
+                return
+            self._app = current_app._get_current_object()
+            self._counters.clear()
+            threading.Thread(target=self._sync_forever, name="ratelimit-sync", daemon=True).start()
+            self._thread_pid = os.getpid()
+
+    def _sync_forever(self) -> None:
+        while True:
+            time.sleep(self.flush_seconds)
+            with self._app.app_context():
+                try:
+                    self.sync()
+                except Exception:
+                    log.exception("rate_limits: falló la sincronización")
+
+    def sync(self) -> None:
+        """Manda los incrementos pendientes y refresca las llaves en uso."""
+        now = time.time()
+        to_send, to_refresh = {}, []
+        with self._lock:
+            for key, entry in list(self._counters.items()):
+                if (entry.expires_at <= now and entry.pending <= 0) or now - entry.touched_at > _IDLE_FORGET_SECONDS:
+                    del self._counters[key]
+                elif entry.pending:
+                    to_send[key] = (entry.pending, entry.expires_at)
+                    entry.base += entry.pending
+                    entry.pending = 0
+                elif now - entry.synced_at >= self.flush_seconds:
+                    to_refresh.append(key)
+
+        fresh = {}
+        try:
+            with db.engine.begin() as conn:
+                if to_send:
+                    fresh = self._upsert(conn, to_send, now)
+        except Exception:
+            # Se reintentan en la siguiente vuelta.
+            with self._lock:
+                for key, (pending, _) in to_send.items():
+                    entry = self._counters.get(key)
+                    if entry is not None:
+                        entry.base -= pending
+                        entry.pending += pending
+            raise
+
+        with db.engine.begin() as conn:
+            if to_refresh:
+                by_db_key = {_db_key(k): k for k in to_refresh}
+                rows = conn.execute(
+                    select(RateLimitCounter.key, RateLimitCounter.count, RateLimitCounter.expires_at)
+                    .where(RateLimitCounter.key.in_(list(by_db_key)))
+                ).all()
+                for row in rows:
+                    fresh[by_db_key[row.key]] = (row.count, row.expires_at)
+
+            if self.cleanup_seconds and now - self._last_cleanup >= self.cleanup_seconds:
+                self._last_cleanup = now
+                conn.execute(delete(RateLimitCounter).where(RateLimitCounter.expires_at < now))
+
+        with self._lock:
+            for key, (count, expires_at) in fresh.items():
+                entry = self._counters.get(key)
+                if entry is None:
+                    continue
+                if expires_at > now:
+                    entry.base, entry.expires_at = count, expires_at
+                entry.synced_at = now
+
+    def _upsert(self, conn, to_send: dict, now: float) -> dict:
+        insert = _dialect_insert()
+        by_db_key = {_db_key(key): key for key in to_send}
+
+        stmt = insert(RateLimitCounter).values([
+            {"key": _db_key(key), "count": pending, "expires_at": expires_at}
+            for key, (pending, expires_at) in to_send.items()
+        ])
+        expired = RateLimitCounter.expires_at <= now
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RateLimitCounter.key],
+            set_={
+                "count": case((expired, stmt.excluded.count), else_=RateLimitCounter.count + stmt.excluded.count),
+                "expires_at": case((expired, stmt.excluded.expires_at), else_=RateLimitCounter.expires_at),
+            },
+        ).returning(RateLimitCounter.key, RateLimitCounter.count, RateLimitCounter.expires_at)
+
+        return {by_db_key[row.key]: (row.count, row.expires_at) for row in conn.execute(stmt)}
+
+    def info(self) -> dict:
+        with self._lock:
+            return {
+                "keys": len(self._counters),
+                "pending": sum(max(0, e.pending) for e in self._counters.values()),
+            }
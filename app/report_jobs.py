@@ -0,0 +1,265 @@
+"""
+Cola de reportes en segundo plano (Excel / PDF).
+
+La cola vive en la tabla report_jobs; el trabajo lo hace un ThreadPoolExecutor
+local (REPORT_WORKERS hilos por worker de gunicorn, creado perezosamente
+después del fork) o, con REPORT_WORKERS=0, un proceso aparte:
+
+    flask reports work
+
+Un job se "reclama" con UPDATE ... WHERE status='QUEUED', así que aunque dos
+procesos lo vean sólo uno lo genera. El archivo va a disco en
+REPORT_ARTIFACT_DIR, nombrado por rifa, tipo y huella de las compras
+(artifact_path), y se descarga con send_file(ruta) sin pasar por memoria; la
+fila sólo guarda la huella y el tamaño. Si nada cambió desde entonces,
+enqueue_report() devuelve ese mismo job en vez de generar otro. Con
+`flask reports work` en otra máquina el directorio debe ser compartido; si el
+archivo desaparece (disco efímero tras un deploy) el job cuenta como vencido
+y se genera de nuevo.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, select, update
+
+from app.board import current_board_version
+from app.extensions import db
+from app.models import Purchase, Raffle, ReportJob, ReportJobStatus
+from app.reports import PDF_MIMETYPE, XLSX_MIMETYPE, write_purchases_pdf, write_purchases_xlsx
+
+
+log = logging.getLogger(__name__)
+
+# kind -> (generador, mimetype, nombre de descarga)
+REPORT_KINDS = {
+    "xlsx": (write_purchases_xlsx, XLSX_MIMETYPE, "reporte_compras.xlsx"),
+    "pdf": (write_purchases_pdf, PDF_MIMETYPE, "reporte_compras.pdf"),
+}
+
+ACTIVE_STATUSES = (ReportJobStatus.QUEUED, ReportJobStatus.RUNNING)
+
+# Un job QUEUED más viejo que esto probablemente se encoló en un worker que
+# ya murió (deploy/reinicio): se vuelve a mandar al pool local.
+_REQUEUE_AFTER = timedelta(seconds=30)
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def artifact_path(job) -> str:
+    directory = current_app.config.get("REPORT_ARTIFACT_DIR")
+    return os.path.join(directory, f"rifa{job.raffle_id}-{job.kind}-{job.fingerprint}.{job.kind}")
+
+
+def has_artifact(job) -> bool:
+    return job.status == ReportJobStatus.DONE and job.artifact_size is not None and os.path.exists(artifact_path(job))
+
+
+def purchases_fingerprint(raffle_id: int) -> str:
+    """
+    Cambia si se crea o modifica cualquier compra de la rifa (updated_at) o si
+    cambia cualquier boleto (board_version, p.ej. liberar un boleto).
+    """
+    count, last_update = db.session.execute(
+        select(func.count(Purchase.id), func.max(Purchase.updated_at))
+        .where(Purchase.raffle_id == raffle_id)
+    ).one()
+    raw = f"{count}|{last_update.isoformat() if last_update else '-'}|{current_board_version(raffle_id)}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def enqueue_report(raffle_id: int, kind: str, requested_by_id=None) -> tuple:
+    """
+    Devuelve (job, reused). reused=True si ya hay un archivo (o un job en
+    curso) con la huella actual de las compras.
+    """
+    if kind not in REPORT_KINDS:
+        raise ValueError(f"Tipo de reporte desconocido: {kind}")
+
+    fingerprint = purchases_fingerprint(raffle_id)
+
+    existing = (
+        ReportJob.query
+        .filter(
+            ReportJob.raffle_id == raffle_id,
+            ReportJob.kind == kind,
+            ReportJob.fingerprint == fingerprint,
+            ReportJob.status.in_((ReportJobStatus.DONE,) + ACTIVE_STATUSES),
+        )
+        .order_by(ReportJob.id.desc())
+        .first()
+    )
+    if existing and (existing.status != ReportJobStatus.DONE or has_artifact(existing)):
+        return existing, True
+
+    job = ReportJob(
+        raffle_id=raffle_id,
+        kind=kind,
+        fingerprint=fingerprint,
+        requested_by_id=requested_by_id,
+        status=ReportJobStatus.QUEUED,
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    _submit(job.id)
+    return job, False
+
+
+def latest_fresh_job(raffle_id: int, kind: str):
+    """Último job DONE cuya huella sigue vigente y cuyo archivo existe (o None)."""
+    job = (
+        ReportJob.query
+        .filter_by(
+            raffle_id=raffle_id,
+            kind=kind,
+            status=ReportJobStatus.DONE,
+            fingerprint=purchases_fingerprint(raffle_id),
+        )
+        .order_by(ReportJob.id.desc())
+        .first()
+    )
+    return job if job is not None and has_artifact(job) else None
+
+
+def recover_stale_jobs() -> None:
+    """
+    RUNNING por más de REPORT_JOB_TIMEOUT_SECONDS -> FAILED (el proceso murió a
+    medias). QUEUED viejos se vuelven a mandar al pool local.
+    """
+    now = datetime.utcnow()
+    timeout = timedelta(seconds=current_app.config.get("REPORT_JOB_TIMEOUT_SECONDS", 600))
+
+    db.session.execute(
+        update(ReportJob)
+        .where(ReportJob.status == ReportJobStatus.RUNNING, ReportJob.started_at < now - timeout)
+        .values(status=ReportJobStatus.FAILED, finished_at=now, error="Tiempo agotado (el proceso se reinició?)")
+    )
+    db.session.commit()
+
+    if current_app.config.get("REPORT_WORKERS", 1) <= 0:
+        return
+
+    stale = db.session.execute(
+        select(ReportJob.id)
+        .where(ReportJob.status == ReportJobStatus.QUEUED, ReportJob.created_at < now - _REQUEUE_AFTER)
+    ).scalars().all()
+    for job_id in stale:
+        _submit(job_id)
+
+
+def run_job(job_id: int) -> bool:
+    """Genera el reporte si este proceso logra reclamarlo. Requiere app context."""
+    claimed = db.session.execute(
+        update(ReportJob)
+        .where(ReportJob.id == job_id, ReportJob.status == ReportJobStatus.QUEUED)
+        .values(status=ReportJobStatus.RUNNING, started_at=datetime.utcnow())
+    ).rowcount
+    db.session.commit()
+    if not claimed:
+        return False
+
+    job = db.session.get(ReportJob, job_id)
+    try:
+        raffle = db.session.get(Raffle, job.raffle_id)
+        write, _, _ = REPORT_KINDS[job.kind]
+
+        # La huella se toma ANTES de leer: si algo cambia durante la
+        # generación, la siguiente solicitud ya no coincide y se regenera.
+        job.fingerprint = purchases_fingerprint(raffle.id)
+        path = artifact_path(job)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Se escribe a un temporal del mismo directorio y se renombra: una
+        # descarga concurrente nunca ve un archivo a medias.
+        tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                write(raffle, fileobj=f)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        job.artifact_size = os.path.getsize(path)
+        job.status = ReportJobStatus.DONE
+        job.finished_at = datetime.utcnow()
+
+        # Sólo guardamos el archivo más reciente de cada tipo.
+        older = ReportJob.query.filter(
+            ReportJob.raffle_id == raffle.id,
+            ReportJob.kind == job.kind,
+            ReportJob.id != job.id,
+            ReportJob.artifact_size.is_not(None),
+        ).all()
+        for old in older:
+            old.artifact_size = None
+        db.session.commit()
+
+        for old_path in {artifact_path(old) for old in older} - {path}:
+            try:
+                os.remove(old_path)
+            except FileNotFoundError:
+                pass
+    except Exception as exc:
+        db.session.rollback()
+        log.exception("Reporte %s falló", job_id)
+        db.session.execute(
+            update(ReportJob)
+            .where(ReportJob.id == job_id)
+            .values(status=ReportJobStatus.FAILED, finished_at=datetime.utcnow(), error=str(exc)[:500])
+        )
+        db.session.commit()
+    return True
+
+
+def work_forever(poll_seconds: float = 2.0, once: bool = False) -> None:
+    """Bucle del proceso `flask reports work`. Requiere app context."""
+    while True:
+        recover_stale_jobs()
+        queued = db.session.execute(
+            select(ReportJob.id).where(ReportJob.status == ReportJobStatus.QUEUED).order_by(ReportJob.id)
+        ).scalars().all()
+        db.session.rollback()
+
+        for job_id in queued:
+            run_job(job_id)
+
+        if once:
+            return
+        time.sleep(poll_seconds)
+
+
+def _get_executor(workers: int):
+    global _executor, _executor_pid
+    # Un pool por proceso: el de un padre pre-fork no tiene hilos vivos.
+    if _executor is None or _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report")
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def _submit(job_id: int) -> None:
+    workers = current_app.config.get("REPORT_WORKERS", 1)
+    if workers <= 0:
+        return  # lo toma `flask reports work`
+
+    app = current_app._get_current_object()
+    _get_executor(workers).submit(_run_in_app, app, job_id)
+
+
+def _run_in_app(app, job_id: int) -> None:
+    with app.app_context():
+        try:
+            run_job(job_id)
+        finally:
+            db.session.remove()
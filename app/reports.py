@@ -0,0 +1,124 @@
+"""
+Reportes de compras (Excel / PDF) sin cargar toda la rifa en memoria.
+
+- iter_purchases(): recorre las compras en lotes (yield_per) y trae los
+  números de boleto con un selectinload por lote, en vez de .all() +
+  lazy="subquery" sobre todas las compras.
+- write_purchases_xlsx(): hoja write-only de openpyxl (las filas van a disco,
+  no se guarda el árbol de celdas) sobre un archivo temporal.
+- write_purchases_pdf(): mismo recorrido, canvas de reportlab.
+
+La memoria pico queda acotada por REPORT_BATCH_SIZE, no por el número de
+compras.
+"""
+import tempfile
+from datetime import datetime
+
+from openpyxl import Workbook
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+from sqlalchemy import select
+from sqlalchemy.orm import load_only, selectinload
+
+from app.extensions import db
+from app.models import Purchase, Ticket
+
+
+REPORT_BATCH_SIZE = 500
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+PDF_MIMETYPE = "application/pdf"
+
+EXCEL_HEADER = ["Folio", "Nombre", "WhatsApp", "Estado", "Boletos", "Total MXN", "Creado", "Pagado", "Notas"]
+
+
+def iter_purchases(raffle_id: int, batch_size: int = REPORT_BATCH_SIZE):
+    """Compras de la rifa (más recientes primero) con .tickets ya cargado."""
+    stmt = (
+        select(Purchase)
+        .where(Purchase.raffle_id == raffle_id)
+        .options(selectinload(Purchase.tickets).options(load_only(Ticket.id, Ticket.number)))
+        .order_by(Purchase.created_at.desc(), Purchase.id.desc())
+        .execution_options(yield_per=batch_size)
+    )
+    yield from db.session.execute(stmt).scalars()
+
+
+def purchase_numbers(raffle, purchase) -> str:
+    return ", ".join(raffle.format_number(n) for n in sorted(t.number for t in purchase.tickets))
+
+
+def write_purchases_xlsx(raffle, fileobj=None, batch_size: int = REPORT_BATCH_SIZE):
+    """Escribe el Excel de compras en fileobj (default: archivo temporal) y lo
+    devuelve rebobinado, listo para send_file()."""
+    if fileobj is None:
+        fileobj = tempfile.TemporaryFile(suffix=".xlsx")
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Compras")
+    ws.append(EXCEL_HEADER)
+
+    price = raffle.ticket_price_mxn
+    for p in iter_purchases(raffle.id, batch_size):
+        ws.append([
+            p.folio,
+            p.buyer_name,
+            f"+{p.buyer_phone_e164}",
+            p.status.value,
+            purchase_numbers(raffle, p),
+            price * len(p.tickets),
+            p.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+            p.paid_at.strftime("%Y-%m-%d %H:%M:%S") if p.paid_at else "",
+            (p.notes or "")[:500],
+        ])
+
+    wb.save(fileobj)
+    fileobj.seek(0)
+    return fileobj
+
+
+def _pdf_table_header(c, y):
+    c.setFont("Helvetica-Bold", 9)
+    c.drawString(40, y, "Folio")
+    c.drawString(120, y, "Nombre")
+    c.drawString(280, y, "Estado")
+    c.drawString(350, y, "Boletos")
+    c.drawString(470, y, "Total")
+    c.setFont("Helvetica", 8)
+    return y - 14
+
+
+def write_purchases_pdf(raffle, fileobj=None, batch_size: int = REPORT_BATCH_SIZE):
+    """Igual que write_purchases_xlsx() pero en PDF (carta)."""
+    if fileobj is None:
+        fileobj = tempfile.TemporaryFile(suffix=".pdf")
+
+    c = canvas.Canvas(fileobj, pagesize=letter)
+
+    y = letter[1] - 40
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(40, y, f"Reporte de Compras - {raffle.name}")
+    y -= 18
+    c.setFont("Helvetica", 10)
+    c.drawString(40, y, f"Generado: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC")
+    y -= 22
+
+    y = _pdf_table_header(c, y)
+
+    price = raffle.ticket_price_mxn
+    for p in iter_purchases(raffle.id, batch_size):
+        if y < 60:
+            c.showPage()
+            y = _pdf_table_header(c, letter[1] - 40)
+
+        nums = purchase_numbers(raffle, p)
+        c.drawString(40, y, p.folio)
+        c.drawString(120, y, p.buyer_name[:24])
+        c.drawString(280, y, p.status.value)
+        c.drawString(350, y, nums[:18] + ("…" if len(nums) > 18 else ""))
+        c.drawRightString(520, y, f"${price * len(p.tickets)} MXN")
+        y -= 12
+
+    c.save()
+    fileobj.seek(0)
+    return fileobj
@@ -0,0 +1,60 @@
+"""
+Motor de apartado de boletos (compartido por public.request_tickets y
+admin.manual_purchase).
+
+En lugar de SELECT ... FOR UPDATE + ciclo ORM, un solo UPDATE condicional:
+
+    UPDATE tickets SET status=:new, updated_at=now
+     WHERE raffle_id=:rid AND number IN (...) AND status='FREE'
+    RETURNING id, number
+
+Todo o nada: si rowcount != len(numbers) otro comprador ganó alguno de los
+boletos; se lanza ReservationError y el rollback del llamador deshace el
+UPDATE parcial. Los row locks viven sólo desde el UPDATE hasta el commit.
+"""
+from datetime import datetime
+
+from sqlalchemy import insert, update
+
+from app.extensions import db
+from app.models import Ticket, TicketStatus, purchase_tickets
+
+
+class ReservationError(ValueError):
+    """Uno o más boletos ya no están libres (o no existen)."""
+
+    def __init__(self, unavailable):
+        self.unavailable = sorted(unavailable)
+        super().__init__(f"Boletos no disponibles: {self.unavailable}")
+
+
+def reserve_tickets(raffle_id: int, numbers, purchase_id: int, status: TicketStatus = TicketStatus.RESERVED):
+    """
+    Llamar DENTRO de una transacción, con la compra ya insertada (flush).
+    Cambia los boletos FREE -> status, los liga a la compra y devuelve
+    [(ticket_id, number)]. Lanza ReservationError si falta alguno.
+    """
+    numbers = sorted(set(numbers))
+
+    rows = db.session.execute(
+        update(Ticket)
+        .where(
+            Ticket.raffle_id == raffle_id,
+            Ticket.number.in_(numbers),
+            Ticket.status == TicketStatus.FREE,
+        )
+        .values(status=status, updated_at=datetime.utcnow())
+        .returning(Ticket.id, Ticket.number)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    if len(rows) != len(numbers):
+        got = {n for _, n in rows}
+        raise ReservationError([n for n in numbers if n not in got])
+
+    db.session.execute(
+        insert(purchase_tickets),
+        [{"purchase_id": purchase_id, "ticket_id": ticket_id} for ticket_id, _ in rows],
+    )
+    return rows
+
@@ -30,6 +30,43 @@ def normalize_mx_phone(raw: str) -> str:
     raise ValueError("Teléfono inválido. Usa 10 dígitos (MX) o 52 + 10 dígitos.")
 
 
+def client_ip() -> str:
+    """
+    IP real del cliente detrás de TRUSTED_PROXY_COUNT proxies (Render = 1).
+    Cada proxy agrega a X-Forwarded-For la IP de quien le habló, así que con N
+    proxies de confianza el cliente es la N-ésima desde la derecha; lo que
+    está más a la izquierda lo puede inventar el propio cliente. Si el header
+    trae menos saltos, la petición no pasó por los proxies: remote_addr.
+    """
+    trusted = current_app.config.get("TRUSTED_PROXY_COUNT", 0)
+    if trusted > 0:
+        hops = [h.strip() for h in request.headers.get("X-Forwarded-For", "").split(",") if h.strip()]
+        if len(hops) >= trusted:
+            return hops[-trusted]
+    return request.remote_addr or "127.0.0.1"
+
+
+def _purchase_phone():
+    try:
+        return normalize_mx_phone(request.form.get("buyer_phone", ""))
+    except ValueError:
+        return None
+
+
+def purchase_phone_key() -> str:
+    """Llave del límite por WhatsApp en /solicitar (el mismo número desde varias IPs)."""
+    return "phone:" + (_purchase_phone() or "-")
+
+
+def purchase_phone_invalid() -> bool:
+    """
+    exempt_when del límite por WhatsApp: un número vacío o mal escrito no
+    reserva nada (el formulario lo rechaza), así que no debe gastar el cupo
+    por teléfono; esos intentos sólo cuentan contra el límite por IP.
+    """
+    return _purchase_phone() is None
+
+
 def format_phone_plus(phone_e164_digits: str) -> str:
     if not phone_e164_digits:
         return ""
@@ -0,0 +1,39 @@
+(function () {
+  // Admin -> Compras: "seleccionar todas" + contador para la acción en lote.
+  function initBulk() {
+    const form = document.getElementById("bulkForm");
+    if (!form) return;
+
+    const all = document.getElementById("bulkAll");
+    const count = document.getElementById("bulkCount");
+    const picks = Array.prototype.slice.call(form.querySelectorAll(".bulk-pick"));
+
+    function refresh() {
+      const n = picks.filter(function (c) { return c.checked; }).length;
+      if (count) count.textContent = n + (n === 1 ? " seleccionada" : " seleccionadas");
+      if (all) all.checked = n > 0 && n === picks.length;
+    }
+
+    if (all) {
+      all.addEventListener("change", function () {
+        picks.forEach(function (c) { c.checked = all.checked; });
+        refresh();
+      });
+    }
+    form.addEventListener("change", function (e) {
+      if (e.target.classList && e.target.classList.contains("bulk-pick")) refresh();
+    });
+
+    form.addEventListener("submit", function (e) {
+      const action = form.querySelector("select[name=action]");
+      const n = picks.filter(function (c) { return c.checked; }).length;
+      if (!action.value || n === 0) return; // el servidor responde con el error
+      const label = action.options[action.selectedIndex].text;
+      if (!window.confirm(label + " " + n + " compra(s)?")) e.preventDefault();
+    });
+
+    refresh();
+  }
+
+  document.addEventListener("DOMContentLoaded", initBulk);
+})();
@@ -0,0 +1,29 @@
+(function () {
+  // Admin -> Recordatorios: "Copiar todos" copia el contenido del textarea indicado en data-target.
+  function initCopy() {
+    const btn = document.getElementById("copyAll");
+    if (!btn) return;
+    const target = document.getElementById(btn.dataset.target);
+    if (!target) return;
+    const label = btn.textContent;
+
+    function done(ok) {
+      btn.textContent = ok ? "¡Copiados!" : "Selecciona y copia (Ctrl+C)";
+      window.setTimeout(function () { btn.textContent = label; }, 2000);
+    }
+
+    btn.addEventListener("click", function () {
+      if (navigator.clipboard && window.isSecureContext) {
+        navigator.clipboard.writeText(target.value).then(function () { done(true); }, function () { done(false); });
+        return;
+      }
+      target.focus();
+      target.select();
+      let ok = false;
+      try { ok = document.execCommand("copy"); } catch (e) { ok = false; }
+      done(ok);
+    });
+  }
+
+  document.addEventListener("DOMContentLoaded", initCopy);
+})();
@@ -1,6 +1,8 @@
 (function () {
-  function pad2(n) {
-    return String(n).padStart(2, "0");
+  function padNumber(n) {
+    const grid = document.getElementById("ticketsGridAdminPick");
+    const width = parseInt((grid && grid.getAttribute("data-width")) || "2", 10);
+    return String(n).padStart(width, "0");
   }
 
   function setDisabled(btn, preview) {
@@ -24,7 +26,7 @@
         return;
       }
 
-      preview.textContent = selected.map(pad2).join(", ");
+      preview.textContent = selected.map(padNumber).join(", ");
 
       const qs = encodeURIComponent(selected.join(","));
       btn.setAttribute("href", `/admin/manual-purchase?prefill=${qs}`);
@@ -0,0 +1,38 @@
+(function () {
+  // Admin -> Reportes: consulta el estado de los jobs en cola y recarga la
+  // página cuando alguno termina (para mostrar el botón de descarga).
+  function initReportPolling() {
+    const box = document.getElementById("reportJobs");
+    if (!box) return;
+
+    const pending = (box.getAttribute("data-pending") || "").split(",").filter(Boolean);
+    if (pending.length === 0) return;
+
+    const urlTemplate = box.getAttribute("data-status-url");
+
+    function statusUrl(id) {
+      return urlTemplate.replace(/\/0\.json$/, "/" + id + ".json");
+    }
+
+    function poll() {
+      Promise.all(pending.map(function (id) {
+        return fetch(statusUrl(id), { cache: "no-store", credentials: "same-origin" })
+          .then(function (r) { return r.ok ? r.json() : null; })
+          .catch(function () { return null; });
+      })).then(function (results) {
+        const finished = results.some(function (job) {
+          return job && (job.status === "DONE" || job.status === "FAILED");
+        });
+        if (finished) {
+          window.location.reload();
+        } else {
+          window.setTimeout(poll, 2000);
+        }
+      });
+    }
+
+    window.setTimeout(poll, 1500);
+  }
+
+  document.addEventListener("DOMContentLoaded", initReportPolling);
+})();
@@ -1,6 +1,8 @@
 (function () {
-  function pad2(n) {
-    return String(n).padStart(2, "0");
+  function padNumber(n) {
+    const grid = document.getElementById("ticketsGridSelect");
+    const width = parseInt((grid && grid.getAttribute("data-width")) || "2", 10);
+    return String(n).padStart(width, "0");
   }
 
   function qs(id) {
@@ -42,7 +44,7 @@
       }
 
       hidden.value = selected.join(",");
-      preview.textContent = selected.map(pad2).join(", ");
+      preview.textContent = selected.map(padNumber).join(", ");
       if (count) count.textContent = String(selected.length);
       setSubmitState(submitBtn, true);
     };
@@ -1,8 +1,34 @@
 (function () {
-  async function fetchTickets(apiUrl) {
-    const res = await fetch(apiUrl, { credentials: "same-origin" });
+  // Formato compacto: 2 bits por boleto en base64 (ver app/board.py)
+  const BITS_MIMETYPE = "application/vnd.rifa.board-bits+json";
+  const BITS_STATUS = ["FREE", "RESERVED", "PAID"]; // 3 = no existe
+
+  function decodeBits(data) {
+    const raw = atob(data.bits || "");
+    const tickets = [];
+
+    for (let i = 0; i < data.count; i++) {
+      const code = (raw.charCodeAt(i >> 2) >> ((i & 3) * 2)) & 3;
+      if (code < 3) tickets.push({ n: data.first + i, s: BITS_STATUS[code] });
+    }
+
+    return { raffle_id: data.raffle_id, version: data.version, tickets };
+  }
+
+  // state.etag: el server responde 304 si el tablero no cambió desde esa versión.
+  async function fetchTickets(apiUrl, state) {
+    const headers = { Accept: `${BITS_MIMETYPE}, application/json;q=0.5` };
+    if (state && state.etag) headers["If-None-Match"] = state.etag;
+
+    const res = await fetch(apiUrl, { credentials: "same-origin", cache: "no-store", headers });
+    if (res.status === 304) return null; // sin cambios
     if (!res.ok) throw new Error("No se pudo cargar el tablero");
-    return await res.json();
+
+    if (state) state.etag = res.headers.get("ETag");
+
+    const data = await res.json();
+    const ctype = res.headers.get("Content-Type") || "";
+    return ctype.indexOf(BITS_MIMETYPE) === 0 ? decodeBits(data) : data;
   }
 
   function statusToClass(status) {
@@ -11,78 +37,273 @@
     return "ticket--paid";
   }
 
-  function renderGrid(container, data, opts) {
-    container.innerHTML = "";
+  function notifySelection(selected) {
+    if (typeof window.__onTicketSelectionChange === "function") {
+      window.__onTicketSelectionChange(Array.from(selected).sort((a, b) => a - b));
+    }
+  }
 
-    const selectable = opts.selectable;
-    const max = opts.max;
-    const selected = new Set();
+  function paintTicket(div, status, selectable) {
+    div.className = `ticket ${statusToClass(status)}`;
+    if (!selectable) {
+      div.style.cursor = "default";
+    } else {
+      div.style.cursor = status === "FREE" ? "" : "not-allowed";
+    }
+  }
+
+  function numberWidth(grid) {
+    const attr = parseInt(grid.container.getAttribute("data-width") || "0", 10);
+    if (attr > 0) return attr;
+    // mismo criterio que Raffle.number_width: "01".."100", "001".."1000"
+    const last = grid.numbers.length ? grid.numbers[grid.numbers.length - 1] : 1;
+    return Math.max(2, String(Math.max(last - 1, 1)).length);
+  }
+
+  function formatNumber(grid, n) {
+    return String(n).padStart(grid.width, "0");
+  }
+
+  // Grid = { container, pager, opts, version, statuses: Map n->s, numbers: [n],
+  //          page, nodes: Map n->div (solo la página visible), selected: Set }
+  // Rifas grandes (1,000 / 10,000): solo se pinta una página de opts.pageSize boletos.
+  function renderGrid(grid, data) {
+    grid.version = data.version;
+    grid.statuses = new Map();
+    grid.numbers = [];
 
     data.tickets.forEach(t => {
+      grid.statuses.set(t.n, t.s);
+      grid.numbers.push(t.n);
+    });
+    grid.width = numberWidth(grid);
+
+    // Si ya no están libres, se sueltan de la selección
+    let selectionChanged = false;
+    grid.selected.forEach(n => {
+      if (grid.statuses.get(n) !== "FREE") {
+        grid.selected.delete(n);
+        selectionChanged = true;
+      }
+    });
+    if (selectionChanged) notifySelection(grid.selected);
+
+    const pages = Math.max(1, Math.ceil(grid.numbers.length / grid.opts.pageSize));
+    grid.page = Math.min(grid.page, pages - 1);
+
+    renderPager(grid, pages);
+    renderPage(grid);
+  }
+
+  function renderPage(grid) {
+    const size = grid.opts.pageSize;
+    const slice = grid.numbers.slice(grid.page * size, (grid.page + 1) * size);
+    const frag = document.createDocumentFragment();
+
+    grid.nodes = new Map();
+    slice.forEach(n => {
       const div = document.createElement("div");
-      div.className = `ticket ${statusToClass(t.s)}`;
-      div.textContent = String(t.n).padStart(2, "0");
+      div.textContent = formatNumber(grid, n);
+      div.setAttribute("data-n", String(n));
+      paintTicket(div, grid.statuses.get(n), grid.opts.selectable);
+      if (grid.selected.has(n)) div.classList.add("ticket--selected");
+
+      grid.nodes.set(n, div);
+      frag.appendChild(div);
+    });
+
+    grid.container.innerHTML = "";
+    grid.container.appendChild(frag);
+  }
+
+  function renderPager(grid, pages) {
+    if (pages <= 1) {
+      if (grid.pager) grid.pager.remove();
+      grid.pager = null;
+      return;
+    }
+
+    if (!grid.pager) {
+      grid.pager = document.createElement("div");
+      grid.pager.className = "tickets-pager";
+      grid.container.parentNode.insertBefore(grid.pager, grid.container);
+
+      grid.pager.addEventListener("click", (e) => {
+        const btn = e.target.closest("[data-page-step]");
+        if (!btn) return;
+        goToPage(grid, grid.page + parseInt(btn.getAttribute("data-page-step"), 10));
+      });
+      grid.pager.addEventListener("change", (e) => {
+        if (e.target.tagName === "SELECT") goToPage(grid, parseInt(e.target.value, 10));
+      });
+    }
+
+    const size = grid.opts.pageSize;
+    const options = [];
+    for (let p = 0; p < pages; p++) {
+      const first = grid.numbers[p * size];
+      const last = grid.numbers[Math.min((p + 1) * size, grid.numbers.length) - 1];
+      const label = `${formatNumber(grid, first)}–${formatNumber(grid, last)}`;
+      options.push(`<option value="${p}"${p === grid.page ? " selected" : ""}>${label}</option>`);
+    }
+
+    grid.pager.innerHTML =
+      `<button type="button" class="btn" data-page-step="-1"${grid.page === 0 ? " disabled" : ""}>←</button>` +
+      `<select class="input">${options.join("")}</select>` +
+      `<button type="button" class="btn" data-page-step="1"${grid.page >= pages - 1 ? " disabled" : ""}>→</button>`;
+  }
+
+  function goToPage(grid, page) {
+    const pages = Math.max(1, Math.ceil(grid.numbers.length / grid.opts.pageSize));
+    const next = Math.max(0, Math.min(pages - 1, page));
+    if (next === grid.page) return;
+    grid.page = next;
+    renderPager(grid, pages);
+    renderPage(grid);
+  }
 
-      if (selectable) {
-        if (t.s !== "FREE") {
-          div.style.cursor = "not-allowed";
+  // Un solo listener por grid (delegación) en lugar de uno por boleto.
+  function bindSelection(grid) {
+    if (!grid.opts.selectable) return;
+
+    grid.container.addEventListener("click", (e) => {
+      const div = e.target.closest(".ticket");
+      if (!div || !grid.container.contains(div)) return;
+
+      const key = parseInt(div.getAttribute("data-n"), 10);
+      if (grid.statuses.get(key) !== "FREE") return;
+
+      if (grid.selected.has(key)) {
+        grid.selected.delete(key);
+        div.classList.remove("ticket--selected");
+      } else {
+        if (grid.selected.size >= grid.opts.max) return;
+        grid.selected.add(key);
+        div.classList.add("ticket--selected");
+      }
+
+      notifySelection(grid.selected);
+    });
+  }
+
+  // Aplica un delta del stream SSE: solo toca los boletos que cambiaron.
+  function applyChanges(grid, changes) {
+    let selectionChanged = false;
+
+    changes.forEach(([n, s]) => {
+      if (!grid.statuses.has(n)) return;
+      grid.statuses.set(n, s);
+
+      const div = grid.nodes.get(n);
+      if (div) paintTicket(div, s, grid.opts.selectable);
+
+      if (grid.selected.has(n)) {
+        if (s === "FREE") {
+          if (div) div.classList.add("ticket--selected");
         } else {
-          div.addEventListener("click", () => {
-            const key = t.n;
-
-            if (selected.has(key)) {
-              selected.delete(key);
-              div.classList.remove("ticket--selected");
-            } else {
-              if (selected.size >= max) return;
-              selected.add(key);
-              div.classList.add("ticket--selected");
-            }
-
-            if (typeof window.__onTicketSelectionChange === "function") {
-              window.__onTicketSelectionChange(Array.from(selected).sort((a, b) => a - b));
-            }
-          });
+          grid.selected.delete(n); // alguien más lo apartó
+          selectionChanged = true;
         }
-      } else {
-        div.style.cursor = "default";
       }
+    });
 
-      container.appendChild(div);
+    if (selectionChanged) notifySelection(grid.selected);
+  }
+
+  async function refresh(grid) {
+    const fresh = await fetchTickets(grid.api, grid.state);
+    if (fresh) renderGrid(grid, fresh);
+  }
+
+  function startPolling(grid) {
+    // refrescar solo grids NO seleccionables (para no borrar selección admin)
+    if (grid.opts.selectable || grid.timer) return;
+    grid.timer = setInterval(async () => {
+      try {
+        await refresh(grid);
+      } catch (_) {}
+    }, 10000);
+  }
+
+  function startStream(grid) {
+    if (!grid.streamUrl || typeof window.EventSource !== "function") return false;
+
+    const es = new EventSource(grid.streamUrl);
+    let failures = 0;
+
+    es.addEventListener("hello", (e) => {
+      failures = 0;
+      const msg = JSON.parse(e.data);
+      if (msg.version !== grid.version) refresh(grid).catch(() => {});
     });
+
+    es.addEventListener("delta", (e) => {
+      const msg = JSON.parse(e.data);
+      if (msg.version === grid.version + 1) {
+        applyChanges(grid, msg.changes || []);
+        grid.version = msg.version;
+      } else if (msg.version > grid.version) {
+        refresh(grid).catch(() => {}); // nos saltamos una versión
+      }
+    });
+
+    es.addEventListener("resync", () => {
+      refresh(grid).catch(() => {});
+    });
+
+    es.onerror = () => {
+      // El server cierra cada ~55s y EventSource reconecta solo; si falla
+      // seguido (proxy sin SSE, server caído) volvemos al polling. Un 503
+      // (cupo de streams lleno) cierra el EventSource sin reintento.
+      failures += 1;
+      if (failures >= 3 || es.readyState === EventSource.CLOSED) {
+        es.close();
+        startPolling(grid);
+      }
+    };
+
+    return true;
   }
 
   async function init() {
-    const grids = [
+    const containers = [
       document.getElementById("ticketsGrid"),
       document.getElementById("ticketsGridSelect"),
       document.getElementById("ticketsGridHome"),
       document.getElementById("ticketsGridAdminPick"),
     ].filter(Boolean);
 
-    for (const grid of grids) {
-      const api = grid.getAttribute("data-api");
-      const selectable = grid.getAttribute("data-select") === "1";
-      const max = parseInt(grid.getAttribute("data-max") || "3", 10);
+    for (const container of containers) {
+      const grid = {
+        container,
+        api: container.getAttribute("data-api"),
+        streamUrl: container.getAttribute("data-stream"),
+        pager: null,
+        opts: {
+          selectable: container.getAttribute("data-select") === "1",
+          max: parseInt(container.getAttribute("data-max") || "3", 10),
+          pageSize: parseInt(container.getAttribute("data-page-size") || "100", 10),
+        },
+        state: { etag: null },
+        version: null,
+        statuses: new Map(),
+        numbers: [],
+        width: 2,
+        page: 0,
+        nodes: new Map(),
+        selected: new Set(),
+        timer: null,
+      };
+      bindSelection(grid);
 
       try {
-        const data = await fetchTickets(api);
-        renderGrid(grid, data, { selectable, max });
-
-        // refrescar solo grids NO seleccionables (para no borrar selección admin)
-        if (!selectable) {
-          setInterval(async () => {
-            try {
-              const fresh = await fetchTickets(api);
-              renderGrid(grid, fresh, { selectable, max });
-            } catch (_) {}
-          }, 10000);
-        }
+        await refresh(grid);
+        if (!startStream(grid)) startPolling(grid);
       } catch (e) {
-        grid.innerHTML = `<div class="muted">No se pudo cargar el tablero.</div>`;
+        container.innerHTML = `<div class="muted">No se pudo cargar el tablero.</div>`;
       }
     }
   }
 
   document.addEventListener("DOMContentLoaded", init);
-})();
\ No newline at end of file
+})();
@@ -0,0 +1,214 @@
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import String, cast, func, literal, select, union_all, update
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import Ticket, TicketStatus, Purchase, PurchaseStatus, RaffleCounters
+
+
+@dataclass(frozen=True)
+class RaffleStats:
+    """
+    Foto de los contadores de una rifa (boletos y compras por estado).
+    Normalmente sale de la fila raffle_stats (lookup por PK); si no existe,
+    se calcula con UN solo query agrupado.
+    """
+    raffle_id: int
+    ticket_price_mxn: int
+
+    free: int = 0
+    reserved: int = 0
+    paid: int = 0
+
+    pending: int = 0
+    approved: int = 0
+    paid_purchases: int = 0
+    cancelled: int = 0
+
+    paid_revenue_mxn: int = None
+
+    @property
+    def total(self) -> int:
+        return self.free + self.reserved + self.paid
+
+    @property
+    def sold(self) -> int:
+        return self.reserved + self.paid
+
+    @property
+    def total_sold_mxn(self) -> int:
+        if self.paid_revenue_mxn is not None:
+            return self.paid_revenue_mxn
+        return self.paid * self.ticket_price_mxn
+
+
+def _status_key(value) -> str:
+    return getattr(value, "value", value)
+
+
+def compute_raffle_stats(raffle) -> RaffleStats:
+    """
+    Recuento desde tickets/purchases. Un solo round-trip (status se castea a texto porque Postgres no une
+    dos tipos ENUM distintos en un UNION):
+      SELECT 'T', status, count(*) FROM tickets   WHERE raffle_id=? GROUP BY status
+      UNION ALL
+      SELECT 'P', status, count(*) FROM purchases WHERE raffle_id=? GROUP BY status
+    """
+    tickets_q = (
+        select(literal("T").label("kind"), cast(Ticket.status, String).label("status"), func.count().label("n"))
+        .where(Ticket.raffle_id == raffle.id)
+        .group_by(Ticket.status)
+    )
+    purchases_q = (
+        select(literal("P").label("kind"), cast(Purchase.status, String).label("status"), func.count().label("n"))
+        .where(Purchase.raffle_id == raffle.id)
+        .group_by(Purchase.status)
+    )
+
+    tickets = {}
+    purchases = {}
+    for kind, status, n in db.session.execute(union_all(tickets_q, purchases_q)):
+        target = tickets if kind == "T" else purchases
+        target[_status_key(status)] = int(n)
+
+    return RaffleStats(
+        raffle_id=raffle.id,
+        ticket_price_mxn=raffle.ticket_price_mxn,
+        free=tickets.get(TicketStatus.FREE.value, 0),
+        reserved=tickets.get(TicketStatus.RESERVED.value, 0),
+        paid=tickets.get(TicketStatus.PAID.value, 0),
+        pending=purchases.get(PurchaseStatus.PENDING.value, 0),
+        approved=purchases.get(PurchaseStatus.APPROVED.value, 0),
+        paid_purchases=purchases.get(PurchaseStatus.PAID.value, 0),
+        cancelled=purchases.get(PurchaseStatus.CANCELLED.value, 0),
+    )
+
+
+# --- Contadores denormalizados (raffle_stats) --------------------------------
+
+_TICKET_COLUMNS = {
+    TicketStatus.FREE: "tickets_free",
+    TicketStatus.RESERVED: "tickets_reserved",
+    TicketStatus.PAID: "tickets_paid",
+}
+_PURCHASE_COLUMNS = {
+    PurchaseStatus.PENDING: "purchases_pending",
+    PurchaseStatus.APPROVED: "purchases_approved",
+    PurchaseStatus.PAID: "purchases_paid",
+    PurchaseStatus.CANCELLED: "purchases_cancelled",
+}
+
+
+def _from_row(row: RaffleCounters, ticket_price_mxn: int) -> RaffleStats:
+    return RaffleStats(
+        raffle_id=row.raffle_id,
+        ticket_price_mxn=ticket_price_mxn,
+        free=row.tickets_free,
+        reserved=row.tickets_reserved,
+        paid=row.tickets_paid,
+        pending=row.purchases_pending,
+        approved=row.purchases_approved,
+        paid_purchases=row.purchases_paid,
+        cancelled=row.purchases_cancelled,
+        paid_revenue_mxn=row.paid_revenue_mxn,
+    )
+
+
+def _row_values(stats: RaffleStats) -> dict:
+    return {
+        "tickets_free": stats.free,
+        "tickets_reserved": stats.reserved,
+        "tickets_paid": stats.paid,
+        "purchases_pending": stats.pending,
+        "purchases_approved": stats.approved,
+        "purchases_paid": stats.paid_purchases,
+        "purchases_cancelled": stats.cancelled,
+        "paid_revenue_mxn": stats.total_sold_mxn,
+    }
+
+
+def get_raffle_stats(raffle) -> RaffleStats:
+    """Lookup por PK en raffle_stats; si la fila no existe, recuento agrupado."""
+    row = db.session.get(RaffleCounters, raffle.id, populate_existing=True)
+    if row is None:
+        return compute_raffle_stats(raffle)
+    return _from_row(row, raffle.ticket_price_mxn)
+
+
+def apply_stats_delta(raffle, tickets=(), purchases=()) -> None:
+    """
+    Llamar DENTRO de la transacción que cambia los estados.
+    tickets / purchases: [(estado_anterior, estado_nuevo)]; None como estado
+    anterior = la fila es nueva. Los ingresos siguen a los boletos PAID
+    (precio actual de la rifa).
+
+    Es un UPDATE col = col + delta: dos transacciones concurrentes se
+    serializan en la fila (como ya pasa con raffles.board_version) y nunca
+    pierden incrementos.
+    """
+    deltas = Counter()
+    for columns, changes in ((_TICKET_COLUMNS, tickets), (_PURCHASE_COLUMNS, purchases)):
+        for old, new in changes:
+            if old == new:
+                continue
+            if old is not None:
+                deltas[columns[old]] -= 1
+            if new is not None:
+                deltas[columns[new]] += 1
+
+    deltas["paid_revenue_mxn"] = deltas["tickets_paid"] * raffle.ticket_price_mxn
+    values = {
+        col: getattr(RaffleCounters, col) + delta
+        for col, delta in deltas.items() if delta
+    }
+    if not values:
+        return
+
+    values["updated_at"] = datetime.utcnow()
+    stmt = (
+        update(RaffleCounters)
+        .where(RaffleCounters.raffle_id == raffle.id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if db.session.execute(stmt).rowcount:
+        return
+
+    # Rifa sin fila todavía: el recuento ya incluye los cambios de esta
+    # transacción, así que se inserta tal cual.
+    try:
+        with db.session.begin_nested():
+            db.session.add(RaffleCounters(raffle_id=raffle.id, **_row_values(compute_raffle_stats(raffle))))
+    except IntegrityError:
+        # Otra transacción la creó al mismo tiempo; su recuento no ve
+        # nuestros cambios (sin commit), así que aplicamos el delta encima.
+        db.session.execute(stmt)
+
+
+def rebuild_raffle_stats(raffle, write: bool = True) -> dict:
+    """
+    Recalcula los contadores y los compara con la fila guardada. Bloquea la
+    fila (FOR UPDATE) antes de contar para no pisar transiciones en curso.
+    Devuelve {columna: (guardado, real)} con las diferencias.
+    """
+    row = db.session.execute(
+        select(RaffleCounters).where(RaffleCounters.raffle_id == raffle.id).with_for_update()
+    ).scalar_one_or_none()
+
+    actual = _row_values(compute_raffle_stats(raffle))
+    if row is None:
+        diffs = {col: (None, value) for col, value in actual.items()}
+        if write:
+            db.session.add(RaffleCounters(raffle_id=raffle.id, **actual))
+    else:
+        diffs = {
+            col: (getattr(row, col), value)
+            for col, value in actual.items() if getattr(row, col) != value
+        }
+        if write and diffs:
+            for col, value in actual.items():
+                setattr(row, col, value)
+    return diffs
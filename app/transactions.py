@@ -0,0 +1,34 @@
+"""
+Unidad de trabajo de las vistas que escriben (públicas y de admin).
+
+Antes cada blueprint tenía su begin_clean(): rollback() + begin(), porque el
+SELECT previo (get_active_raffle, first_or_404, la validación) ya había
+abierto una transacción por autobegin y session.begin() truena si hay una en
+curso. Ese ROLLBACK era un viaje extra a la base y además expiraba lo ya
+cargado (la compra, sus boletos), que se volvía a leer dentro del bloque.
+
+unit_of_work() no abre nada: sigue en la transacción que abrió el autobegin
+(o la que abra el primer SQL del bloque), así que las lecturas previas y la
+escritura van juntas, con un solo COMMIT al salir o ROLLBACK si el bloque
+lanza. Los objetos ya cargados se usan tal cual.
+
+    with unit_of_work():
+        purchase.status = PurchaseStatus.PAID
+        apply_stats_delta(...)
+        bump_board_version(...)
+        log_audit(...)
+"""
+from contextlib import contextmanager
+
+from app.extensions import db
+
+
+@contextmanager
+def unit_of_work():
+    session = db.session
+    try:
+        yield session
+        session.commit()
+    except BaseException:
+        session.rollback()
+        raise
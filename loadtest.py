@@ -0,0 +1,97 @@
+"""
+Prueba de carga del flujo de compra (POST /solicitar) contra una DB LOCAL.
+
+    python loadtest.py                                   # SQLite temporal
+    python loadtest.py --database-url postgresql://localhost/rifa_load --yes
+
+Levanta la app con create_app() (CSRF y rate limit apagados), crea una rifa
+activa temporal, dispara N compradores concurrentes sobre números encimados y
+reporta p50/p95/p99, throughput, tiempo del UPDATE de apartado (espera por
+locks en Postgres) e invariantes (ningún boleto en 2 compras vivas).
+
+NO usar contra la DB de producción: mientras corre, la rifa temporal es la
+rifa activa.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="Default: SQLite temporal.")
+    parser.add_argument("--buyers", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--pool", type=int, default=30, help="Números en disputa.")
+    parser.add_argument("--per-buyer", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--keep", action="store_true", help="No borrar la rifa temporal al terminar.")
+    parser.add_argument("--json", action="store_true", help="Imprimir el resultado como JSON.")
+    parser.add_argument("--yes", action="store_true", help="Confirmar uso de una DB que no es SQLite temporal.")
+    args = parser.parse_args(argv)
+
+    if args.database_url:
+        if not args.yes:
+            print("Usa --yes para confirmar que la DB es local y desechable.", file=sys.stderr)
+            return 2
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        path = os.path.join(tempfile.mkdtemp(prefix="rifa-load-"), "load.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    os.environ["RATELIMIT_ENABLED"] = "0"
+    os.environ["BOARD_EVENTS_BACKEND"] = "local"
+
+    from app import create_app
+    from app.extensions import db
+    from app.bench import create_scratch_raffle, reset_scratch_raffle, run_purchase_load
+    from app.models import Raffle
+
+    app = create_app()
+    app.config["WTF_CSRF_ENABLED"] = False
+
+    with app.app_context():
+        db.create_all()
+
+        raffle_id = create_scratch_raffle(max(args.pool, 1))
+        raffle = db.session.get(Raffle, raffle_id)
+        raffle.is_active = True
+        raffle.max_tickets_per_purchase = args.per_buyer
+        db.session.commit()
+
+        try:
+            result = run_purchase_load(
+                app, raffle_id,
+                buyers=args.buyers, concurrency=args.concurrency,
+                pool=args.pool, per_buyer=args.per_buyer, seed=args.seed,
+            )
+        finally:
+            if not args.keep:
+                reset_scratch_raffle(raffle_id, drop=True)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        inv = result["invariants"]
+        print(f"DB: {os.environ['DATABASE_URL'].split('@')[-1]}")
+        print(f"Solicitudes: {result['requests']} en {result['wall_s']:.2f} s · {result['throughput_rps']:.1f} req/s")
+        print(f"HTTP: {result['status_codes']}")
+        print(f"Latencia: p50 {result['p50_ms']:.1f} ms · p95 {result['p95_ms']:.1f} ms · p99 {result['p99_ms']:.1f} ms")
+        print(
+            f"UPDATE de apartado (incluye espera de locks): p50 {result['lock_wait_p50_ms']:.1f} ms · "
+            f"p95 {result['lock_wait_p95_ms']:.1f} ms · p99 {result['lock_wait_p99_ms']:.1f} ms · "
+            f"total {result['lock_wait_total_ms']:.0f} ms"
+        )
+        print(
+            f"Invariantes: doble venta {inv['double_sold']} · apartados sin compra {inv['orphan_taken']} · "
+            f"libres con compra {inv['free_but_sold']} · desfase de raffle_stats {inv['stats_drift']}"
+        )
+
+    inv = result["invariants"]
+    return 1 if any(inv.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
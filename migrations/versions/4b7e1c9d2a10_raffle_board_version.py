@@ -0,0 +1,26 @@
+"""raffle board_version
+
+Revision ID: 4b7e1c9d2a10
+Revises: 21a572986e6d
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b7e1c9d2a10'
+down_revision = '21a572986e6d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('raffles', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('board_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('raffles', schema=None) as batch_op:
+        batch_op.drop_column('board_version')
@@ -0,0 +1,36 @@
+"""keyset pagination indexes (purchases, audit_logs)
+
+Revision ID: 5e8b1f0c3d94
+Revises: c2d9e4f1a7b3
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8b1f0c3d94'
+down_revision = 'c2d9e4f1a7b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('purchases', schema=None) as batch_op:
+        batch_op.create_index('ix_purchases_raffle_created', ['raffle_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_purchases_raffle_status_created', ['raffle_id', 'status', 'created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('audit_logs', schema=None) as batch_op:
+        batch_op.create_index('ix_audit_logs_created', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_audit_logs_admin_created', ['admin_user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('audit_logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_audit_logs_admin_created')
+        batch_op.drop_index('ix_audit_logs_created')
+
+    with op.batch_alter_table('purchases', schema=None) as batch_op:
+        batch_op.drop_index('ix_purchases_raffle_status_created')
+        batch_op.drop_index('ix_purchases_raffle_created')
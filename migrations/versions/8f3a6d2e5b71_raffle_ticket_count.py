@@ -0,0 +1,26 @@
+"""raffle ticket_count
+
+Revision ID: 8f3a6d2e5b71
+Revises: 4b7e1c9d2a10
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f3a6d2e5b71'
+down_revision = '4b7e1c9d2a10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('raffles', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('ticket_count', sa.Integer(), server_default='100', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('raffles', schema=None) as batch_op:
+        batch_op.drop_column('ticket_count')
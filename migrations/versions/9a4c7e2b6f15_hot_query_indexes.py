@@ -0,0 +1,42 @@
+"""composite indexes for hot queries
+
+Revision ID: 9a4c7e2b6f15
+Revises: 5e8b1f0c3d94
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4c7e2b6f15'
+down_revision = '5e8b1f0c3d94'
+branch_labels = None
+depends_on = None
+
+
+# purchases(raffle_id, status), purchases(raffle_id, created_at) y
+# audit_logs(created_at) ya quedan cubiertos por los índices de 5e8b1f0c3d94
+# (mismo prefijo), así que no se duplican aquí.
+
+def upgrade():
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.create_index('ix_tickets_raffle_status', ['raffle_id', 'status'], unique=False)
+
+    with op.batch_alter_table('purchases', schema=None) as batch_op:
+        batch_op.create_index('ix_purchases_raffle_phone_status', ['raffle_id', 'buyer_phone_e164', 'status'], unique=False)
+
+    with op.batch_alter_table('purchase_tickets', schema=None) as batch_op:
+        batch_op.create_index('ix_purchase_tickets_ticket_id', ['ticket_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('purchase_tickets', schema=None) as batch_op:
+        batch_op.drop_index('ix_purchase_tickets_ticket_id')
+
+    with op.batch_alter_table('purchases', schema=None) as batch_op:
+        batch_op.drop_index('ix_purchases_raffle_phone_status')
+
+    with op.batch_alter_table('tickets', schema=None) as batch_op:
+        batch_op.drop_index('ix_tickets_raffle_status')
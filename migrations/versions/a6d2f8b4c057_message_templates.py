@@ -0,0 +1,39 @@
+"""message_templates and raffles.messages_version
+
+Revision ID: a6d2f8b4c057
+Revises: f4c8b2d6a913
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d2f8b4c057'
+down_revision = 'f4c8b2d6a913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('raffles', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('messages_version', sa.Integer(), server_default='0', nullable=False))
+
+    op.create_table('message_templates',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('raffle_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['raffle_id'], ['raffles.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('raffle_id', 'kind', name='uq_message_template_kind')
+    )
+
+
+def downgrade():
+    op.drop_table('message_templates')
+
+    with op.batch_alter_table('raffles', schema=None) as batch_op:
+        batch_op.drop_column('messages_version')
@@ -0,0 +1,29 @@
+"""report_jobs.artifact moves to disk (REPORT_ARTIFACT_DIR)
+
+Revision ID: b8e1c5d3f290
+Revises: a6d2f8b4c057
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e1c5d3f290'
+down_revision = 'a6d2f8b4c057'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Los archivos guardados en la tabla se descartan: se regeneran al pedirlos.
+    op.execute("UPDATE report_jobs SET artifact_size = NULL")
+    with op.batch_alter_table('report_jobs', schema=None) as batch_op:
+        batch_op.drop_column('artifact')
+
+
+def downgrade():
+    with op.batch_alter_table('report_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('artifact', sa.LargeBinary(), nullable=True))
+    op.execute("UPDATE report_jobs SET artifact_size = NULL")
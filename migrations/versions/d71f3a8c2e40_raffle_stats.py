@@ -0,0 +1,58 @@
+"""raffle_stats denormalized counters
+
+Revision ID: d71f3a8c2e40
+Revises: 9a4c7e2b6f15
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd71f3a8c2e40'
+down_revision = '9a4c7e2b6f15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('raffle_stats',
+    sa.Column('raffle_id', sa.Integer(), nullable=False),
+    sa.Column('tickets_free', sa.Integer(), nullable=False),
+    sa.Column('tickets_reserved', sa.Integer(), nullable=False),
+    sa.Column('tickets_paid', sa.Integer(), nullable=False),
+    sa.Column('purchases_pending', sa.Integer(), nullable=False),
+    sa.Column('purchases_approved', sa.Integer(), nullable=False),
+    sa.Column('purchases_paid', sa.Integer(), nullable=False),
+    sa.Column('purchases_cancelled', sa.Integer(), nullable=False),
+    sa.Column('paid_revenue_mxn', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['raffle_id'], ['raffles.id'], ),
+    sa.PrimaryKeyConstraint('raffle_id')
+    )
+
+    # Llenado inicial (igual que `flask stats rebuild`).
+    op.execute("""
+        INSERT INTO raffle_stats (
+            raffle_id, tickets_free, tickets_reserved, tickets_paid,
+            purchases_pending, purchases_approved, purchases_paid, purchases_cancelled,
+            paid_revenue_mxn, updated_at
+        )
+        SELECT
+            r.id,
+            (SELECT count(*) FROM tickets t WHERE t.raffle_id = r.id AND t.status = 'FREE'),
+            (SELECT count(*) FROM tickets t WHERE t.raffle_id = r.id AND t.status = 'RESERVED'),
+            (SELECT count(*) FROM tickets t WHERE t.raffle_id = r.id AND t.status = 'PAID'),
+            (SELECT count(*) FROM purchases p WHERE p.raffle_id = r.id AND p.status = 'PENDING'),
+            (SELECT count(*) FROM purchases p WHERE p.raffle_id = r.id AND p.status = 'APPROVED'),
+            (SELECT count(*) FROM purchases p WHERE p.raffle_id = r.id AND p.status = 'PAID'),
+            (SELECT count(*) FROM purchases p WHERE p.raffle_id = r.id AND p.status = 'CANCELLED'),
+            (SELECT count(*) FROM tickets t WHERE t.raffle_id = r.id AND t.status = 'PAID') * r.ticket_price_mxn,
+            CURRENT_TIMESTAMP
+        FROM raffles r
+    """)
+
+
+def downgrade():
+    op.drop_table('raffle_stats')
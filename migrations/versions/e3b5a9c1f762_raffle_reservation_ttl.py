@@ -0,0 +1,26 @@
+"""raffle reservation_ttl_hours
+
+Revision ID: e3b5a9c1f762
+Revises: d71f3a8c2e40
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b5a9c1f762'
+down_revision = 'd71f3a8c2e40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('raffles', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('reservation_ttl_hours', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('raffles', schema=None) as batch_op:
+        batch_op.drop_column('reservation_ttl_hours')
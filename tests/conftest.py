@@ -0,0 +1,64 @@
+"""
+App por prueba sobre una SQLite temporal, con `flask seed` ya corrido.
+
+Las cachés por proceso (rifa activa, tablero, mensajes, páginas) se vacían
+entre pruebas: cada una trae su propia base y los ids se repiten.
+"""
+import pytest
+
+from app import board, messages
+from app.page_cache import invalidate_page_cache
+from app.raffles import invalidate_active_raffle
+
+
+ADMIN_USER = "Mendez"
+ADMIN_PASSWORD = "Temporal#12345"
+
+
+def _reset_process_caches() -> None:
+    invalidate_active_raffle()
+    invalidate_page_cache()
+    board._cache.clear()
+    messages._cache.clear()
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'rifa.db'}")
+    monkeypatch.setenv("INITIAL_ADMIN_TEMP_PASSWORD", ADMIN_PASSWORD)
+    monkeypatch.setenv("RATELIMIT_ENABLED", "0")
+    monkeypatch.setenv("AUDIT_ASYNC_ENABLED", "0")
+    monkeypatch.setenv("REPORT_WORKERS", "0")
+    monkeypatch.setenv("REPORT_ARTIFACT_DIR", str(tmp_path / "reports"))
+
+    from app import create_app
+    from app.extensions import db
+
+    _reset_process_caches()
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+
+    with app.app_context():
+        db.create_all()
+        result = app.test_cli_runner().invoke(args=["seed"])
+        assert result.exception is None, result.output
+
+    yield app
+
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    _reset_process_caches()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_client(app):
+    client = app.test_client()
+    resp = client.post("/admin/login", data={"username": ADMIN_USER, "password": ADMIN_PASSWORD})
+    assert resp.status_code == 302
+    return client
@@ -0,0 +1,47 @@
+from app.bench import count_queries
+from app.extensions import db
+from app.models import Purchase, PurchaseStatus, Raffle, Ticket, TicketStatus, generate_folio
+
+
+def _add_purchases(app, count: int) -> None:
+    """count compras de 2 boletos cada una, alternando estado."""
+    statuses = [PurchaseStatus.PENDING, PurchaseStatus.APPROVED, PurchaseStatus.PAID]
+    with app.app_context():
+        raffle = Raffle.query.filter_by(is_active=True).one()
+        free = Ticket.query.filter_by(raffle_id=raffle.id, status=TicketStatus.FREE).order_by(Ticket.number)
+        free = free.limit(count * 2).all()
+        for i in range(count):
+            status = statuses[i % len(statuses)]
+            tickets = free[2 * i:2 * i + 2]
+            for t in tickets:
+                t.status = TicketStatus.PAID if status == PurchaseStatus.PAID else TicketStatus.RESERVED
+            db.session.add(Purchase(
+                raffle_id=raffle.id,
+                folio=generate_folio(),
+                buyer_name=f"Comprador {i}",
+                buyer_phone_e164=f"5255{i:08d}",
+                status=status,
+                tickets=tickets,
+            ))
+        db.session.commit()
+
+
+def _list_statements(app, client, path: str) -> int:
+    with app.app_context():
+        with count_queries() as counter:
+            resp = client.get(path)
+    assert resp.status_code == 200
+    return counter.count
+
+
+def test_purchase_list_statement_count_does_not_grow(app, admin_client):
+    admin_client.get("/admin/purchases")  # calienta la rifa activa en caché
+
+    _add_purchases(app, 4)
+    small = {p: _list_statements(app, admin_client, p) for p in ("/admin/purchases", "/admin/purchases?status=PAID")}
+
+    _add_purchases(app, 36)
+    large = {p: _list_statements(app, admin_client, p) for p in small}
+
+    assert large == small
+    assert small["/admin/purchases"] <= 5
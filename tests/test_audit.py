@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+from app.models import AuditLog
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Proceso aparte que encola un evento y sale enseguida: el hilo escritor ya
+# tomó la entrada y está esperando AUDIT_FLUSH_SECONDS por más cuando corre atexit.
+_EXIT_SCRIPT = textwrap.dedent("""
+    import time
+    from app import create_app
+    from app.audit import queue_audit
+
+    app = create_app()
+    with app.app_context():
+        assert queue_audit("LOGOUT", "AdminUser", 1, {"via": "test"})
+    time.sleep(0.2)
+""")
+
+
+def test_queued_audit_is_written_at_exit(app):
+    env = dict(
+        os.environ,
+        DATABASE_URL=app.config["SQLALCHEMY_DATABASE_URI"],
+        AUDIT_ASYNC_ENABLED="1",
+        AUDIT_FLUSH_SECONDS="5",
+        AUDIT_BATCH_SIZE="50",
+    )
+    subprocess.run([sys.executable, "-c", _EXIT_SCRIPT], cwd=ROOT, env=env, check=True, timeout=60)
+
+    with app.app_context():
+        rows = AuditLog.query.filter_by(action="LOGOUT").all()
+        assert [(r.entity_type, r.entity_id) for r in rows] == [("AdminUser", 1)]
+
+
+def test_close_writes_in_flight_batch(app):
+    from app.audit import AuditWriter, audit_row
+
+    writer = AuditWriter(app, max_queue=10, batch_size=50, flush_seconds=5)
+    writer.submit(audit_row("REPORT_PDF", "Raffle", 1))
+    writer.submit(audit_row("REPORT_EXCEL", "Raffle", 1))
+    writer.close()
+
+    assert not writer._thread.is_alive()
+    assert writer.info()["written"] == 2
+    with app.app_context():
+        assert sorted(r.action for r in AuditLog.query.all()) == ["REPORT_EXCEL", "REPORT_PDF"]
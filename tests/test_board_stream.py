@@ -0,0 +1,51 @@
+import pytest
+
+from app import events
+from app.public import routes as public_routes
+
+
+@pytest.fixture
+def stream_app(app, monkeypatch):
+    app.config.update(BOARD_STREAM_ENABLED=True, BOARD_STREAM_MAX_CLIENTS=2, BOARD_STREAM_MAX_SECONDS=0)
+    monkeypatch.setitem(events._streams, "open", 0)
+    return app
+
+
+def _open_and_close(client):
+    resp = client.get("/api/tickets/stream")
+    status = resp.status_code
+    resp.get_data()
+    resp.close()
+    return status
+
+
+def test_stream_slot_released_after_close(stream_app, client):
+    for _ in range(5):
+        assert _open_and_close(client) == 200
+    assert events.stream_info()["open"] == 0
+
+
+def test_failed_reads_do_not_leak_stream_slots(stream_app, client, monkeypatch):
+    def no_raffle():
+        raise RuntimeError("No hay rifa activa. Ejecuta 'flask seed'.")
+
+    monkeypatch.setattr(public_routes, "get_active_raffle", no_raffle)
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            client.get("/api/tickets/stream")
+    assert events.stream_info()["open"] == 0
+
+    monkeypatch.undo()
+    assert _open_and_close(client) == 200
+
+
+def test_full_stream_slots_return_503(stream_app, client):
+    for _ in range(2):
+        assert events.acquire_stream_slot(2)
+    try:
+        resp = client.get("/api/tickets/stream")
+        assert resp.status_code == 503
+        assert resp.headers["Retry-After"] == "60"
+    finally:
+        events.release_stream_slot()
+        events.release_stream_slot()
@@ -0,0 +1,42 @@
+from app.explain import _full_scans, explain_hot_queries
+from app.models import Raffle
+
+
+def _request(client, i: int, numbers: str):
+    resp = client.post("/solicitar", data={
+        "buyer_name": f"Comprador {i}",
+        "buyer_phone": f"55120000{i:02d}",
+        "ticket_numbers": numbers,
+        "confirm_age": "y",
+        "accept_terms": "y",
+    })
+    assert resp.status_code == 200
+
+
+def test_full_scans_ignores_materialized_subqueries():
+    plan = [
+        "MATERIALIZE anon_1",
+        "SEARCH tickets USING INTEGER PRIMARY KEY (rowid=?)",
+        "SCAN anon_1",
+        "SCAN audit_logs USING INDEX ix_audit_logs_created",
+        "SCAN raffles",
+    ]
+    assert _full_scans("sqlite", plan) == []
+    assert _full_scans("sqlite", plan + ["SCAN purchases"]) == ["purchases"]
+    assert _full_scans("postgresql", ["Subquery Scan on anon_1", "Seq Scan on tickets"]) == ["tickets"]
+
+
+def test_explain_check_passes_with_purchases(app, client):
+    # Con compras, /admin/tickets?q=1 carga Purchase.tickets (lazy="subquery").
+    for i, numbers in enumerate(["1", "2,3", "4"]):
+        _request(client, i, numbers)
+
+    with app.app_context():
+        raffle = Raffle.query.filter_by(is_active=True).one()
+        results = explain_hot_queries(app, raffle)
+
+    assert any("anon_1" in line for r in results for line in r["plan"])
+    assert [r["source"] for r in results if r["full_scans"]] == []
+
+    result = app.test_cli_runner().invoke(args=["bench", "explain", "--check"])
+    assert result.exit_code == 0, result.output
@@ -0,0 +1,48 @@
+from sqlalchemy import update
+
+from app.extensions import db
+from app.messages import get_message_set, message_cache_info
+from app.models import MessageTemplate, Raffle
+from app.raffles import get_active_raffle
+
+
+def _other_process(app, stmt) -> None:
+    # Como `flask reservations ttl` u otro worker: conexión propia, sin tocar
+    # las cachés de este proceso.
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(stmt)
+
+
+def _approved_text(app) -> str:
+    with app.app_context():
+        return get_message_set(get_active_raffle()).render("approved", "Ana", "RF26-ABC123", [7])
+
+
+def test_message_set_is_reused_while_nothing_changes(app):
+    first = _approved_text(app)
+    misses = message_cache_info()["misses"]
+
+    assert _approved_text(app) == first
+    assert message_cache_info()["misses"] == misses
+
+
+def test_raffle_change_from_other_process_recompiles(app):
+    _approved_text(app)  # compila y deja la rifa activa en caché
+    _other_process(app, update(Raffle).where(Raffle.is_active.is_(True)).values(reservation_ttl_hours=48))
+
+    assert "Plazo para pagar: 48 horas" in _approved_text(app)
+
+
+def test_template_saved_by_other_process_recompiles(app):
+    assert "APARTADO CONFIRMADO" in _approved_text(app)
+    with app.app_context():
+        raffle_id = get_active_raffle().id
+    _other_process(app, MessageTemplate.__table__.insert().values(
+        raffle_id=raffle_id, kind="approved", body="Hola {nombre}, folio {folio}",
+    ))
+    _other_process(app, update(Raffle).where(Raffle.id == raffle_id).values(
+        messages_version=Raffle.messages_version + 1,
+    ))
+
+    assert _approved_text(app) == "Hola Ana, folio RF26-ABC123"
@@ -0,0 +1,45 @@
+import os
+
+from app.admin import routes as admin_routes
+from app.models import AuditLog, Raffle, ReportJobStatus
+from app.report_jobs import artifact_path, enqueue_report, run_job
+
+
+def _done_job(app, kind: str = "xlsx") -> int:
+    with app.app_context():
+        raffle = Raffle.query.filter_by(is_active=True).one()
+        job, _ = enqueue_report(raffle.id, kind)
+        assert run_job(job.id)
+        assert job.status == ReportJobStatus.DONE
+        assert os.path.exists(artifact_path(job))
+        return job.id
+
+
+def test_download_serves_artifact_file(app, admin_client):
+    job_id = _done_job(app)
+
+    resp = admin_client.get(f"/admin/reports/jobs/{job_id}/download")
+
+    assert resp.status_code == 200
+    assert resp.data[:2] == b"PK"  # xlsx = zip
+    resp.close()
+    with app.app_context():
+        assert AuditLog.query.filter_by(action="REPORT_EXCEL").count() == 1
+
+
+def test_download_when_file_disappears_after_check(app, admin_client, monkeypatch):
+    job_id = _done_job(app)
+    real_has_artifact = admin_routes.has_artifact
+
+    def has_artifact_then_deleted(job):
+        ok = real_has_artifact(job)
+        os.remove(artifact_path(job))  # lo borra run_job() de un reporte más nuevo
+        return ok
+
+    monkeypatch.setattr(admin_routes, "has_artifact", has_artifact_then_deleted)
+    resp = admin_client.get(f"/admin/reports/jobs/{job_id}/download")
+
+    assert resp.status_code == 302
+    assert resp.headers["Location"].endswith("/admin/reports")
+    with app.app_context():
+        assert AuditLog.query.filter_by(action="REPORT_EXCEL").count() == 0
@@ -0,0 +1,70 @@
+import pytest
+from sqlalchemy import event
+
+from app.bench import count_queries
+from app.extensions import db
+from app.models import Purchase, PurchaseStatus, Ticket, TicketStatus
+
+
+# Con la rifa activa ya en caché: duplicado pendiente, INSERT purchase,
+# UPDATE condicional de boletos, INSERT purchase_tickets, raffle_stats y
+# board_version. Un BEGIN y un COMMIT, ningún ROLLBACK (antes: 8 + 2 ROLLBACK).
+SOLICITAR_STATEMENTS = 6
+
+
+@pytest.fixture
+def transaction_events(app):
+    counts = {"begin": 0, "commit": 0, "rollback": 0}
+    with app.app_context():
+        engine = db.engine
+    listeners = {name: (lambda *a, _n=name: counts.__setitem__(_n, counts[_n] + 1)) for name in counts}
+    for name, fn in listeners.items():
+        event.listen(engine, name, fn)
+    yield counts
+    for name, fn in listeners.items():
+        event.remove(engine, name, fn)
+
+
+def _form(phone: str, numbers: str) -> dict:
+    return {
+        "buyer_name": "Ana López",
+        "buyer_phone": phone,
+        "ticket_numbers": numbers,
+        "confirm_age": "y",
+        "accept_terms": "y",
+    }
+
+
+def test_request_tickets_round_trips(app, client, transaction_events):
+    client.get("/solicitar")  # calienta la rifa activa en caché
+    for key in transaction_events:
+        transaction_events[key] = 0
+
+    with app.app_context():
+        with count_queries() as counter:
+            resp = client.post("/solicitar", data=_form("5512345678", "3,7"))
+
+    assert resp.status_code == 200
+    assert counter.count == SOLICITAR_STATEMENTS
+    assert transaction_events == {"begin": 1, "commit": 1, "rollback": 0}
+
+    with app.app_context():
+        purchase = Purchase.query.one()
+        assert purchase.status == PurchaseStatus.PENDING
+        assert sorted(t.number for t in purchase.tickets) == [3, 7]
+        assert {t.status for t in purchase.tickets} == {TicketStatus.RESERVED}
+
+
+def test_request_tickets_taken_rolls_back_once(app, client, transaction_events):
+    assert client.post("/solicitar", data=_form("5512345678", "3")).status_code == 200
+    for key in transaction_events:
+        transaction_events[key] = 0
+
+    resp = client.post("/solicitar", data=_form("5512345679", "3,8"))
+
+    assert resp.status_code == 409
+    assert transaction_events["commit"] == 0
+    assert transaction_events["rollback"] == 1
+    with app.app_context():
+        assert Purchase.query.count() == 1
+        assert Ticket.query.filter_by(number=8).one().status == TicketStatus.FREE